@@ -0,0 +1,215 @@
+# agentHost.py
+# ------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Agents that live in a worker process of their own and are played through a
+pipe, so that loading an agent and whatever it builds (search tables, maze
+distances, learned weights) is paid for once for a whole batch of games.
+
+An AgentHost starts one worker process.  startAgent builds an agent in it
+(the class is found with pacman.loadAgent) and returns a RemoteAgent, which
+the game plays like any other agent: registerInitialState, getAction,
+observationFunction, final and setTimeLimits are sent to the worker and the
+answer is sent back.  A RemoteAgent only has the methods its agent has, since
+the game looks them up with dir.  Several agents can share a host; the agents
+of a host answer one call at a time.  The host starts with the state of the
+random module of the process that made it, so games fixed with pacman.py -f
+play as they do without a host.
+
+States are pickled without their layout, which is sent to the host once and
+kept there.  If a call times out in the game, the host still finishes it and
+its answer is thrown away when it comes.
+
+Every move costs a pickle round trip, so a host only pays off in a driver
+that lives across many batches of games (a tournament, a training loop) and
+keeps the host, and the agents in it, from one batch to the next; a single
+pacman.py run already reuses one agent for all its games.  Such a driver
+makes the host, starts its agents, hands them to pacman.runGames and closes
+the host when it is done:
+
+    host = AgentHost()
+    try:
+        agent = host.startAgent('AlphaBetaAgent', (), {'time': '0.05'})
+        for batch in batches:
+            pacman.runGames(layout, agent, ghosts, display, numGames, False)
+    finally:
+        host.close()
+
+The main of this module is such a driver, and times the batches:
+
+> python agentHost.py -p ExpectimaxAgent -a time=0.05 -l smallClassic -n 5
+"""
+
+from multiprocessing import Process, Pipe
+import traceback
+import random
+import copy
+import time
+
+REMOTE_METHODS = ['registerInitialState', 'getAction', 'observationFunction', 'final', 'setTimeLimits']
+
+class AgentHostError(Exception):
+    "Raised in the game for an exception raised by an agent in its host"
+    pass
+
+def _serve(connection, randomState):
+    "The loop of a host process: runs the calls sent through connection"
+    import signal
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # multiprocessing reseeds the random module of a new process
+    random.setstate(randomState)
+    import pacman
+    agents, layouts = {}, {}
+    while True:
+        message = connection.recv()
+        command, number = message[0], message[1]
+        if command == 'quit': break
+        try:
+            if command == 'start':
+                agentId, name, args, kwargs = message[2:]
+                agent = pacman.loadAgent(name, True)(*args, **kwargs)
+                agents[agentId] = agent
+                result = [method for method in REMOTE_METHODS if method in dir(agent)]
+            elif command == 'layout':
+                key, layout = message[2:]
+                layouts[key] = layout
+                result = None
+            else:
+                agentId, layoutKey, args = message[2:]
+                if layoutKey is not None: args[0].data.layout = layouts[layoutKey]
+                result = getattr(agents[agentId], command)(*args)
+            connection.send((number, True, result))
+        except Exception:
+            connection.send((number, False, traceback.format_exc()))
+    connection.close()
+
+class AgentHost:
+    """
+    A worker process holding agents.  Calls are numbered, so an answer that
+    comes after its call was given up on is recognized and dropped.
+    """
+    def __init__(self):
+        self.connection, child = Pipe()
+        self.process = Process(target=_serve, args=(child, random.getstate()))
+        self.process.daemon = True
+        self.process.start()
+        child.close()
+        self.calls = 0
+        self.numAgents = 0
+        self.layouts = set()
+
+    def call(self, command, *args):
+        self.calls += 1
+        number = self.calls
+        self.connection.send((command, number) + args)
+        while True:
+            answer, ok, result = self.connection.recv()
+            if answer == number: break
+        if not ok: raise AgentHostError('Agent host call %s failed:\n%s' % (command, result))
+        return result
+
+    def startAgent(self, name, args=(), kwargs={}):
+        "Builds agent class name with args and kwargs in the host and returns its RemoteAgent"
+        self.numAgents += 1
+        methods = self.call('start', self.numAgents, name, tuple(args), dict(kwargs))
+        return RemoteAgent(self, self.numAgents, name, methods)
+
+    def sendState(self, state):
+        """
+        Returns a copy of state without its layout, for pickling, and the key
+        of the layout, which is sent to the host the first time it is used.
+        """
+        layout = state.data.layout
+        if layout is None: return state, None
+        key = layout.contentKey
+        if key not in self.layouts:
+            self.call('layout', key, layout)
+            self.layouts.add(key)
+        light = copy.copy(state)
+        light.data = copy.copy(state.data)
+        light.data.layout = None
+        return light, key
+
+    def close(self):
+        if self.process is None: return
+        try:
+            self.connection.send(('quit', 0))
+        except IOError:
+            pass
+        self.process.join(1)
+        if self.process.is_alive(): self.process.terminate()
+        self.connection.close()
+        self.process = None
+
+class RemoteAgent:
+    "Plays an agent held by an AgentHost"
+    def __init__(self, host, agentId, name, methods):
+        self.host = host
+        self.agentId = agentId
+        self.name = name
+        for method in methods:
+            setattr(self, method, self.remoteMethod(method))
+
+    def remoteMethod(self, method):
+        def call(*args):
+            layoutKey = None
+            if method in ('registerInitialState', 'getAction', 'observationFunction', 'final'):
+                state, layoutKey = self.host.sendState(args[0])
+                args = (state,) + args[1:]
+            return self.host.call(method, self.agentId, layoutKey, args)
+        call.__name__ = method
+        return call
+
+    def __repr__(self):
+        return 'RemoteAgent(%s)' % self.name
+
+def readCommand(argv):
+    from optparse import OptionParser
+    usageStr = """
+    USAGE:      python agentHost.py <options>
+    EXAMPLES:   python agentHost.py -p ExpectimaxAgent -a time=0.05 -l smallClassic -n 5
+    """
+    parser = OptionParser(usageStr)
+    parser.add_option('-p', '--pacman', dest='pacman', default='GreedyAgent',
+                      help='The Pacman agent to host [Default: %default]')
+    parser.add_option('-a', '--agentArgs', dest='agentArgs', default=None,
+                      help='Comma separated arguments of the agent, e.g. "opt1=val1,opt2"')
+    parser.add_option('-l', '--layout', dest='layout', default='mediumClassic',
+                      help='The layout to play on [Default: %default]')
+    parser.add_option('-n', '--numGames', dest='numGames', type='int', default=5,
+                      help='Number of games of every batch [Default: %default]')
+    parser.add_option('-b', '--batches', dest='batches', type='int', default=3,
+                      help='Number of batches of games played with the same host [Default: %default]')
+    options, args = parser.parse_args(argv)
+    if args: parser.error('Unrecognized arguments: ' + ' '.join(args))
+    return options
+
+if __name__ == '__main__':
+    import sys, pacman, layout, textDisplay, ghostAgents
+    options = readCommand(sys.argv[1:])
+    gameLayout = layout.getLayout(options.layout)
+    if gameLayout == None: raise Exception("The layout " + options.layout + " cannot be found")
+    agentOpts = pacman.parseAgentArgs(options.agentArgs)
+    host = AgentHost()
+    try:
+        start = time.time()
+        agent = host.startAgent(options.pacman, (), agentOpts)
+        print 'Started %s in the host in %.3fs' % (options.pacman, time.time() - start)
+        for batch in range(options.batches):
+            start = time.time()
+            ghosts = [ghostAgents.RandomGhost(i + 1) for i in range(gameLayout.getNumGhosts())]
+            pacman.runGames(gameLayout, agent, ghosts, textDisplay.NullGraphics(), options.numGames, False)
+            print 'Batch %d: %d games in %.3fs' % (batch + 1, options.numGames, time.time() - start)
+    finally:
+        host.close()
@@ -0,0 +1,125 @@
+# agentRegistry.py
+# ----------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Finds the module of an agent class without importing every agent module.
+
+pacman.loadAgent looks agents up here first.  For every directory it
+searches, the names defined at the top level of each *gents.py module
+(classes, functions and assignments, but not imports) are read with ast and
+kept in an index file, INDEX_FILE, in that directory:
+
+  one line per module: module file name, mtime, size, then the names
+
+A module whose mtime or size changed is read again and the file rewritten, so
+the index never has to be built by hand.  Names a module only imports are not
+indexed; loadAgent falls back to importing every module for those.  To list
+the index of a directory:
+
+> python agentRegistry.py .
+"""
+
+import os
+
+INDEX_FILE = '.agentIndex'
+MODULE_SUFFIX = 'gents.py'
+
+# directory -> {module file name: (mtime, size, names)}
+AGENT_INDEX_CACHE = {}
+
+def definedNames(fileName):
+    "The names a module defines at its top level, read with ast"
+    import ast
+    f = open(fileName)
+    try: tree = ast.parse(f.read(), fileName)
+    finally: f.close()
+    names = []
+    for node in tree.body:
+        if isinstance(node, (ast.ClassDef, ast.FunctionDef)):
+            names.append(node.name)
+        elif isinstance(node, ast.Assign):
+            names.extend([target.id for target in node.targets if isinstance(target, ast.Name)])
+    return names
+
+def readIndex(directory):
+    index = {}
+    try:
+        f = open(os.path.join(directory, INDEX_FILE))
+    except IOError:
+        return index
+    try:
+        for line in f:
+            fields = line.split()
+            if len(fields) < 3: continue
+            index[fields[0]] = (float(fields[1]), int(fields[2]), fields[3:])
+    except ValueError:
+        index = {} # a damaged index is rebuilt
+    f.close()
+    return index
+
+def writeIndex(directory, index):
+    "Writes the index through a temporary file, so that readers never see half of it"
+    fileName = os.path.join(directory, INDEX_FILE)
+    temporary = '%s.%d' % (fileName, os.getpid())
+    try:
+        f = open(temporary, 'w')
+        try:
+            for module in sorted(index):
+                mtime, size, names = index[module]
+                f.write('%s %r %d %s\n' % (module, mtime, size, ' '.join(names)))
+        finally:
+            f.close()
+        os.rename(temporary, fileName)
+    except (IOError, OSError):
+        pass # an index that cannot be written is rebuilt in memory next time
+
+def getIndex(directory):
+    """
+    Returns {module file name: (mtime, size, names)} for the agent modules
+    of directory, reading again the modules that changed since they were
+    indexed.
+    """
+    if directory in AGENT_INDEX_CACHE: return AGENT_INDEX_CACHE[directory]
+    stored = readIndex(directory)
+    index, changed = {}, False
+    for module in os.listdir(directory):
+        if not module.endswith(MODULE_SUFFIX): continue
+        try:
+            info = os.stat(os.path.join(directory, module))
+        except OSError:
+            continue
+        entry = stored.get(module)
+        if entry is None or entry[0] != info.st_mtime or entry[1] != info.st_size:
+            try:
+                names = definedNames(os.path.join(directory, module))
+            except (SyntaxError, IOError):
+                names = []
+            entry = (info.st_mtime, info.st_size, names)
+            changed = True
+        index[module] = entry
+    if changed or len(index) != len(stored): writeIndex(directory, index)
+    AGENT_INDEX_CACHE[directory] = index
+    return index
+
+def findAgentModules(name, directory):
+    "The file names of the modules of directory that define name, in a fixed order"
+    index = getIndex(directory)
+    return [module for module in sorted(index) if name in index[module][2]]
+
+if __name__ == '__main__':
+    import sys
+    for directory in sys.argv[1:] or ['.']:
+        index = getIndex(directory)
+        for module in sorted(index):
+            print '%s: %s' % (module, ', '.join(index[module][2]))
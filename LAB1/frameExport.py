@@ -0,0 +1,523 @@
+# frameExport.py
+# --------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Turns game logs (see gameLog.py, pacman.py -r) into animated GIFs or PNG
+sequences without Tk or a display server.
+
+A FrameRasterizer draws the walls, food, capsules, Pacman, the ghosts and the
+score the way graphicsDisplay does, into NumPy arrays of palette indices.  The
+walls and food are drawn once and only the food and capsules that were eaten
+are erased from then on; every frame is a copy of that board with the agents
+on top.  A frame is drawn after every move (or every --every moves).
+
+Games are cut into chunks of moves, which are drawn by a pool of worker
+processes; every chunk starts from the keyframe of the log before it.  The
+frames of a GIF only hold the rectangle that changed since the frame before,
+so the workers encode them and the main process writes them in order.  For
+example:
+
+> python pacman.py -p GreedyAgent -r -q -n 10
+> python frameExport.py -w 4 -o movies recorded-game-*
+> python frameExport.py --png -z 20 --every 3 recorded-game-1-*
+"""
+
+import gameLog
+import numpy
+import struct
+import zlib
+import math
+import os
+
+GRID_SIZE = 15
+INFO_PANE_HEIGHT = 35
+WALL_RADIUS = 0.15
+WALL_WIDTH = 2
+FOOD_SIZE = 0.1
+CAPSULE_SIZE = 0.25
+PACMAN_SCALE = 0.5
+GHOST_SIZE = 0.65
+GHOST_SHAPE = [(0, 0.3), (0.25, 0.75), (0.5, 0.3), (0.75, 0.75), (0.75, -0.5), (0.5, -0.75),
+               (-0.5, -0.75), (-0.75, -0.5), (-0.75, 0.75), (-0.5, 0.3), (-0.25, 0.75)]
+
+def rgb(r, g, b):
+    "The colour formatColor(r, g, b) of graphicsUtils"
+    return (int(r * 255), int(g * 255), int(b * 255))
+
+# The colours of graphicsDisplay; frames hold indices into PALETTE
+PALETTE = [rgb(0, 0, 0), rgb(0.0, 51.0/255.0, 1.0), rgb(1, 1, 1), rgb(1.0, 1.0, 61.0/255),
+           rgb(.9, 0, 0), rgb(0, .3, .9), rgb(.98, .41, .07), rgb(.1, .75, .7), rgb(1.0, 0.6, 0.0), rgb(.4, 0.13, 0.91)]
+BLACK, WALL, WHITE, YELLOW = range(4)
+GHOST_COLORS = range(4, len(PALETTE))
+PALETTE_BITS = 4
+PALETTE += [(0, 0, 0)] * (2 ** PALETTE_BITS - len(PALETTE))
+
+# Glyphs of the score, 3 pixels wide and 5 high
+FONT = {
+    '0': '111101101101111', '1': '010110010010111', '2': '111001111100111', '3': '111001111001111',
+    '4': '101101111001001', '5': '111100111001111', '6': '111100111101111', '7': '111001001001001',
+    '8': '111101111101111', '9': '111101111001111', '-': '000000111000000', ' ': '000000000000000',
+    'S': '111100111001111', 'C': '111100100100111', 'O': '111101101101111', 'R': '110101110101101',
+    'E': '111100111100111', ':': '000010000010000',
+}
+
+DIRECTION_ANGLES = {'North': 90, 'South': 270, 'West': 180}
+EYE_OFFSETS = {'North': (0, -0.2), 'South': (0, 0.2), 'East': (0.2, 0), 'West': (-0.2, 0)}
+
+def frameSize(layout, gridSize=GRID_SIZE):
+    "The width and height in pixels of the frames of a layout, as in graphicsDisplay"
+    gridSize = int(gridSize)
+    return (layout.width + 1) * gridSize, (layout.height + 1) * gridSize + INFO_PANE_HEIGHT
+
+def offsetGrid(radius):
+    "The offsets (dy, dx) of the pixels of a square of the given radius"
+    size = int(math.ceil(radius))
+    return numpy.mgrid[-size:size + 1, -size:size + 1]
+
+def disk(radius, dx=0.0, dy=0.0):
+    "The offsets of the pixels of a disk of the given radius centred at (dx, dy)"
+    ys, xs = offsetGrid(radius + max(abs(dx), abs(dy)))
+    inside = (xs - dx) ** 2 + (ys - dy) ** 2 <= radius * radius
+    return ys[inside], xs[inside]
+
+def polygonPixels(points):
+    "The offsets of the pixels inside a polygon (even-odd rule)"
+    ys, xs = offsetGrid(max([max(abs(x), abs(y)) for x, y in points]))
+    inside = numpy.zeros(ys.shape, dtype=bool)
+    for (x1, y1), (x2, y2) in zip(points, points[1:] + points[:1]):
+        if y1 == y2: continue
+        crosses = (ys >= min(y1, y2)) & (ys < max(y1, y2))
+        xCross = x1 + (ys - y1) * float(x2 - x1) / (y2 - y1)
+        inside ^= crosses & (xs < xCross)
+    return ys[inside], xs[inside]
+
+class FrameRasterizer:
+    """
+    Draws the states of games on one layout into arrays of indices into
+    PALETTE, with rows from the top of the picture down.  Successive calls of
+    render should be given the states of one game in order, since only the
+    food and capsules that changed since the last call are redrawn.
+    """
+    def __init__(self, layout, gridSize=GRID_SIZE):
+        self.layout = layout
+        self.gridSize = int(gridSize)
+        self.width, self.height = frameSize(layout, gridSize)
+        g = self.gridSize
+        self.foodPixels = disk(FOOD_SIZE * g)
+        self.capsulePixels = disk(CAPSULE_SIZE * g)
+        self.ghostPixels = polygonPixels([(x * g * GHOST_SIZE, y * g * GHOST_SIZE) for x, y in GHOST_SHAPE])
+        self.pacmanPixels = {}
+        self.eyePixels = {}
+        self.background = self.drawWalls(layout.walls)
+        self.board = None
+        self.food = None
+        self.capsules = None
+
+    def toScreen(self, position):
+        "The pixel (row, column) at the centre of a position, as graphicsDisplay.to_screen"
+        x, y = position
+        return int(round((self.layout.height - y) * self.gridSize)), int(round((x + 1) * self.gridSize))
+
+    def paint(self, frame, position, pixels, color):
+        row, column = self.toScreen(position)
+        rows, columns = pixels[0] + row, pixels[1] + column
+        inside = (rows >= 0) & (rows < self.height) & (columns >= 0) & (columns < self.width)
+        frame[rows[inside], columns[inside]] = color
+
+    def wallTile(self, neighbours):
+        """
+        The pixels of a wall cell, given which of its eight neighbours
+        (N, E, S, W, NE, SE, SW, NW) are walls: every quadrant of the cell is
+        a rounded end, a straight piece, a corner or filled, as the outlines
+        of graphicsDisplay.drawWalls trace it.
+        """
+        n, e, s, w, ne, se, sw, nw = neighbours
+        g = self.gridSize
+        ys, xs = numpy.mgrid[0:g, 0:g] - g // 2
+        r = WALL_RADIUS * g
+        tile = numpy.zeros((g, g), dtype=bool)
+        for vertical, horizontal, diagonal, quadrant in [(n, e, ne, (xs >= 0) & (ys <= 0)),
+                                                         (n, w, nw, (xs <= 0) & (ys <= 0)),
+                                                         (s, e, se, (xs >= 0) & (ys >= 0)),
+                                                         (s, w, sw, (xs <= 0) & (ys >= 0))]:
+            if vertical and horizontal and diagonal: shape = quadrant
+            elif vertical and horizontal: shape = (abs(xs) <= r) | (abs(ys) <= r)
+            elif vertical: shape = abs(xs) <= r
+            elif horizontal: shape = abs(ys) <= r
+            else: shape = xs ** 2 + ys ** 2 <= r * r
+            tile |= quadrant & shape
+        return tile
+
+    def drawWalls(self, walls):
+        "The background: the outlines of the walls, WALL_WIDTH pixels wide"
+        g = self.gridSize
+        cells = numpy.array(walls.data, dtype=bool)
+        padded = numpy.zeros((walls.width + 2, walls.height + 2), dtype=bool)
+        padded[1:-1, 1:-1] = cells
+        neighbours = [padded[1 + dx:walls.width + 1 + dx, 1 + dy:walls.height + 1 + dy]
+                      for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0), (1, 1), (1, -1), (-1, -1), (-1, 1)]]
+        codes = numpy.zeros(cells.shape, dtype=int)
+        for bit, neighbour in enumerate(neighbours):
+            codes |= neighbour.astype(int) << bit
+        codes = numpy.where(cells, codes + 1, 0)
+
+        # Stack the tiles of the codes used and put them in place all at once
+        used, index = numpy.unique(codes, return_inverse=True)
+        tiles = numpy.zeros((len(used), g, g), dtype=bool)
+        for i, code in enumerate(used):
+            if code > 0: tiles[i] = self.wallTile([((code - 1) >> bit) & 1 for bit in range(8)])
+        index = index.reshape(codes.shape)[:, ::-1]
+        blocks = tiles[index].transpose(1, 2, 0, 3).reshape(walls.height * g, walls.width * g)
+        mask = numpy.zeros((self.height, self.width), dtype=bool)
+        offset = g - g // 2
+        mask[offset:offset + walls.height * g, offset:offset + walls.width * g] = blocks
+
+        inner = mask.copy()
+        for i in range(WALL_WIDTH):
+            shrunk = inner.copy()
+            shrunk[1:] &= inner[:-1]
+            shrunk[:-1] &= inner[1:]
+            shrunk[:, 1:] &= inner[:, :-1]
+            shrunk[:, :-1] &= inner[:, 1:]
+            inner = shrunk
+        background = numpy.zeros((self.height, self.width), dtype=numpy.uint8)
+        background[mask & ~inner] = WALL
+        return background
+
+    def updateBoard(self, food, capsules):
+        "Brings the board (the background with the food and capsules) up to date"
+        if self.board is None:
+            self.board = self.background.copy()
+            self.food = None
+            self.capsules = []
+        board = self.board
+        if food is not self.food:
+            for x in range(food.width):
+                column = food.data[x]
+                drawn = None
+                if self.food is not None:
+                    drawn = self.food.data[x]
+                    if column is drawn: continue
+                for y in range(food.height):
+                    had = drawn is not None and drawn[y]
+                    if column[y] and not had: self.paint(board, (x, y), self.foodPixels, WHITE)
+                    elif had and not column[y]: self.paint(board, (x, y), self.foodPixels, BLACK)
+            self.food = food
+        if capsules is not self.capsules:
+            for capsule in self.capsules:
+                if capsule not in capsules: self.paint(board, capsule, self.capsulePixels, BLACK)
+            for capsule in capsules:
+                if capsule not in self.capsules: self.paint(board, capsule, self.capsulePixels, WHITE)
+            self.capsules = capsules
+
+    def render(self, data):
+        "Draws a GameStateData and returns the frame"
+        self.updateBoard(data.food, data.capsules)
+        frame = self.board.copy()
+        for index, agentState in enumerate(data.agentStates):
+            configuration = agentState.configuration
+            if configuration == None: continue
+            if agentState.isPacman:
+                self.drawPacman(frame, configuration.getPosition(), configuration.getDirection())
+            else:
+                color = GHOST_COLORS[(index - 1) % len(GHOST_COLORS)]
+                if agentState.scaredTimer > 0: color = WHITE
+                self.drawGhost(frame, configuration.getPosition(), configuration.getDirection(), color)
+        self.drawScore(frame, data.score)
+        return frame
+
+    def drawPacman(self, frame, position, direction):
+        "A disk with the mouth of graphicsDisplay.getEndpoints cut out"
+        x, y = position
+        mouth = 30 + 80 * math.sin(math.pi * (x - int(x) + y - int(y)))
+        key = (direction, int(mouth))
+        if key not in self.pacmanPixels:
+            ys, xs = disk(PACMAN_SCALE * self.gridSize)
+            angles = numpy.degrees(numpy.arctan2(-ys, xs))
+            distance = abs((angles - DIRECTION_ANGLES.get(direction, 0) + 180) % 360 - 180)
+            keep = (distance > mouth / 2) | ((xs == 0) & (ys == 0))
+            self.pacmanPixels[key] = (ys[keep], xs[keep])
+        self.paint(frame, position, self.pacmanPixels[key], YELLOW)
+
+    def drawGhost(self, frame, position, direction, color):
+        self.paint(frame, position, self.ghostPixels, color)
+        if direction not in self.eyePixels:
+            size = self.gridSize * GHOST_SIZE
+            dx, dy = EYE_OFFSETS.get(direction, (0, 0))
+            eyes = [disk(size * 0.2, size * (side * 0.3 + dx / 1.5), -size * (0.3 - dy / 1.5)) for side in (-1, 1)]
+            pupils = [disk(size * 0.08, size * (side * 0.3 + dx), -size * (0.3 - dy)) for side in (-1, 1)]
+            self.eyePixels[direction] = [(numpy.concatenate([p[0] for p in eyes]), numpy.concatenate([p[1] for p in eyes])),
+                                         (numpy.concatenate([p[0] for p in pupils]), numpy.concatenate([p[1] for p in pupils]))]
+        eyes, pupils = self.eyePixels[direction]
+        self.paint(frame, position, eyes, WHITE)
+        self.paint(frame, position, pupils, BLACK)
+
+    def drawScore(self, frame, score):
+        "The score, in the place of the score of graphicsDisplay.InfoPane"
+        scale = max(1, min(self.gridSize // 6, INFO_PANE_HEIGHT // 7))
+        top = (self.layout.height + 1) * self.gridSize + (INFO_PANE_HEIGHT - 5 * scale) // 2
+        left = self.gridSize
+        for char in 'SCORE: %4d' % score:
+            glyph = numpy.array([int(bit) for bit in FONT[char]], dtype=bool).reshape(5, 3)
+            glyph = glyph.repeat(scale, 0).repeat(scale, 1)
+            area = frame[top:top + 5 * scale, left:left + 3 * scale]
+            area[glyph[:area.shape[0], :area.shape[1]]] = YELLOW
+            left += 4 * scale
+
+###############
+# PNG and GIF #
+###############
+
+def pngChunk(kind, data):
+    return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data) & 0xffffffff)
+
+def writePng(fileName, frame, palette=PALETTE):
+    "Writes a frame as a PNG image with a palette"
+    height, width = frame.shape
+    rows = numpy.zeros((height, width + 1), dtype=numpy.uint8) # every row starts with filter type 0
+    rows[:, 1:] = frame
+    f = open(fileName, 'wb')
+    try:
+        f.write('\x89PNG\r\n\x1a\n')
+        f.write(pngChunk('IHDR', struct.pack('>IIBBBBB', width, height, 8, 3, 0, 0, 0)))
+        f.write(pngChunk('PLTE', ''.join([struct.pack('BBB', *color) for color in palette])))
+        f.write(pngChunk('IDAT', zlib.compress(rows.tostring(), 6)))
+        f.write(pngChunk('IEND', ''))
+    finally:
+        f.close()
+
+def lzwEncode(pixels, codeSize):
+    "The variable-length LZW code of GIF image data (a string of palette indices)"
+    clearCode = 1 << codeSize
+    endCode = clearCode + 1
+    nextCode = endCode + 1
+    width = codeSize + 1
+    table = {}
+    output = bytearray()
+    buffer, bits = clearCode, width
+
+    pixels = bytearray(pixels)
+    prefix = pixels[0]
+    for pixel in pixels[1:]:
+        key = prefix << 8 | pixel
+        code = table.get(key)
+        if code is not None:
+            prefix = code
+            continue
+        buffer |= prefix << bits
+        bits += width
+        if nextCode == 4096:
+            buffer |= clearCode << bits
+            bits += width
+            table = {}
+            nextCode = endCode + 1
+            width = codeSize + 1
+        else:
+            if nextCode >= 1 << width: width += 1
+            table[key] = nextCode
+            nextCode += 1
+        prefix = pixel
+        while bits >= 8:
+            output.append(buffer & 0xff)
+            buffer >>= 8
+            bits -= 8
+    buffer |= prefix << bits
+    bits += width
+    buffer |= endCode << bits
+    bits += width
+    while bits > 0:
+        output.append(buffer & 0xff)
+        buffer >>= 8
+        bits -= 8
+    return str(output)
+
+def gifFrame(frame, previous=None, delay=10):
+    """
+    The bytes of one frame of an animated GIF, holding the smallest rectangle
+    of frame that differs from previous (the whole frame if there is none).
+    delay is in hundredths of a second.
+    """
+    height, width = frame.shape
+    top, left, bottom, right = 0, 0, height, width
+    if previous is not None:
+        changed = frame != previous
+        rows = numpy.flatnonzero(changed.any(1))
+        columns = numpy.flatnonzero(changed.any(0))
+        if len(rows) == 0: bottom, right = 1, 1
+        else: top, bottom, left, right = rows[0], rows[-1] + 1, columns[0], columns[-1] + 1
+    codeSize = max(2, PALETTE_BITS)
+    data = lzwEncode(frame[top:bottom, left:right].tostring(), codeSize)
+    blocks = [chr(codeSize)]
+    for start in range(0, len(data), 255):
+        block = data[start:start + 255]
+        blocks.append(chr(len(block)) + block)
+    blocks.append('\x00')
+    control = struct.pack('<BBBBHBB', 0x21, 0xF9, 4, 1 << 2, delay, 0, 0) # keep the frame below
+    descriptor = struct.pack('<BHHHHB', 0x2C, left, top, right - left, bottom - top, 0)
+    return control + descriptor + ''.join(blocks)
+
+class GifWriter:
+    "Writes frames made by gifFrame into an animated GIF that loops forever"
+    def __init__(self, stream, width, height, palette=PALETTE):
+        self.stream = stream
+        stream.write('GIF89a')
+        stream.write(struct.pack('<HHBBB', width, height, 0x80 | (PALETTE_BITS - 1) << 4 | (PALETTE_BITS - 1), 0, 0))
+        stream.write(''.join([struct.pack('BBB', *color) for color in palette]))
+        stream.write('\x21\xFF\x0bNETSCAPE2.0\x03\x01' + struct.pack('<H', 0) + '\x00')
+
+    def write(self, frameBytes):
+        self.stream.write(frameBytes)
+
+    def close(self):
+        self.stream.write('\x3B')
+        self.stream.close()
+
+##############
+# Exporting  #
+##############
+
+RASTERIZER_CACHE = {}
+
+def getRasterizer(fileName, layout, gridSize):
+    "The rasterizer of a log in this process, so its walls are drawn once"
+    key = (fileName, gridSize)
+    if key not in RASTERIZER_CACHE:
+        RASTERIZER_CACHE.clear()
+        RASTERIZER_CACHE[key] = FrameRasterizer(layout, gridSize)
+    return RASTERIZER_CACHE[key]
+
+def frameNumbers(start, end, numMoves, every):
+    "The moves in [start, end) after which a frame is drawn"
+    return [k for k in range(start, min(end, numMoves + 1)) if k % every == 0 or k == numMoves]
+
+def exportChunk(task):
+    """
+    Draws the frames of moves start to end of a game log.  For a GIF the
+    frames are returned encoded; the first is encoded against the last frame
+    before start, which is drawn first.  PNG frames are written into
+    directory and only their number is returned.
+    """
+    fileName, start, end, gridSize, every, delay, directory = task
+    reader = gameLog.GameLogReader(fileName)
+    rasterizer = getRasterizer(fileName, reader.layout, gridSize)
+    rasterizer.board = None
+    wanted = frameNumbers(start, end, reader.numMoves, every)
+    reference = None
+    if directory is None and start > 0: reference = start - every
+    first = wanted[0]
+    if reference is not None: first = reference
+
+    state = reader.stateAt(first)
+    moves = reader.moves(first)
+    output, previous = [], None
+    for numMoves in range(first, wanted[-1] + 1):
+        if numMoves > first: state = state.generateSuccessor(*moves.next())
+        if numMoves == reference:
+            previous = rasterizer.render(state.data)
+        elif numMoves % every == 0 or numMoves == wanted[-1]:
+            frame = rasterizer.render(state.data)
+            if directory is None:
+                output.append(gifFrame(frame, previous, delay))
+                previous = frame
+            else:
+                writePng(os.path.join(directory, 'frame_%06d.png' % numMoves), frame)
+                output.append(numMoves)
+    reader.close()
+    return fileName, output
+
+def exportGames(fileNames, outputDirectory='.', png=False, workers=0, gridSize=GRID_SIZE,
+                every=1, frameTime=0.1, chunkSize=500):
+    """
+    Turns every game log into outputDirectory/NAME.gif, or into the PNG files
+    outputDirectory/NAME/frame_MOVE.png, where NAME is the name of the log
+    without its extension.  Chunks of chunkSize moves are drawn by a pool of
+    worker processes (in this process if workers is 0).
+    """
+    chunkSize = max(every, chunkSize - chunkSize % every)
+    delay = int(round(frameTime * 100))
+    tasks, games = [], {}
+    if not os.path.isdir(outputDirectory): os.makedirs(outputDirectory)
+    for fileName in fileNames:
+        if not gameLog.isGameLog(fileName): raise Exception('%s is not a game log' % fileName)
+        reader = gameLog.GameLogReader(fileName)
+        name = os.path.join(outputDirectory, os.path.splitext(os.path.basename(fileName))[0])
+        directory = None
+        if png:
+            directory = name
+            if not os.path.isdir(directory): os.makedirs(directory)
+        numChunks = reader.numMoves / chunkSize + 1
+        games[fileName] = [name, reader.layout, numChunks, None]
+        for start in range(0, reader.numMoves + 1, chunkSize):
+            tasks.append((fileName, start, start + chunkSize, gridSize, every, delay, directory))
+        reader.close()
+
+    pool = None
+    if workers > 0:
+        import multiprocessing
+        pool = multiprocessing.Pool(workers)
+        results = pool.imap(exportChunk, tasks)
+    else:
+        import itertools
+        results = itertools.imap(exportChunk, tasks)
+    try:
+        for fileName, output in results:
+            game = games[fileName]
+            name, layout, numChunks, writer = game
+            if not png and writer is None:
+                width, height = frameSize(layout, gridSize)
+                writer = game[3] = GifWriter(open(name + '.gif', 'wb'), width, height)
+            for frame in output:
+                if writer is not None: writer.write(frame)
+            game[2] -= 1
+            if game[2] == 0:
+                if writer is not None: writer.close()
+                print '%s: %s' % (fileName, name + (png and '/' or '.gif'))
+        if pool is not None: pool.close()
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+def readCommand(argv):
+    from optparse import OptionParser
+    usageStr = """
+    USAGE:      python frameExport.py <options> GAME_LOG ...
+    EXAMPLES:   python frameExport.py -w 4 -o movies recorded-game-*
+                python frameExport.py --png -z 20 --every 3 recorded-game-1-*
+    """
+    parser = OptionParser(usageStr)
+    parser.add_option('-o', '--output', dest='output', default='.',
+                      help='Directory the frames are written into [Default: %default]')
+    parser.add_option('--png', action='store_true', dest='png', default=False,
+                      help='Write a PNG file per frame instead of an animated GIF')
+    parser.add_option('-z', '--gridSize', dest='gridSize', type='int', default=GRID_SIZE,
+                      help='Size of a cell in pixels [Default: %default]')
+    parser.add_option('--every', dest='every', type='int', default=1,
+                      help='Draw a frame every this many moves [Default: %default]')
+    parser.add_option('--frameTime', dest='frameTime', type='float', default=0.1,
+                      help='Time a GIF frame is shown, in seconds [Default: %default]')
+    parser.add_option('-w', '--workers', dest='workers', type='int', default=0,
+                      help='Number of worker processes (0 draws in this process) [Default: %default]')
+    parser.add_option('--chunkSize', dest='chunkSize', type='int', default=500,
+                      help='Number of moves a worker draws at a time [Default: %default]')
+    options, args = parser.parse_args(argv)
+    if not args: parser.error('No game logs given')
+    if options.every < 1: parser.error('--every must be at least 1')
+    return options, args
+
+if __name__ == '__main__':
+    import sys
+    options, fileNames = readCommand(sys.argv[1:])
+    exportGames(fileNames, options.output, options.png, options.workers, options.gridSize,
+                options.every, options.frameTime, options.chunkSize)
@@ -22,6 +22,7 @@
 
 from util import *
 import time, os
+import random
 import traceback
 import sys
 
@@ -205,16 +206,29 @@ class Grid:
         return hash(h)
 
     def copy(self):
-        g = Grid(self.width, self.height)
-        g.data = [x[:] for x in self.data]
-        return g
+        return self._withData([x[:] for x in self.data])
 
     def deepCopy(self):
         return self.copy()
 
     def shallowCopy(self):
-        g = Grid(self.width, self.height)
-        g.data = self.data
+        return self._withData(self.data)
+
+    def withCell(self, x, y, value):
+        """
+        Returns a copy of the grid with cell (x,y) set to value.  Only column x
+        is copied and the other columns are shared with this grid, so neither
+        grid should be changed in place afterwards.
+        """
+        data = self.data[:]
+        data[x] = data[x][:]
+        data[x][y] = value
+        return self._withData(data)
+
+    def _withData(self, data):
+        # An empty grid is the cheapest to build; its data is replaced anyway
+        g = Grid(0, 0)
+        g.width, g.height, g.data = self.width, self.height, data
         return g
 
     def count(self, item =True ):
@@ -378,13 +392,19 @@ class GameStateData:
         Generates a new data packet by copying information from its predecessor.
         """
         if prevState != None:
-            self.food = prevState.food.shallowCopy()
-            self.capsules = prevState.capsules[:]
+            # Food and capsules are shared with the predecessor until one is
+            # eaten, when PacmanRules.consume replaces them (see Grid.withCell)
+            self.food = prevState.food
+            self.capsules = prevState.capsules
             self.agentStates = self.copyAgentStates( prevState.agentStates )
             self.layout = prevState.layout
             self._eaten = prevState._eaten
             self.score = prevState.score
+            self._foodKey = prevState._foodKey
+        else:
+            self._foodKey = None
 
+        self._key = None
         self._foodEaten = None
         self._foodAdded = None
         self._capsuleEaten = None
@@ -396,6 +416,7 @@ class GameStateData:
     def deepCopy( self ):
         state = GameStateData( self )
         state.food = self.food.deepCopy()
+        state.capsules = self.capsules[:]
         state.layout = self.layout.deepCopy()
         state._agentMoved = self._agentMoved
         state._foodEaten = self._foodEaten
@@ -425,13 +446,35 @@ class GameStateData:
         """
         Allows states to be keys of dictionaries.
         """
-        for i, state in enumerate( self.agentStates ):
-            try:
-                int(hash(state))
-            except TypeError, e:
-                print e
-                #hash(state)
-        return int((hash(tuple(self.agentStates)) + 13*hash(self.food) + 113* hash(tuple(self.capsules)) + 7 * hash(self.score)) % 1048575 )
+        return hash(self.getKey())
+
+    def getKey( self ):
+        """
+        Returns the 64-bit Zobrist key of the state (see ZobristTable).  The
+        food and capsule part of the key is carried over from the predecessor
+        and updated as food is eaten, so only the agents are looked at here.
+        """
+        if self._key is None:
+            table = getZobristTable(self.layout.width, self.layout.height)
+            if self._foodKey is None:
+                self._foodKey = table.getFoodKey(self.food, self.capsules)
+            key = self._foodKey ^ table.getScoreKey(self.score)
+            for index, agentState in enumerate(self.agentStates):
+                key ^= table.getAgentKey(index, agentState)
+            self._key = key
+        return self._key
+
+    def foodChanged( self, position ):
+        "Updates the key after food was eaten (or added) at position"
+        if self._foodKey is not None:
+            x, y = position
+            self._foodKey ^= getZobristTable(self.layout.width, self.layout.height).food[x][y]
+
+    def capsuleChanged( self, position ):
+        "Updates the key after a capsule was eaten (or added) at position"
+        if self._foodKey is not None:
+            x, y = position
+            self._foodKey ^= getZobristTable(self.layout.width, self.layout.height).capsules[x][y]
 
     def __str__( self ):
         width, height = self.layout.width, self.layout.height
@@ -495,6 +538,8 @@ class GameStateData:
         self.layout = layout
         self.score = 0
         self.scoreChange = 0
+        self._foodKey = getZobristTable(layout.width, layout.height).getFoodKey(self.food, self.capsules)
+        self._key = None
 
         self.agentStates = []
         numGhosts = 0
@@ -505,19 +550,119 @@ class GameStateData:
             self.agentStates.append( AgentState( Configuration( pos, Directions.STOP), isPacman) )
         self._eaten = [False for a in self.agentStates]
 
+ZOBRIST_MASK = (1 << 64) - 1
+ZOBRIST_TIMERS = 64
+ZOBRIST_TABLES = {}
+
+class ZobristTable:
+    """
+    Random 64-bit numbers for the parts of a game state on a board of the
+    given size: one per food cell and capsule cell, and for every agent one
+    per position, direction and scared timer.  The key of a state is the XOR
+    of the numbers of the parts it has, together with its score times an odd
+    number, so the key changes by a single XOR when a part comes or goes.
+
+    Positions are counted in half steps, since scared ghosts move at half
+    speed.  The numbers of agents are drawn when they are first needed, in
+    agent order, and the generator is seeded with the board size, so every
+    table of the same size holds the same numbers.
+    """
+    def __init__( self, width, height ):
+        self.width = width
+        self.height = height
+        self.random = random.Random('zobrist %dx%d' % (width, height))
+        bits = self.random.getrandbits
+        self.food = [[bits(64) for y in range(height)] for x in range(width)]
+        self.capsules = [[bits(64) for y in range(height)] for x in range(width)]
+        self.score = bits(64) | 1
+        self.agents = []
+
+    def getFoodKey( self, food, capsules ):
+        key = 0
+        for x in range(self.width):
+            column, numbers = food[x], self.food[x]
+            for y in range(self.height):
+                if column[y]: key ^= numbers[y]
+        for x, y in capsules:
+            key ^= self.capsules[x][y]
+        return key
+
+    def getScoreKey( self, score ):
+        return (int(score) * self.score) & ZOBRIST_MASK
+
+    def getAgentKey( self, index, agentState ):
+        configuration = agentState.configuration
+        if configuration == None: return 0
+        while len(self.agents) <= index:
+            bits = self.random.getrandbits
+            positions = [bits(64) for i in range((2 * self.width + 1) * (2 * self.height + 1))]
+            directions = dict([(direction, bits(64)) for direction in
+                               [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST, Directions.STOP]])
+            timers = [bits(64) for i in range(ZOBRIST_TIMERS)]
+            self.agents.append((positions, directions, timers))
+        positions, directions, timers = self.agents[index]
+        x, y = configuration.pos
+        cell = int(2 * x + 0.5) * (2 * self.height + 1) + int(2 * y + 0.5)
+        return positions[cell] ^ directions[configuration.direction] ^ \
+            timers[agentState.scaredTimer % ZOBRIST_TIMERS]
+
+def getZobristTable( width, height ):
+    key = (width, height)
+    if key not in ZOBRIST_TABLES:
+        ZOBRIST_TABLES[key] = ZobristTable(width, height)
+    return ZOBRIST_TABLES[key]
+
 try:
     import boinc
     _BOINC_ENABLED = True
 except:
     _BOINC_ENABLED = False
 
+# Number of moves between two checks of the time limits in fast games
+TIME_CHECK_INTERVAL = 64
+
+class ReadOnlyState(object):
+    """
+    What the agents of a fast game see instead of a deep copy of the state:
+    every method and attribute of the state can be used, but none can be set
+    or deleted.  Objects the state hands out (its food Grid or its data, say)
+    are its own and are not copied, so agents must still not change them.
+    """
+    __slots__ = ['_state']
+
+    def __init__( self, state ):
+        object.__setattr__(self, '_state', state)
+
+    def __getattr__( self, name ):
+        return getattr(self._state, name)
+
+    def __setattr__( self, name, value ):
+        raise AttributeError('The state of a fast game is read only')
+
+    def __delattr__( self, name ):
+        raise AttributeError('The state of a fast game is read only')
+
+    def __eq__( self, other ):
+        if isinstance(other, ReadOnlyState): other = other._state
+        return self._state == other
+
+    def __ne__( self, other ):
+        return not self == other
+
+    def __hash__( self ):
+        return hash(self._state)
+
+    def __str__( self ):
+        return str(self._state)
+
 class Game:
     """
     The Game manages the control flow, soliciting actions from agents.
     """
 
-    def __init__( self, agents, display, rules, startingIndex=0, muteAgents=False, catchExceptions=False ):
+    def __init__( self, agents, display, rules, startingIndex=0, muteAgents=False, catchExceptions=False, fast=False ):
         self.agentCrashed = False
+        self.fast = fast
         self.agents = agents
         self.display = display
         self.rules = rules
@@ -529,6 +674,8 @@ class Game:
         self.totalAgentTimes = [0 for agent in agents]
         self.totalAgentTimeWarnings = [0 for agent in agents]
         self.agentTimeout = False
+        # Receives every move as it is made (see gameLog.GameRecorder)
+        self.recorder = None
         import cStringIO
         self.agentOutput = [cStringIO.StringIO() for agent in agents]
 
@@ -569,6 +716,7 @@ class Game:
         """
         Main control loop for game play.
         """
+        if self.fast: return self._runFast()
         self.display.initialize(self.state.data)
         self.numMoves = 0
 
@@ -588,7 +736,7 @@ class Game:
                 self.mute(i)
                 if self.catchExceptions:
                     try:
-                        timed_func = TimeoutFunction(agent.registerInitialState, int(self.rules.getMaxStartupTime(i)))
+                        timed_func = TimeoutFunction(agent.registerInitialState, self.rules.getMaxStartupTime(i))
                         try:
                             start_time = time.time()
                             timed_func(self.state.deepCopy())
@@ -622,7 +770,7 @@ class Game:
                 self.mute(agentIndex)
                 if self.catchExceptions:
                     try:
-                        timed_func = TimeoutFunction(agent.observationFunction, int(self.rules.getMoveTimeout(agentIndex)))
+                        timed_func = TimeoutFunction(agent.observationFunction, self.rules.getMoveTimeout(agentIndex))
                         try:
                             start_time = time.time()
                             observation = timed_func(self.state.deepCopy())
@@ -645,7 +793,7 @@ class Game:
             self.mute(agentIndex)
             if self.catchExceptions:
                 try:
-                    timed_func = TimeoutFunction(agent.getAction, int(self.rules.getMoveTimeout(agentIndex)) - int(move_time))
+                    timed_func = TimeoutFunction(agent.getAction, self.rules.getMoveTimeout(agentIndex) - move_time)
                     try:
                         start_time = time.time()
                         if skip_action:
@@ -684,7 +832,9 @@ class Game:
                     self.unmute()
                     return
             else:
+                start_time = time.time()
                 action = agent.getAction(observation)
+                self.totalAgentTimes[agentIndex] += time.time() - start_time
             self.unmute()
 
             # Execute the action
@@ -700,6 +850,8 @@ class Game:
             else:
                 self.state = self.state.generateSuccessor( agentIndex, action )
 
+            if self.recorder is not None: self.recorder.record( agentIndex, action, self.state )
+
             # Change the display
             self.display.update( self.state.data )
             ###idx = agentIndex - agentIndex % 2 + 1
@@ -728,3 +880,95 @@ class Game:
                     self.unmute()
                     return
         self.display.finish()
+
+    def _runFast( self ):
+        """
+        Control loop for batch simulation with trusted agents.  The agents'
+        methods are looked up once, agents are handed a ReadOnlyState view of
+        the game's own state instead of a deep copy, output is
+        never muted and, instead of arming an alarm for every move, the time
+        limits are checked every TIME_CHECK_INTERVAL moves and at the end.  A
+        slow agent is therefore stopped late rather than interrupted.  The
+        moves, and so the scores, are the same as those of the normal loop.
+        """
+        self.display.initialize(self.state.data)
+        self.numMoves = 0
+        agents, rules = self.agents, self.rules
+        numAgents = len(agents)
+        for i, agent in enumerate(agents):
+            if not agent:
+                print >>sys.stderr, "Agent %d failed to load" % i
+                self._agentCrash(i, quiet=True)
+                return
+        self.moveLimits = [(rules.getMoveWarningTime(i), rules.getMaxTimeWarnings(i),
+                            rules.getMoveTimeout(i), rules.getMaxTotalTime(i)) for i in range(numAgents)]
+        self.longestMoves = [0.0 for agent in agents]
+
+        agentIndex = 0
+        clock = time.time
+        try:
+            for agentIndex, agent in enumerate(agents):
+                if 'registerInitialState' in dir(agent):
+                    start_time = clock()
+                    agent.registerInitialState(self.state.deepCopy())
+                    self.totalAgentTimes[agentIndex] += clock() - start_time
+                    if self.totalAgentTimes[agentIndex] > rules.getMaxStartupTime(agentIndex):
+                        print >>sys.stderr, "Agent %d ran out of time on startup!" % agentIndex
+                        self.agentTimeout = True
+                        self._agentCrash(agentIndex, quiet=True)
+                        return
+
+            observers = [getattr(agent, 'observationFunction', None) for agent in agents]
+            getActions = [agent.getAction for agent in agents]
+            update, process, recorder = self.display.update, rules.process, self.recorder
+            totals, longest, warnings = self.totalAgentTimes, self.longestMoves, self.totalAgentTimeWarnings
+            warningTimes = [limits[0] for limits in self.moveLimits]
+
+            agentIndex = self.startingIndex
+            moves = 0
+            while not self.gameOver:
+                start_time = clock()
+                observation = ReadOnlyState(self.state)
+                observe = observers[agentIndex]
+                if observe is not None: observation = observe(observation)
+                action = getActions[agentIndex](observation)
+                move_time = clock() - start_time
+                totals[agentIndex] += move_time
+                if move_time > longest[agentIndex]: longest[agentIndex] = move_time
+                if move_time > warningTimes[agentIndex]: warnings[agentIndex] += 1
+
+                self.moveHistory.append( (agentIndex, action) )
+                self.state = self.state.generateSuccessor( agentIndex, action )
+                if recorder is not None: recorder.record( agentIndex, action, self.state )
+                update( self.state.data )
+                process( self.state, self )
+                agentIndex = ( agentIndex + 1 ) % numAgents
+
+                moves += 1
+                if self.catchExceptions and moves % TIME_CHECK_INTERVAL == 0 and self._outOfTime(): return
+            if self.catchExceptions and self._outOfTime(): return
+
+            for agentIndex, agent in enumerate(agents):
+                if "final" in dir( agent ): agent.final( ReadOnlyState(self.state) )
+        except Exception,data:
+            if not self.catchExceptions: raise
+            self._agentCrash(agentIndex)
+            return
+        self.display.finish()
+
+    def _outOfTime( self ):
+        "Ends the game if an agent broke a time limit; used by fast games"
+        for agentIndex, limits in enumerate(self.moveLimits):
+            warningTime, maxWarnings, moveTimeout, maxTotalTime = limits
+            if self.longestMoves[agentIndex] > moveTimeout:
+                print >>sys.stderr, "Agent %d timed out on a single move!" % agentIndex
+            elif self.totalAgentTimeWarnings[agentIndex] > maxWarnings:
+                print >>sys.stderr, "Agent %d exceeded the maximum number of warnings: %d" % (agentIndex, maxWarnings)
+            elif self.totalAgentTimes[agentIndex] > maxTotalTime:
+                print >>sys.stderr, "Agent %d ran out of time! (time: %1.2f)" % (agentIndex, self.totalAgentTimes[agentIndex])
+            else:
+                continue
+            self.agentTimeout = True
+            self._agentCrash(agentIndex, quiet=True)
+            return True
+        return False
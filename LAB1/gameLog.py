@@ -0,0 +1,253 @@
+# gameLog.py
+# ----------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+A streaming binary log of a Pacman game, written move by move while the game
+is played (pacman.py -r) and replayed with pacman.py --replay, which can jump
+straight to a move with --seek.
+
+A log starts with a header
+
+  'PLOG', version (uint16), number of ghosts (uint16),
+  layout text length (uint32), layout text (the rows of the layout joined
+  with newlines)
+
+followed by one varint per move holding agentIndex << 3 | action code.  Every
+KEYFRAME_INTERVAL moves, starting before the first move, a keyframe holds the
+whole state: the varint KEYFRAME, the number of moves made so far (varint),
+the length of the state (varint) and the pickled state.  A finished log ends
+with an index of the keyframes (varint pairs of move number and file offset)
+and a trailer
+
+  index offset (uint64), number of moves (uint32), 'PEND'
+
+A log without a trailer (a game that was stopped) is read by scanning it.
+"""
+
+from game import Directions, reconstituteGrid
+import cPickle
+import struct
+import bisect
+
+MAGIC = 'PLOG'
+VERSION = 1
+HEADER = struct.Struct('<4sHHI')
+TRAILER = struct.Struct('<QI4s')
+TRAILER_MAGIC = 'PEND'
+KEYFRAME_INTERVAL = 100
+
+ACTIONS = [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST, Directions.STOP]
+ACTION_CODES = dict([(action, code) for code, action in enumerate(ACTIONS)])
+KEYFRAME = 7
+
+def writeVarint(stream, value):
+    bytes = []
+    while value >= 0x80:
+        bytes.append(chr((value & 0x7F) | 0x80))
+        value >>= 7
+    bytes.append(chr(value))
+    stream.write(''.join(bytes))
+
+def readVarint(buffer, offset):
+    "Returns the varint at offset in buffer and the offset after it"
+    value, shift = 0, 0
+    while True:
+        byte = ord(buffer[offset])
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80: return value, offset
+        shift += 7
+
+def packState(data):
+    "The parts of a GameStateData that change during a game, pickled"
+    agents = [(agent.configuration, agent.scaredTimer, agent.numCarrying, agent.numReturned)
+              for agent in data.agentStates]
+    return cPickle.dumps((data.food.packBits(), data.capsules, agents, data.score,
+                          data._win, data._lose, data._eaten), 2)
+
+def unpackState(packed, layout, numGhosts):
+    "Builds a GameState on layout from the output of packState"
+    import pacman
+    state = pacman.GameState()
+    state.initialize(layout, numGhosts)
+    data = state.data
+    food, capsules, agents, score, win, lose, eaten = cPickle.loads(packed)
+    data.food = reconstituteGrid(food)
+    data.capsules = capsules
+    for agentState, agent in zip(data.agentStates, agents):
+        agentState.configuration, agentState.scaredTimer, agentState.numCarrying, agentState.numReturned = agent
+    data.score, data._win, data._lose, data._eaten = score, win, lose, eaten
+    # The hash key is recomputed from the restored parts when it is needed
+    data._foodKey = None
+    data._key = None
+    return state
+
+class GameRecorder:
+    """
+    Writes the log of a game into stream.  Game.run calls record after every
+    move; the log is flushed at every keyframe, so the moves up to the last
+    keyframe survive a crash.
+    """
+    def __init__(self, stream, initialState, keyframeInterval=KEYFRAME_INTERVAL):
+        self.stream = stream
+        self.keyframeInterval = keyframeInterval
+        self.numMoves = 0
+        self.keyframes = []
+        layout = initialState.data.layout
+        self.numGhosts = initialState.getNumAgents() - 1
+        text = '\n'.join(layout.layoutText)
+        stream.write(HEADER.pack(MAGIC, VERSION, self.numGhosts, len(text)))
+        stream.write(text)
+        self.offset = HEADER.size + len(text)
+        self.writeKeyframe(initialState)
+
+    def record(self, agentIndex, action, state):
+        "Appends a move and the state it led to"
+        value = agentIndex << 3 | ACTION_CODES[action]
+        self.write(value)
+        self.numMoves += 1
+        if self.numMoves % self.keyframeInterval == 0: self.writeKeyframe(state)
+
+    def write(self, value):
+        writeVarint(self.stream, value)
+        self.offset += 1
+        while value >= 0x80:
+            value >>= 7
+            self.offset += 1
+
+    def writeKeyframe(self, state):
+        self.keyframes.append((self.numMoves, self.offset))
+        packed = packState(state.data)
+        self.write(KEYFRAME)
+        self.write(self.numMoves)
+        self.write(len(packed))
+        self.stream.write(packed)
+        self.offset += len(packed)
+        self.stream.flush()
+
+    def close(self):
+        if self.stream is None: return
+        indexOffset = self.offset
+        for numMoves, offset in self.keyframes:
+            self.write(numMoves)
+            self.write(offset)
+        self.stream.write(TRAILER.pack(indexOffset, self.numMoves, TRAILER_MAGIC))
+        self.stream.close()
+        self.stream = None
+
+def isGameLog(fileName):
+    f = open(fileName, 'rb')
+    try: return f.read(len(MAGIC)) == MAGIC
+    finally: f.close()
+
+class GameLogReader:
+    """
+    Reads a game log.  Only the header and the index are read up front; the
+    moves after a keyframe are read when a replay reaches them.
+    """
+    def __init__(self, fileName):
+        import layout
+        self.file = open(fileName, 'rb')
+        magic, version, self.numGhosts, textLength = HEADER.unpack(self.file.read(HEADER.size))
+        if magic != MAGIC: raise Exception('%s is not a game log' % fileName)
+        if version != VERSION: raise Exception('Unsupported game log version %d' % version)
+        self.layout = layout.Layout(self.file.read(textLength).split('\n'))
+
+        self.file.seek(0, 2)
+        self.end = self.file.tell()
+        self.file.seek(self.end - TRAILER.size)
+        indexOffset, self.numMoves, trailerMagic = TRAILER.unpack(self.file.read(TRAILER.size))
+        if trailerMagic == TRAILER_MAGIC:
+            self.file.seek(indexOffset)
+            index = self.file.read(self.end - TRAILER.size - indexOffset)
+            self.end = indexOffset
+            self.keyframes, offset = [], 0
+            while offset < len(index):
+                numMoves, offset = readVarint(index, offset)
+                keyframeOffset, offset = readVarint(index, offset)
+                self.keyframes.append((numMoves, keyframeOffset))
+        else:
+            self.scan(HEADER.size + textLength)
+        self.keyframeMoves = [numMoves for numMoves, offset in self.keyframes]
+
+    def scan(self, start):
+        "Builds the index of a log that was not closed"
+        self.file.seek(start)
+        buffer = self.file.read(self.end - start)
+        self.keyframes, self.numMoves = [], 0
+        offset = 0
+        try:
+            while offset < len(buffer):
+                recordOffset = offset
+                value, offset = readVarint(buffer, offset)
+                if value == KEYFRAME:
+                    numMoves, offset = readVarint(buffer, offset)
+                    length, offset = readVarint(buffer, offset)
+                    if offset + length > len(buffer): break
+                    self.keyframes.append((numMoves, start + recordOffset))
+                    offset += length
+                else:
+                    self.numMoves += 1
+        except IndexError:
+            pass # the last record was cut off
+
+    def readFrom(self, keyframe):
+        """
+        Returns the pickled state of a keyframe (see unpackState) and the moves
+        recorded after it, up to the next keyframe.
+        """
+        numMoves, offset = self.keyframes[keyframe]
+        end = self.end
+        if keyframe + 1 < len(self.keyframes): end = self.keyframes[keyframe + 1][1]
+        self.file.seek(offset)
+        buffer = self.file.read(end - offset)
+        marker, position = readVarint(buffer, 0)
+        numMoves, position = readVarint(buffer, position)
+        length, position = readVarint(buffer, position)
+        packed = buffer[position:position + length]
+        moves = []
+        position += length
+        try:
+            while position < len(buffer):
+                value, position = readVarint(buffer, position)
+                moves.append((value >> 3, ACTIONS[value & 7]))
+        except IndexError:
+            pass
+        return packed, moves
+
+    def stateAt(self, numMoves):
+        """
+        Returns the state after numMoves moves: the closest keyframe before it
+        is loaded and the remaining moves are played.
+        """
+        numMoves = max(0, min(numMoves, self.numMoves))
+        keyframe = bisect.bisect_right(self.keyframeMoves, numMoves) - 1
+        packed, moves = self.readFrom(keyframe)
+        state = unpackState(packed, self.layout, self.numGhosts)
+        for agentIndex, action in moves[:numMoves - self.keyframeMoves[keyframe]]:
+            state = state.generateSuccessor(agentIndex, action)
+        return state
+
+    def moves(self, start=0):
+        "Yields the (agentIndex, action) moves from move start on"
+        keyframe = bisect.bisect_right(self.keyframeMoves, start) - 1
+        skip = start - self.keyframeMoves[keyframe]
+        for keyframe in range(keyframe, len(self.keyframes)):
+            packed, moves = self.readFrom(keyframe)
+            for move in moves[skip:]:
+                yield move
+            skip = 0
+
+    def close(self):
+        self.file.close()
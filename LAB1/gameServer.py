@@ -0,0 +1,603 @@
+# gameServer.py
+# -------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+A server that plays many games of Pacman at once against Pacman agents that
+connect to it over local sockets, a client for those agents, and a load test.
+
+Every connection plays one game at a time: the client asks to join, the
+server starts a Game on its layout with its own ghosts, and every move of
+Pacman is a request sent to the client with a deadline of
+ClassicGameRules.getMoveTimeout (plus getMaxStartupTime for the first move,
+which also runs registerInitialState).  A Pacman that misses a deadline loses
+the game, and an answer that comes too late is ignored.  Once the game is over
+the client gets the final state and may join again.  At most maxGames games
+are played at once; later joins wait their turn.
+
+One thread runs the event loop, which waits on all sockets and on the next
+deadline with epoll (or poll where there is no epoll), so it is not limited
+to the first FD_SETSIZE descriptors like select.  When the process runs out
+of descriptors the server stops accepting until a connection closes.  Moves are played (Pacman's move, then every ghost's) in
+a pool of threads, so the loop keeps answering while a round is computed.  The
+threads share the interpreter lock, so CPU heavy ghosts are not played faster,
+only without stalling other games' sockets.
+
+Messages are pickles sent with their length in front.  Pickles must only be
+accepted from trusted programs, so the server only listens on 127.0.0.1.
+States are sent without their layout; the text of a layout is sent once per
+connection.  For example:
+
+> python gameServer.py -l mediumClassic -g DirectionalGhost --port 5050
+> python gameServer.py --client -p GreedyAgent --port 5050 -n 10
+> python gameServer.py --loadTest -c 300 -n 2 -l smallClassic
+"""
+
+from multiprocessing.pool import ThreadPool
+import textDisplay
+import pacman
+import layout
+import Queue
+import socket
+import select
+import struct
+import cPickle
+import heapq
+import errno
+import copy
+import time
+import os
+
+LENGTH = struct.Struct('>I')
+HOST = '127.0.0.1'
+
+def packMessage(message):
+    data = cPickle.dumps(message, 2)
+    return LENGTH.pack(len(data)) + data
+
+def lightState(state):
+    "A copy of state without its layout, for sending"
+    light = copy.copy(state)
+    light.data = copy.copy(state.data)
+    light.data.layout = None
+    return light
+
+class Connection:
+    "A client socket of the server, with what was read and what is left to write"
+    def __init__(self, sock):
+        self.sock = sock
+        self.received = ''
+        self.toSend = ''
+        self.layouts = set()
+        self.match = None
+        self.waiting = False
+        self.closed = False
+        self.fd = sock.fileno()
+        self.events = 0
+
+    def send(self, message):
+        self.toSend += packMessage(message)
+
+    def messages(self):
+        "The whole messages received so far"
+        messages = []
+        while len(self.received) >= LENGTH.size:
+            length = LENGTH.unpack(self.received[:LENGTH.size])[0]
+            end = LENGTH.size + length
+            if len(self.received) < end: break
+            messages.append(cPickle.loads(self.received[LENGTH.size:end]))
+            self.received = self.received[end:]
+        return messages
+
+class Poller:
+    "Waits on file descriptors with epoll, or poll where there is no epoll"
+    def __init__(self):
+        if hasattr(select, 'epoll'):
+            self.poller = select.epoll()
+            self.READ, self.WRITE = select.EPOLLIN, select.EPOLLOUT
+            self.ERROR = select.EPOLLERR | select.EPOLLHUP
+            self.wait = lambda timeout: self.poller.poll(-1 if timeout is None else timeout)
+        else:
+            self.poller = select.poll()
+            self.READ, self.WRITE = select.POLLIN, select.POLLOUT
+            self.ERROR = select.POLLERR | select.POLLHUP | select.POLLNVAL
+            self.wait = lambda timeout: self.poller.poll(None if timeout is None else timeout * 1000)
+
+    def register(self, fd, events):
+        self.poller.register(fd, events)
+
+    def modify(self, fd, events):
+        self.poller.modify(fd, events)
+
+    def unregister(self, fd):
+        self.poller.unregister(fd)
+
+    def close(self):
+        if hasattr(self.poller, 'close'): self.poller.close()
+
+class RemotePacman:
+    "Stands for the Pacman of a client in a Game; the server asks it for moves itself"
+    pass
+
+class Match:
+    "A game played by the Pacman of a connection against the ghosts of the server"
+    def __init__(self, server, connection, matchId):
+        self.server = server
+        self.connection = connection
+        self.matchId = matchId
+        self.rules = pacman.ClassicGameRules(server.timeout)
+        ghosts = [server.ghostType(i + 1) for i in range(server.layout.getNumGhosts())]
+        self.game = self.rules.newGame(server.layout, RemotePacman(), ghosts, textDisplay.NullGraphics(), True)
+        self.game.numMoves = 0
+        self.number = 0
+        self.pending = None
+        self.sentAt = None
+
+    def requestMove(self):
+        "Sends the state to the client and sets the deadline of its answer"
+        self.number += 1
+        self.pending = self.number
+        first = self.number == 1
+        timeout = self.rules.getMoveTimeout(0)
+        if first: timeout += self.rules.getMaxStartupTime(0)
+        self.sentAt = time.time()
+        self.server.sendLayout(self.connection)
+        self.connection.send(('getAction', self.number, self.server.layoutKey, lightState(self.game.state), first))
+        self.server.setDeadline(self.sentAt + timeout, self, self.number)
+
+    def receiveMove(self, number, action):
+        if number != self.pending: return # the answer to a move that timed out
+        self.pending = None
+        self.server.latencies.append(time.time() - self.sentAt)
+        self.server.execute(self, playRound, (self.game, action))
+
+    def timeout(self, number):
+        if number != self.pending: return
+        self.pending = None
+        self.game.agentTimeout = True
+        self.game.gameOver = True
+        self.finish('timeout')
+
+    def roundPlayed(self, error):
+        if error is not None:
+            self.game.agentCrashed = True
+            self.game.gameOver = True
+            self.finish(error)
+        elif self.game.gameOver:
+            self.finish(None)
+        else:
+            self.requestMove()
+
+    def finish(self, reason):
+        state = self.game.state
+        self.connection.send(('final', self.server.layoutKey, lightState(state), state.getScore(), state.isWin(), reason))
+        self.server.matchOver(self)
+
+def playRound(game, action):
+    """
+    Plays Pacman's move and the ghosts' moves after it.  Runs in the thread
+    pool; returns the text of an error caused by Pacman's move, or None.
+    """
+    try:
+        game.state = game.state.generateSuccessor(0, action)
+    except Exception, e:
+        return 'Pacman made an illegal move: %s' % e
+    game.moveHistory.append((0, action))
+    game.rules.process(game.state, game)
+    for index in range(1, len(game.agents)):
+        if game.gameOver: break
+        ghostAction = game.agents[index].getAction(game.state)
+        game.state = game.state.generateSuccessor(index, ghostAction)
+        game.moveHistory.append((index, ghostAction))
+        game.rules.process(game.state, game)
+    game.numMoves += 1
+    return None
+
+class GameServer:
+    """
+    Plays games on one layout against the clients connected to address.
+    serveForever runs the event loop until stop is called (from any thread).
+    """
+    def __init__(self, gameLayout, ghostType, port=0, maxGames=1000, workers=4, timeout=30):
+        self.layout = gameLayout
+        self.layoutKey = gameLayout.contentKey
+        self.ghostType = ghostType
+        self.maxGames = maxGames
+        self.timeout = timeout
+        self.listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.listener.bind((HOST, port))
+        self.listener.listen(1024)
+        self.listener.setblocking(0)
+        self.address = self.listener.getsockname()
+        self.pool = ThreadPool(workers)
+        self.done = Queue.Queue()
+        self.wakeRead, self.wakeWrite = os.pipe()
+        self.poller = Poller()
+        self.accepting = False
+        self.connections = {}
+        self.waiting = []
+        self.deadlines = []
+        self.running = False
+        self.numMatches = 0
+        self.active = 0
+        self.maxActive = 0
+        self.results = []
+        self.latencies = []
+        self.error = None
+
+    def wake(self):
+        os.write(self.wakeWrite, 'x')
+
+    def stop(self):
+        self.running = False
+        self.wake()
+
+    def setDeadline(self, deadline, match, number):
+        heapq.heappush(self.deadlines, (deadline, match.matchId, match, number))
+
+    def execute(self, match, function, args):
+        "Runs function in the thread pool and calls match.roundPlayed in the loop with its result"
+        def callback(result):
+            self.done.put((match, result))
+            self.wake()
+        def run(*args):
+            try:
+                return function(*args)
+            except Exception, e:
+                return 'The server failed to play the round: %s' % e
+        self.pool.apply_async(run, args, callback=callback)
+
+    def sendLayout(self, connection):
+        if self.layoutKey not in connection.layouts:
+            connection.send(('layout', self.layoutKey, '\n'.join(self.layout.layoutText)))
+            connection.layouts.add(self.layoutKey)
+
+    def join(self, connection):
+        if connection.match is not None or connection.waiting: return
+        if self.active >= self.maxGames:
+            connection.waiting = True
+            self.waiting.append(connection)
+            return
+        self.numMatches += 1
+        self.active += 1
+        self.maxActive = max(self.maxActive, self.active)
+        connection.match = Match(self, connection, self.numMatches)
+        connection.match.requestMove()
+
+    def matchOver(self, match):
+        state = match.game.state
+        self.results.append((state.getScore(), state.isWin(), match.game.numMoves))
+        match.connection.match = None
+        self.active -= 1
+        self.startWaiting()
+
+    def startWaiting(self):
+        "Starts the games of waiting connections while fewer than maxGames are played"
+        while self.waiting and self.active < self.maxGames:
+            connection = self.waiting.pop(0)
+            connection.waiting = False
+            if not connection.closed: self.join(connection)
+
+    def close(self, connection):
+        if connection.match is not None:
+            match = connection.match
+            match.pending = None
+            match.game.gameOver = True
+            self.results.append((match.game.state.getScore(), False, match.game.numMoves))
+            connection.match = None
+            self.active -= 1
+        if connection in self.waiting: self.waiting.remove(connection)
+        del self.connections[connection.fd]
+        connection.closed = True
+        self.poller.unregister(connection.fd)
+        connection.sock.close()
+        if self.running:
+            self.startWaiting()
+            if not self.accepting: self.listen()
+
+    def handle(self, connection, message):
+        if message[0] == 'join':
+            self.join(connection)
+        elif message[0] == 'action' and connection.match is not None:
+            connection.match.receiveMove(message[1], message[2])
+
+    def listen(self):
+        self.poller.register(self.listener.fileno(), self.poller.READ)
+        self.accepting = True
+
+    def serveForever(self):
+        """
+        Runs the event loop until stop is called.  If the loop fails, every
+        connection is closed, so no client waits for an answer, and the error
+        is raised again.
+        """
+        self.running = True
+        poller = self.poller
+        listenerFd = self.listener.fileno()
+        poller.register(self.wakeRead, poller.READ)
+        self.listen()
+        try:
+            while self.running:
+                for connection in self.connections.values():
+                    events = connection.toSend and poller.READ | poller.WRITE or poller.READ
+                    if events != connection.events:
+                        poller.modify(connection.fd, events)
+                        connection.events = events
+                timeout = None
+                if self.deadlines: timeout = max(0, self.deadlines[0][0] - time.time())
+                try:
+                    ready = poller.wait(timeout)
+                except (IOError, OSError, select.error), e:
+                    if e.args[0] == errno.EINTR: continue
+                    raise
+
+                for fd, events in ready:
+                    if fd == listenerFd: self.accept()
+                    elif fd == self.wakeRead: os.read(self.wakeRead, 4096)
+                    else:
+                        connection = self.connections.get(fd)
+                        if connection is not None and events & (poller.READ | poller.ERROR):
+                            self.read(connection)
+                        if connection is not None and not connection.closed and events & poller.WRITE:
+                            self.write(connection)
+                while True:
+                    try: match, error = self.done.get_nowait()
+                    except Queue.Empty: break
+                    if match.connection.match is match: match.roundPlayed(error)
+                now = time.time()
+                while self.deadlines and self.deadlines[0][0] <= now:
+                    deadline, matchId, match, number = heapq.heappop(self.deadlines)
+                    if match.connection.match is match: match.timeout(number)
+        except Exception, e:
+            self.error = e
+            raise
+        finally:
+            self.running = False
+            for connection in self.connections.values():
+                try: self.close(connection)
+                except Exception: pass
+            self.listener.close()
+            self.poller.close()
+            self.pool.close()
+            self.pool.join()
+
+    def accept(self):
+        while True:
+            try:
+                sock, address = self.listener.accept()
+            except socket.error, e:
+                if e.args[0] in (errno.EAGAIN, errno.EWOULDBLOCK): return
+                if e.args[0] in (errno.EMFILE, errno.ENFILE, errno.ENOBUFS, errno.ENOMEM):
+                    # Out of descriptors: leave the rest in the backlog until a connection closes
+                    self.poller.unregister(self.listener.fileno())
+                    self.accepting = False
+                    return
+                raise
+            sock.setblocking(0)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            connection = Connection(sock)
+            self.connections[connection.fd] = connection
+            self.poller.register(connection.fd, self.poller.READ)
+            connection.events = self.poller.READ
+
+    def read(self, connection):
+        try:
+            data = connection.sock.recv(65536)
+        except socket.error, e:
+            if e.args[0] in (errno.EAGAIN, errno.EWOULDBLOCK): return
+            data = ''
+        if not data:
+            self.close(connection)
+            return
+        connection.received += data
+        for message in connection.messages():
+            self.handle(connection, message)
+
+    def write(self, connection):
+        try:
+            sent = connection.sock.send(connection.toSend)
+        except socket.error, e:
+            if e.args[0] in (errno.EAGAIN, errno.EWOULDBLOCK): return
+            self.close(connection)
+            return
+        connection.toSend = connection.toSend[sent:]
+
+##########
+# Client #
+##########
+
+class GameClient:
+    """
+    Plays the games of a server with a Pacman agent, which is called as in a
+    Game: registerInitialState before its first move, getAction for every
+    move and final at the end, if it has them.
+    """
+    def __init__(self, agent, port, host=HOST):
+        self.agent = agent
+        self.sock = socket.create_connection((host, port))
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.layouts = {}
+        self.received = ''
+
+    def send(self, message):
+        self.sock.sendall(packMessage(message))
+
+    def receive(self):
+        while True:
+            if len(self.received) >= LENGTH.size:
+                end = LENGTH.size + LENGTH.unpack(self.received[:LENGTH.size])[0]
+                if len(self.received) >= end:
+                    message = cPickle.loads(self.received[LENGTH.size:end])
+                    self.received = self.received[end:]
+                    return message
+            data = self.sock.recv(65536)
+            if not data: raise Exception('The server closed the connection')
+            self.received += data
+
+    def play(self, numGames=1):
+        "Plays numGames games one after the other and returns their (score, win, reason)"
+        results = []
+        agent = self.agent
+        for i in range(numGames):
+            self.send(('join',))
+            while True:
+                message = self.receive()
+                if message[0] == 'layout':
+                    key, text = message[1:]
+                    self.layouts[key] = layout.Layout(text.split('\n'))
+                elif message[0] == 'getAction':
+                    number, key, state, first = message[1:]
+                    state.data.layout = self.layouts[key]
+                    if first and 'registerInitialState' in dir(agent): agent.registerInitialState(state)
+                    self.send(('action', number, agent.getAction(state)))
+                elif message[0] == 'final':
+                    key, state, score, win, reason = message[1:]
+                    state.data.layout = self.layouts[key]
+                    if 'final' in dir(agent): agent.final(state)
+                    results.append((score, win, reason))
+                    break
+        return results
+
+    def close(self):
+        self.sock.close()
+
+#############
+# Load test #
+#############
+
+def _runClients(port, agentName, numClients, numGames, results):
+    "Plays numGames games on each of numClients connections, one thread each"
+    import threading
+    agentType = pacman.loadAgent(agentName, True)
+    def playGames():
+        client = GameClient(agentType(), port)
+        try:
+            results.put(client.play(numGames))
+        except Exception, e:
+            results.put(str(e))
+        client.close()
+    threads = [threading.Thread(target=playGames) for i in range(numClients)]
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+
+def runLoadTest(server, agentName, numClients, numGames, processes=4):
+    """
+    Connects numClients clients, spread over processes, that each play
+    numGames games, while server runs in a thread of this process, and
+    prints how the server kept up.
+    """
+    import threading, multiprocessing
+    loop = threading.Thread(target=server.serveForever)
+    loop.start()
+    results = multiprocessing.Queue()
+    start = time.time()
+    workers = []
+    for i in range(processes):
+        share = numClients / processes + (i < numClients % processes)
+        worker = multiprocessing.Process(target=_runClients, args=(server.address[1], agentName, share, numGames, results))
+        worker.start()
+        workers.append(worker)
+    outcomes = []
+    while len(outcomes) < numClients and loop.is_alive():
+        try:
+            outcomes.append(results.get(timeout=1))
+        except Queue.Empty:
+            if not [worker for worker in workers if worker.is_alive()]: break
+    elapsed = time.time() - start
+    if len(outcomes) < numClients:
+        for worker in workers: worker.terminate()
+        for worker in workers: worker.join()
+        server.stop()
+        loop.join()
+        if server.error is not None:
+            print 'The server failed after %.2fs: %r' % (elapsed, server.error)
+        else:
+            print 'The clients stopped after %.2fs' % elapsed
+        print '%d of %d clients finished, %d games played' % (len(outcomes), numClients, len(server.results))
+        return
+    for worker in workers: worker.join()
+    server.stop()
+    loop.join()
+
+    failures = [outcome for outcome in outcomes if isinstance(outcome, str)]
+    games = [game for outcome in outcomes if not isinstance(outcome, str) for game in outcome]
+    moves = sum([numMoves for score, win, numMoves in server.results])
+    latencies = sorted(server.latencies)
+    print '%d clients, %d games in %.2fs, at most %d at once' % (numClients, len(games), elapsed, server.maxActive)
+    print '%d Pacman moves (%.0f moves/s)' % (moves, moves / elapsed)
+    if latencies:
+        print 'Move round trip: median %.1fms, 99th percentile %.1fms' % \
+            (latencies[len(latencies) / 2] * 1000, latencies[len(latencies) * 99 / 100] * 1000)
+    print 'Wins: %d, timeouts or errors: %d, failed clients: %d' % \
+        (len([g for g in games if g[1]]), len([g for g in games if g[2] is not None]), len(failures))
+    for failure in failures[:5]: print 'Client failed:', failure
+
+def readCommand(argv):
+    from optparse import OptionParser
+    usageStr = """
+    USAGE:      python gameServer.py <options>
+    EXAMPLES:   python gameServer.py -l mediumClassic --port 5050
+                python gameServer.py --client -p GreedyAgent --port 5050 -n 10
+                python gameServer.py --loadTest -c 300 -n 2 -l smallClassic
+    """
+    parser = OptionParser(usageStr)
+    parser.add_option('-l', '--layout', dest='layout', default='mediumClassic',
+                      help='The layout the server plays on [Default: %default]')
+    parser.add_option('-g', '--ghosts', dest='ghost', default='RandomGhost',
+                      help='The ghost agent of the server [Default: %default]')
+    parser.add_option('--port', dest='port', type='int', default=0,
+                      help='Port on 127.0.0.1 (0 picks a free one) [Default: %default]')
+    parser.add_option('--maxGames', dest='maxGames', type='int', default=1000,
+                      help='Most games played at once [Default: %default]')
+    parser.add_option('-w', '--workers', dest='workers', type='int', default=4,
+                      help='Threads that play the rounds [Default: %default]')
+    parser.add_option('--timeout', dest='timeout', type='int', default=30,
+                      help='Seconds Pacman may take for a move [Default: %default]')
+    parser.add_option('--client', action='store_true', dest='client', default=False,
+                      help='Play the games of a running server with a Pacman agent')
+    parser.add_option('-p', '--pacman', dest='pacman', default='GreedyAgent',
+                      help='The Pacman agent of --client and --loadTest [Default: %default]')
+    parser.add_option('-n', '--numGames', dest='numGames', type='int', default=1,
+                      help='Games every client plays [Default: %default]')
+    parser.add_option('--loadTest', action='store_true', dest='loadTest', default=False,
+                      help='Start a server and connect many clients to it')
+    parser.add_option('-c', '--clients', dest='clients', type='int', default=200,
+                      help='Clients of --loadTest [Default: %default]')
+    parser.add_option('--processes', dest='processes', type='int', default=4,
+                      help='Processes the clients of --loadTest run in [Default: %default]')
+    options, args = parser.parse_args(argv)
+    if args: parser.error('Unrecognized arguments: ' + ' '.join(args))
+    return options
+
+if __name__ == '__main__':
+    import sys
+    options = readCommand(sys.argv[1:])
+    if options.client:
+        client = GameClient(pacman.loadAgent(options.pacman, True)(), options.port)
+        for score, win, reason in client.play(options.numGames):
+            print 'Score: %d %s%s' % (score, win and 'Win' or 'Loss', reason and ' (%s)' % reason or '')
+        client.close()
+    else:
+        gameLayout = layout.getLayout(options.layout)
+        if gameLayout == None: raise Exception("The layout " + options.layout + " cannot be found")
+        server = GameServer(gameLayout, pacman.loadAgent(options.ghost, True), options.port,
+                            options.maxGames, options.workers, options.timeout)
+        if options.loadTest:
+            runLoadTest(server, options.pacman, options.clients, options.numGames, options.processes)
+        else:
+            print 'Serving %s on %s:%d' % (options.layout, server.address[0], server.address[1])
+            try:
+                server.serveForever()
+            except KeyboardInterrupt:
+                pass
@@ -22,6 +22,9 @@ import pdb
 from collections import defaultdict
 import util
 
+# Seconds a question may take before it is stopped
+QUESTION_TIMEOUT = 300
+
 class Grades:
   "A data structure for project grades, along with formatting code to display them"
   def __init__(self, projectName, questionsAndMaxesList, edxOutput=False, muteOutput=False):
@@ -72,8 +75,9 @@ class Grades:
 
       if self.mute: util.mutePrint()
       try:
-        util.TimeoutFunction(getattr(gradingModule, q),300)(self) # Call the question's function
-        #TimeoutFunction(getattr(gradingModule, q),1200)(self) # Call the question's function
+        util.TimeoutFunction(getattr(gradingModule, q), QUESTION_TIMEOUT)(self) # Call the question's function
+      except util.TimeoutFunctionException:
+        self.fail('FAIL: Question %s did not finish within %d seconds' % (q, QUESTION_TIMEOUT))
       except Exception, inst:
         self.addExceptionMessage(q, inst, traceback)
         self.addErrorHints(exceptionMap, inst, q[1])
@@ -14,6 +14,7 @@
 
 from graphicsUtils import *
 import math, time
+import threading, Queue, traceback
 from game import Directions
 
 ###########################
@@ -176,6 +177,10 @@ class PacmanGraphics:
 
         # Information
         self.previousState = state
+        # What redraw last drew
+        self.drawnFood = self.layout.food
+        self.drawnCapsules = self.layout.capsules
+        self.drawnScore = None
 
     def startGraphics(self, state):
         self.layout = state.layout
@@ -253,6 +258,44 @@ class PacmanGraphics:
         if 'ghostDistances' in dir(newState):
             self.infoPane.updateGhostDistances(newState.ghostDistances)
 
+    def redraw(self, newState):
+        """
+        Brings the picture up to newState in one step, without animation:
+        only the agents whose position, direction or colour changed are
+        moved, and only the food and capsules that are gone are removed, so
+        any number of moves can be skipped between two calls.
+        """
+        for index, agentState in enumerate(newState.agentStates):
+            prevState, image = self.agentImages[index]
+            if prevState.isPacman != agentState.isPacman:
+                self.swapImages(index, agentState)
+                continue
+            if prevState.configuration == agentState.configuration and \
+               (prevState.scaredTimer > 0) == (agentState.scaredTimer > 0): continue
+            if agentState.isPacman:
+                self.movePacman(self.getPosition(agentState), self.getDirection(agentState), image)
+            else:
+                self.moveGhost(agentState, index, prevState, image)
+            self.agentImages[index] = (agentState, image)
+
+        # Food grids share the columns that did not change (see Grid.withCell)
+        food, drawn = newState.food, self.drawnFood
+        if food is not drawn:
+            for x in range(food.width):
+                column, drawnColumn = food.data[x], drawn.data[x]
+                if column is drawnColumn: continue
+                for y in range(food.height):
+                    if drawnColumn[y] and not column[y]: self.removeFood((x, y), self.food)
+            self.drawnFood = food
+        if newState.capsules is not self.drawnCapsules:
+            for capsule in self.drawnCapsules:
+                if capsule not in newState.capsules: self.removeCapsule(capsule, self.capsules)
+            self.drawnCapsules = newState.capsules
+        if newState.score != self.drawnScore:
+            self.infoPane.updateScore(newState.score)
+            self.drawnScore = newState.score
+        refresh()
+
     def make_window(self, width, height):
         grid_width = (width-1) * self.gridSize
         grid_height = (height-1) * self.gridSize
@@ -565,11 +608,19 @@ class PacmanGraphics:
         """
         Draws an overlay of expanded grid positions for search agents
         """
-        n = float(len(cells))
-        baseColor = [1.0, 0.0, 0.0]
         self.clearExpandedCells()
         self.expandedCells = []
-        for k, cell in enumerate(cells):
+        self.addExpandedCells(cells, 0, len(cells))
+
+    def addExpandedCells(self, cells, first, total):
+        """
+        Draws more expanded cells on top of the ones already shown, coloured as
+        the cells number first, first + 1, ... of total expanded cells
+        """
+        n = float(max(total, 1))
+        baseColor = [1.0, 0.0, 0.0]
+        if 'expandedCells' not in dir(self): self.expandedCells = []
+        for k, cell in enumerate(cells, first):
             screenPos = self.to_screen( cell)
             cellColor = formatColor(*[(n-k) * c * .5 / n + .25 for c in baseColor])
             block = square(screenPos,
@@ -608,6 +659,110 @@ class PacmanGraphics:
                 changeColor(image, formatColor(*color))
         refresh()
 
+class ThreadedDisplay:
+    """
+    Draws the games of a display in a thread of its own (pacman.py
+    --asyncGraphics), so that the game loop never waits for the display.
+    The thread is started by initialize and ends with finish.
+
+    The game loop hands every new state to update, which only puts it on a
+    queue of at most maxFrames states; when the queue is full the state is
+    dropped.  The drawing thread takes the newest state waiting, skipping the
+    older ones, draws it with the display's redraw (update, for displays
+    without one) and then waits frameTime seconds.  States are never changed
+    once the game has moved on from them, so they are passed without copying.
+
+    All graphics calls, including initialize and finish, are made by the
+    drawing thread, so agents that read the keyboard cannot be used.
+    """
+    def __init__(self, display, maxFrames=2):
+        self.display = display
+        self.frameTime = max(getattr(display, 'frameTime', 0), 0)
+        self.queue = Queue.Queue(maxFrames)
+        self.thread = None
+        self.latest = None
+        self.frames = 0
+        self.dropped = 0
+
+    def send(self, kind, payload=None):
+        "Queues a message that must not be dropped"
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, name='ThreadedDisplay')
+            self.thread.daemon = True
+            self.thread.start()
+        self.queue.put((kind, payload))
+
+    def initialize(self, state, isBlue=False):
+        self.latest = None
+        self.send('call', ('initialize', (state, isBlue)))
+
+    def update(self, newState):
+        try:
+            self.queue.put_nowait(('frame', newState))
+            self.latest = None
+        except Queue.Full:
+            self.latest = newState
+            self.dropped += 1
+
+    def finish(self):
+        "Draws the last state and waits until the display is done"
+        if self.latest is not None: self.send('frame', self.latest)
+        self.latest = None
+        done = threading.Event()
+        self.send('finish', done)
+        done.wait()
+        self.thread.join()
+        self.thread = None
+
+    def checkNullDisplay(self):
+        return self.display.checkNullDisplay()
+
+    def drawExpandedCells(self, cells):
+        self.send('call', ('drawExpandedCells', (cells,)))
+
+    def addExpandedCells(self, cells, first, total):
+        self.send('call', ('addExpandedCells', (cells, first, total)))
+
+    def clearExpandedCells(self):
+        self.send('call', ('clearExpandedCells', ()))
+
+    def updateDistributions(self, distributions):
+        self.send('call', ('updateDistributions', (distributions,)))
+
+    def run(self):
+        display = self.display
+        redraw = getattr(display, 'redraw', display.update)
+        held = None
+        while True:
+            if held is not None: kind, payload, held = held + (None,)
+            else: kind, payload = self.queue.get()
+            try:
+                if kind == 'frame':
+                    # Skip to the newest state waiting
+                    while True:
+                        try: message = self.queue.get_nowait()
+                        except Queue.Empty: break
+                        if message[0] != 'frame':
+                            held = message
+                            break
+                        payload = message[1]
+                        self.dropped += 1
+                    start = time.time()
+                    redraw(payload)
+                    self.frames += 1
+                    delay = self.frameTime - (time.time() - start)
+                    if delay > 0: sleep(delay)
+                elif kind == 'call':
+                    name, args = payload
+                    getattr(display, name)(*args)
+                elif kind == 'finish':
+                    display.finish()
+            except:
+                traceback.print_exc()
+            if kind == 'finish':
+                payload.set()
+                return
+
 class FirstPersonPacmanGraphics(PacmanGraphics):
     def __init__(self, zoom = 1.0, showGhosts = True, capture = False, frameTime=0):
         PacmanGraphics.__init__(self, zoom, frameTime=frameTime)
@@ -630,6 +785,10 @@ class FirstPersonPacmanGraphics(PacmanGraphics):
 
         # Information
         self.previousState = state
+        # What redraw last drew
+        self.drawnFood = self.layout.food
+        self.drawnCapsules = self.layout.capsules
+        self.drawnScore = None
 
     def lookAhead(self, config, state):
         if config.getDirection() == 'Stop':
@@ -13,11 +13,19 @@
 
 
 from util import manhattanDistance
-from game import Grid
+import util
+from game import Grid, Actions, Directions
 import os
 import random
+import struct
+import hashlib
 
 VISIBILITY_MATRIX_CACHE = {}
+# Parsed layouts by content key, shared by all Layouts with the same text.
+# Only the most recent are kept, so generated layouts do not pile up.
+COMPILED_LAYOUT_CACHE = util.LRUCache(64)
+# Layout files found by getLayout, by working directory and name
+LAYOUT_PATH_CACHE = {}
 
 class Layout:
     """
@@ -27,14 +35,10 @@ class Layout:
     def __init__(self, layoutText):
         self.width = len(layoutText[0])
         self.height= len(layoutText)
-        self.walls = Grid(self.width, self.height, False)
-        self.food = Grid(self.width, self.height, False)
-        self.capsules = []
-        self.agentPositions = []
-        self.numGhosts = 0
+        self.contentKey = getContentKey(layoutText)
         self.processLayoutText(layoutText)
         self.layoutText = layoutText
-        self.totalFood = len(self.food.asList())
+        self.totalFood = self.food.count()
         # self.initializeVisibilityMatrix()
 
     def getNumGhosts(self):
@@ -42,7 +46,7 @@ class Layout:
 
     def initializeVisibilityMatrix(self):
         global VISIBILITY_MATRIX_CACHE
-        if reduce(str.__add__, self.layoutText) not in VISIBILITY_MATRIX_CACHE:
+        if self.contentKey not in VISIBILITY_MATRIX_CACHE:
             from game import Directions
             vecs = [(-0.5,0), (0.5,0),(0,-0.5),(0,0.5)]
             dirs = [Directions.NORTH, Directions.SOUTH, Directions.WEST, Directions.EAST]
@@ -57,9 +61,9 @@ class Layout:
                                 vis[x][y][direction].add((nextx, nexty))
                                 nextx, nexty = x + dx, y + dy
             self.visibility = vis
-            VISIBILITY_MATRIX_CACHE[reduce(str.__add__, self.layoutText)] = vis
+            VISIBILITY_MATRIX_CACHE[self.contentKey] = vis
         else:
-            self.visibility = VISIBILITY_MATRIX_CACHE[reduce(str.__add__, self.layoutText)]
+            self.visibility = VISIBILITY_MATRIX_CACHE[self.contentKey]
 
     def isWall(self, pos):
         x, col = pos
@@ -82,6 +86,56 @@ class Layout:
         dist, pos = max([(manhattanDistance(p, pacPos), p) for p in poses])
         return pos
 
+    def getActionTables(self):
+        """
+        Returns the legal action tables of the layout, built the first time
+        they are needed and kept with the compiled layout, so they are shared
+        by all Layouts with the same content and evicted with it:
+
+          a dict from every open inner cell (x, y) to the moves that do not run into
+          a wall, in the order of Actions.getPossibleActions (with STOP), and
+          a dict from (cell, direction) to the moves of a ghost at the cell
+          heading in direction, as GhostRules allows them: no STOP, and no
+          turning back unless there is no other way.
+        """
+        tables = self.compiled.actionTables
+        if tables is None:
+            walls = self.walls
+            moves, ghostMoves = {}, {}
+            # Cells on the edge are left to Actions.getPossibleActions
+            for x in range(1, self.width - 1):
+                for y in range(1, self.height - 1):
+                    if walls[x][y]: continue
+                    possible = tuple([direction for direction, (dx, dy) in Actions._directionsAsList
+                                      if not walls[x + dx][y + dy]])
+                    moves[(x, y)] = possible
+                    for direction in Actions._directions:
+                        reverse = Actions.reverseDirection(direction)
+                        actions = [action for action in possible if action != Directions.STOP]
+                        if reverse in actions and len(actions) > 1: actions.remove(reverse)
+                        ghostMoves[((x, y), direction)] = tuple(actions)
+            tables = self.compiled.actionTables = (moves, ghostMoves)
+        return tables
+
+    def getLegalActions(self, configuration):
+        """
+        Returns a new list of the moves from the position of configuration
+        that do not run into a wall, or None for a position that is not the
+        center of a cell (see Actions.getPossibleActions).
+        """
+        actions = self.getActionTables()[0].get(configuration.pos)
+        if actions is None: return None
+        return list(actions)
+
+    def getGhostLegalActions(self, configuration):
+        """
+        Returns a new list of the moves GhostRules allows a ghost with the
+        given configuration, or None if it is not at the center of a cell.
+        """
+        actions = self.getActionTables()[1].get((configuration.pos, configuration.direction))
+        if actions is None: return None
+        return list(actions)
+
     def isVisibleFrom(self, ghostPos, pacPos, pacDirection):
         row, col = [int(x) for x in pacPos]
         return ghostPos in self.visibility[row][col][pacDirection]
@@ -104,31 +158,193 @@ class Layout:
          G - Ghost
          P - Pacman
         Other characters are ignored.
+
+        The text is parsed once per distinct content (see compileLayout);
+        every Layout gets its own copy of the walls and food.
         """
-        maxY = self.height - 1
-        for y in range(self.height):
-            for x in range(self.width):
-                layoutChar = layoutText[maxY - y][x]
-                self.processLayoutChar(x, y, layoutChar)
-        self.agentPositions.sort()
-        self.agentPositions = [ ( i == 0, pos) for i, pos in self.agentPositions]
-
-    def processLayoutChar(self, x, y, layoutChar):
-        if layoutChar == '%':
-            self.walls[x][y] = True
-        elif layoutChar == '.':
-            self.food[x][y] = True
-        elif layoutChar == 'o':
-            self.capsules.append((x, y))
-        elif layoutChar == 'P':
-            self.agentPositions.append( (0, (x, y) ) )
-        elif layoutChar in ['G']:
-            self.agentPositions.append( (1, (x, y) ) )
-            self.numGhosts += 1
-        elif layoutChar in  ['1', '2', '3', '4']:
-            self.agentPositions.append( (int(layoutChar), (x,y)))
-            self.numGhosts += 1
+        compiled = COMPILED_LAYOUT_CACHE.get(self.contentKey)
+        if compiled is None:
+            compiled = compileLayout(layoutText)
+            COMPILED_LAYOUT_CACHE.put(self.contentKey, compiled)
+        self.compiled = compiled
+        self.walls = gridFromColumns(compiled.walls)
+        self.food = gridFromColumns(compiled.food)
+        self.capsules = compiled.capsules[:]
+        self.agentPositions = compiled.agentPositions[:]
+        self.numGhosts = compiled.numGhosts
+
+class CompiledLayout:
+    """
+    The parsed contents of a layout text: walls and food as lists of columns
+    of booleans, capsules, agent positions in the order of
+    Layout.agentPositions and the number of ghosts.  The legal action tables
+    of the layout are added by Layout.getActionTables when first needed.
+    """
+    def __init__(self, width, height, walls, food, capsules, agentPositions, numGhosts):
+        self.width = width
+        self.height = height
+        self.walls = walls
+        self.food = food
+        self.capsules = capsules
+        self.agentPositions = agentPositions
+        self.numGhosts = numGhosts
+        self.actionTables = None
+
+def gridFromColumns(columns):
+    "A Grid holding a copy of the given columns"
+    grid = Grid(0, 0)
+    grid.width, grid.height = len(columns), len(columns[0])
+    grid.data = [column[:] for column in columns]
+    return grid
+
+def getContentKey(layoutText):
+    "A hash of the text of a layout, which identifies it in the caches"
+    return hashlib.sha1('\n'.join(layoutText)).hexdigest()
+
+def compileLayout(layoutText):
+    """
+    Parses a layout text.  The rows are turned into columns (bottom row first)
+    with zip, and each column is matched against the wall and food characters
+    as a whole; only the few capsules and agents are looked up one by one.
+    """
+    width, height = len(layoutText[0]), len(layoutText)
+    columns = [''.join(column) for column in zip(*layoutText[::-1])]
+    walls = [map('%'.__eq__, column) for column in columns]
+    food = [map('.'.__eq__, column) for column in columns]
+
+    capsules, agents = [], []
+    for x, column in enumerate(columns):
+        for char in 'oPG1234':
+            y = column.find(char)
+            while y != -1:
+                if char == 'o': capsules.append((y, x))
+                elif char == 'P': agents.append((0, (x, y)))
+                elif char == 'G': agents.append((1, (x, y)))
+                else: agents.append((int(char), (x, y)))
+                y = column.find(char, y + 1)
+    # Same orders as a row by row scan
+    capsules = [(x, y) for y, x in sorted(capsules)]
+    agents.sort()
+    agentPositions = [(i == 0, pos) for i, pos in agents]
+    numGhosts = len([i for i, pos in agents if i != 0])
+    return CompiledLayout(width, height, walls, food, capsules, agentPositions, numGhosts)
+
+#############################
+# Precompiled layout files  #
+#############################
+
+# A compiled layout is stored next to its .lay file, with CACHE_SUFFIX added:
+#   header: 'PLAC', version (uint16), mtime of the .lay file (float64),
+#           size of the .lay file (uint64), SHA-1 of the text (20 bytes),
+#           width (uint16), height (uint16), text length (uint32)
+#   the layout text (rows joined with newlines)
+#   walls and food, one byte per cell, column by column
+#   number of capsules (uint32), capsules as (x, y) uint16 pairs
+#   number of agents (uint32), agents as (isPacman uint8, x uint16, y uint16)
+#   number of ghosts (uint16)
+CACHE_SUFFIX = 'c'
+CACHE_MAGIC = 'PLAC'
+CACHE_VERSION = 1
+CACHE_HEADER = struct.Struct('<4sHdQ20sHHI')
+COUNT = struct.Struct('<I')
+CAPSULE = struct.Struct('<HH')
+AGENT = struct.Struct('<BHH')
+GHOSTS = struct.Struct('<H')
+
+def writeLayoutCache(fileName, layout, info):
+    """
+    Writes the compiled layout for the layout file fileName.  The cache is
+    written to a temporary file that is then renamed, so processes loading the
+    same layout at once never see half a cache.  A cache that cannot be
+    written (a read-only directory, say) is skipped.
+    """
+    compiled = layout.compiled
+    text = '\n'.join(layout.layoutText)
+    parts = [CACHE_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, info.st_mtime, info.st_size,
+                               hashlib.sha1(text).digest(), layout.width, layout.height, len(text)), text]
+    for grid in [compiled.walls, compiled.food]:
+        parts.extend([''.join([chr(cell) for cell in column]) for column in grid])
+    parts.append(COUNT.pack(len(compiled.capsules)))
+    parts.extend([CAPSULE.pack(x, y) for x, y in compiled.capsules])
+    parts.append(COUNT.pack(len(compiled.agentPositions)))
+    parts.extend([AGENT.pack(isPacman, x, y) for isPacman, (x, y) in compiled.agentPositions])
+    parts.append(GHOSTS.pack(compiled.numGhosts))
+
+    temporary = '%s.%d.tmp' % (fileName + CACHE_SUFFIX, os.getpid())
+    try:
+        f = open(temporary, 'wb')
+        try: f.write(''.join(parts))
+        finally: f.close()
+        os.rename(temporary, fileName + CACHE_SUFFIX)
+    except (IOError, OSError):
+        if os.path.exists(temporary): os.remove(temporary)
+
+def readLayoutCache(fileName, info):
+    """
+    Returns the layout stored in the cache of the layout file fileName, or
+    None if there is no cache or the .lay file has changed since it was
+    written.  A .lay file with a new modification time is still served from
+    the cache if its text has the same hash.
+    """
+    import mmap
+    cacheName = fileName + CACHE_SUFFIX
+    if not os.path.exists(cacheName): return None
+    f = open(cacheName, 'rb')
+    try:
+        try: buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (mmap.error, ValueError): return None
+    finally:
+        f.close()
+    try:
+        if len(buffer) < CACHE_HEADER.size: return None
+        magic, version, mtime, size, digest, width, height, textLength = CACHE_HEADER.unpack_from(buffer, 0)
+        if magic != CACHE_MAGIC or version != CACHE_VERSION: return None
+        offset = CACHE_HEADER.size
+        text = buffer[offset:offset + textLength]
+        offset += textLength
+        if mtime != info.st_mtime or size != info.st_size:
+            if hashlib.sha1(readLayoutText(fileName)).digest() != digest: return None
+        layoutText = text.split('\n')
+
+        key = getContentKey(layoutText)
+        if key not in COMPILED_LAYOUT_CACHE:
+            grids = []
+            for i in range(2):
+                grids.append([map(bool, bytearray(buffer[offset + x * height:offset + (x + 1) * height]))
+                              for x in range(width)])
+                offset += width * height
+            capsules = []
+            for i in range(COUNT.unpack_from(buffer, offset)[0]):
+                capsules.append(CAPSULE.unpack_from(buffer, offset + COUNT.size + i * CAPSULE.size))
+            offset += COUNT.size + len(capsules) * CAPSULE.size
+            agentPositions = []
+            for i in range(COUNT.unpack_from(buffer, offset)[0]):
+                isPacman, x, y = AGENT.unpack_from(buffer, offset + COUNT.size + i * AGENT.size)
+                agentPositions.append((bool(isPacman), (x, y)))
+            offset += COUNT.size + len(agentPositions) * AGENT.size
+            numGhosts = GHOSTS.unpack_from(buffer, offset)[0]
+            COMPILED_LAYOUT_CACHE.put(key, CompiledLayout(width, height, grids[0], grids[1],
+                                                          capsules, agentPositions, numGhosts))
+    except struct.error:
+        return None
+    finally:
+        buffer.close()
+    return Layout(layoutText)
+
+def readLayoutText(fileName):
+    "The text of a layout file, with the rows stripped and joined by newlines"
+    f = open(fileName)
+    try: return '\n'.join([line.strip() for line in f])
+    finally: f.close()
+
 def getLayout(name, back = 2):
+    key = (os.path.abspath('.'), name, back)
+    if key in LAYOUT_PATH_CACHE: return tryToLoad(LAYOUT_PATH_CACHE[key])
+    layout = findLayout(name, back)
+    if layout != None: LAYOUT_PATH_CACHE[key] = layout.fileName
+    return layout
+
+def findLayout(name, back):
     if name.endswith('.lay'):
         layout = tryToLoad('layouts/' + name)
         if layout == None: layout = tryToLoad(name)
@@ -138,12 +354,21 @@ def getLayout(name, back = 2):
     if layout == None and back >= 0:
         curdir = os.path.abspath('.')
         os.chdir('..')
-        layout = getLayout(name, back -1)
+        layout = findLayout(name, back -1)
         os.chdir(curdir)
     return layout
 
 def tryToLoad(fullname):
+    """
+    Loads a layout file, from its compiled cache when that is up to date;
+    otherwise the file is parsed and the cache written.
+    """
     if(not os.path.exists(fullname)): return None
-    f = open(fullname)
-    try: return Layout([line.strip() for line in f])
-    finally: f.close()
+    fullname = os.path.abspath(fullname)
+    info = os.stat(fullname)
+    layout = readLayoutCache(fullname, info)
+    if layout == None:
+        layout = Layout(readLayoutText(fullname).split('\n'))
+        writeLayoutCache(fullname, layout, info)
+    layout.fileName = fullname
+    return layout
@@ -0,0 +1,283 @@
+# layoutGenerator.py
+# ------------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Procedural layouts of any size, for finding out how the agents scale.
+
+Four kinds of layout can be generated:
+
+  maze:   a maze carved by a randomized depth first search, with a share of
+          the remaining inner walls knocked out so that it has loops
+  rooms:  a grid of open rooms joined by doors
+  food:   an open field with scattered wall cells
+  wumpus: an open Wumpus world (see LAB2): one Wumpus (G), poison capsules
+          (o) and a teleporter (.) that can be reached without passing them
+
+Pacman, the ghosts, the food and the capsules are only placed on cells that
+Pacman can reach.  Every generated layout has a wall all around it and
+exactly one Pacman, which checkLayoutText verifies.  The same seed always
+gives the same layout.  For example:
+
+> python layoutGenerator.py -k maze -W 1001 -H 1001 --seed 1 -o layouts/hugeMaze.lay
+> python pacman.py -l layouts/hugeMaze.lay -p SearchAgent -a fn=bfs -q
+> python layoutGenerator.py -k food -W 60 -H 30 --food 0.3 -g 3 -c 4
+"""
+
+import random
+import sys
+
+KINDS = ['maze', 'rooms', 'food', 'wumpus']
+WALL, EMPTY = ord('%'), ord(' ')
+NEIGHBOURS = [(0, -1), (0, 1), (1, 0), (-1, 0)]
+
+def emptyBoard(width, height):
+    """
+    Returns the rows of a board with walls around it and nothing inside; the
+    rows are bytearrays in the order of the .lay text (top row first).
+    """
+    if width < 3 or height < 3: raise Exception('A layout must be at least 3x3, not %dx%d' % (width, height))
+    wall = bytearray('%' * width)
+    inside = bytearray('%' + ' ' * (width - 2) + '%')
+    return [bytearray(wall)] + [bytearray(inside) for y in range(height - 2)] + [bytearray(wall)]
+
+def carveMaze(rows, rng, loops=0.1):
+    """
+    Carves a maze into a board filled with walls.  The cells with odd
+    coordinates are the rooms of the maze; a randomized depth first search,
+    run with an explicit stack so that it copes with any size, opens the wall
+    between a room and the next one it visits.  Afterwards, every inner wall
+    between two rooms is knocked out with probability loops.
+    """
+    height, width = len(rows), len(rows[0])
+    for y in range(1, height - 1):
+        rows[y][1:width - 1] = '%' * (width - 2)
+    rows[1][1] = EMPTY
+    stack = [(1, 1)]
+    while stack:
+        x, y = stack[-1]
+        options = [(dx, dy) for dx, dy in NEIGHBOURS
+                   if 0 < x + 2 * dx < width - 1 and 0 < y + 2 * dy < height - 1
+                   and rows[y + 2 * dy][x + 2 * dx] == WALL]
+        if not options:
+            stack.pop()
+            continue
+        dx, dy = rng.choice(options)
+        rows[y + dy][x + dx] = EMPTY
+        rows[y + 2 * dy][x + 2 * dx] = EMPTY
+        stack.append((x + 2 * dx, y + 2 * dy))
+
+    if loops > 0:
+        for y in range(1, height - 1):
+            for x in range(1 + y % 2, width - 1, 2):
+                if rows[y][x] != WALL: continue
+                if y % 2 == 1: between = rows[y][x - 1] == EMPTY and x + 1 < width - 1 and rows[y][x + 1] == EMPTY
+                else: between = rows[y - 1][x] == EMPTY and y + 1 < height - 1 and rows[y + 1][x] == EMPTY
+                if between and rng.random() < loops: rows[y][x] = EMPTY
+
+def buildRooms(rows, rng, roomSize=8):
+    """
+    Divides the board into rooms of roomSize by roomSize cells with walls one
+    cell thick, and opens one door in every wall between two rooms.
+    """
+    height, width = len(rows), len(rows[0])
+    step = roomSize + 1
+    wallColumns = range(step, width - 2, step)
+    wallRows = range(step, height - 2, step)
+    for y in wallRows:
+        rows[y][:] = '%' * width
+    for y in range(height):
+        for x in wallColumns:
+            rows[y][x] = WALL
+    columnStarts = [1] + [x + 1 for x in wallColumns]
+    rowStarts = [1] + [y + 1 for y in wallRows]
+    columnEnds = [x - 1 for x in wallColumns] + [width - 2]
+    rowEnds = [y - 1 for y in wallRows] + [height - 2]
+    for x in wallColumns:
+        for top, bottom in zip(rowStarts, rowEnds):
+            rows[rng.randint(top, bottom)][x] = EMPTY
+    for y in wallRows:
+        for left, right in zip(columnStarts, columnEnds):
+            rows[y][rng.randint(left, right)] = EMPTY
+
+def scatterWalls(rows, rng, wallDensity=0.1):
+    "Turns every inner cell into a wall with probability wallDensity"
+    height, width = len(rows), len(rows[0])
+    for y in range(1, height - 1):
+        row = rows[y]
+        for x in range(1, width - 1):
+            if rng.random() < wallDensity: row[x] = WALL
+
+def reachableCells(rows, start, blocked=(WALL,)):
+    "Returns the cells (x, row) that can be reached from start, in search order"
+    height, width = len(rows), len(rows[0])
+    seen = set([start])
+    cells = [start]
+    for x, y in cells:
+        for dx, dy in NEIGHBOURS:
+            cell = (x + dx, y + dy)
+            if cell in seen or rows[y + dy][x + dx] in blocked: continue
+            seen.add(cell)
+            cells.append(cell)
+    return cells
+
+def openCells(rows):
+    return [(x, y) for y, row in enumerate(rows) for x in range(len(row)) if row[x] == EMPTY]
+
+def populate(rows, rng, foodDensity, numGhosts, numCapsules):
+    """
+    Puts Pacman on a random empty cell and the ghosts, capsules and food on
+    the empty cells he can reach.  Ghosts do not start next to Pacman if they
+    can avoid it.
+    """
+    empty = openCells(rows)
+    if not empty: raise Exception('The layout has no room for Pacman')
+    px, py = rng.choice(empty)
+    rows[py][px] = ord('P')
+    free = reachableCells(rows, (px, py))[1:]
+    far = [(x, y) for x, y in free if abs(x - px) + abs(y - py) > 1]
+    if len(far) >= numGhosts: candidates = far
+    else: candidates = free
+    if numGhosts + numCapsules > len(free):
+        raise Exception('The layout has room for %d ghosts and capsules, not %d' % (len(free), numGhosts + numCapsules))
+    ghosts = rng.sample(candidates, numGhosts)
+    for x, y in ghosts:
+        rows[y][x] = ord('G')
+    taken = set(ghosts)
+    capsules = rng.sample([cell for cell in free if cell not in taken], numCapsules)
+    for x, y in capsules:
+        rows[y][x] = ord('o')
+    taken.update(capsules)
+    for x, y in free:
+        if (x, y) not in taken and rng.random() < foodDensity: rows[y][x] = ord('.')
+
+def populateWumpus(rows, rng, poisonDensity, safeStart=True):
+    """
+    Puts Pacman in the lower left corner, as in the LAB2 worlds, and then the
+    Wumpus, the poison capsules and the teleporter.  No hazard is placed next
+    to Pacman's start when safeStart is set, and the teleporter is placed on a
+    cell that can be reached without passing a hazard.
+    """
+    height, width = len(rows), len(rows[0])
+    start = (1, height - 2)
+    rows[start[1]][start[0]] = ord('P')
+    free = [cell for cell in openCells(rows)
+            if not safeStart or abs(cell[0] - start[0]) + abs(cell[1] - start[1]) > 1]
+    if len(free) < 2: raise Exception('The layout has no room for the Wumpus and the teleporter')
+    wumpus = rng.choice(free)
+    rows[wumpus[1]][wumpus[0]] = ord('G')
+    for x, y in free:
+        if (x, y) != wumpus and rng.random() < poisonDensity: rows[y][x] = ord('o')
+    hazards = (WALL, ord('G'), ord('o'))
+    safe = reachableCells(rows, start, hazards)[1:]
+    if not safe: raise Exception('Every way out of the start is blocked; lower the poison density')
+    x, y = rng.choice(safe)
+    rows[y][x] = ord('.')
+
+def generateLayoutText(kind, width, height, seed=None, foodDensity=0.5, numGhosts=2,
+                       numCapsules=0, loops=0.1, roomSize=8, wallDensity=0.1, poisonDensity=0.1):
+    """
+    Returns the rows of a new layout of the given kind (one of KINDS).
+
+      foodDensity:   chance that a reachable empty cell holds food
+      numGhosts:     number of ghosts (the Wumpus kind always has one)
+      numCapsules:   number of capsules
+      loops:         for mazes, the share of inner walls knocked out
+      roomSize:      for rooms, the inner size of a room
+      wallDensity:   for food fields, the share of cells that are walls
+      poisonDensity: for Wumpus worlds, the share of cells with poison
+    """
+    if kind not in KINDS: raise Exception('Unknown layout kind %s, expected one of %s' % (kind, ', '.join(KINDS)))
+    rng = random.Random(seed)
+    rows = emptyBoard(width, height)
+    if kind == 'maze': carveMaze(rows, rng, loops)
+    elif kind == 'rooms': buildRooms(rows, rng, roomSize)
+    elif kind == 'food': scatterWalls(rows, rng, wallDensity)
+    if kind == 'wumpus': populateWumpus(rows, rng, poisonDensity)
+    else: populate(rows, rng, foodDensity, numGhosts, numCapsules)
+    rows = [str(row) for row in rows]
+    checkLayoutText(rows)
+    return rows
+
+def checkLayoutText(rows):
+    """
+    Raises an exception unless rows make up a rectangular layout with a wall
+    all around it and exactly one Pacman, as Layout assumes.
+    """
+    if len(rows) < 3: raise Exception('A layout needs at least 3 rows')
+    width = len(rows[0])
+    for y, row in enumerate(rows):
+        if len(row) != width: raise Exception('Row %d has %d cells instead of %d' % (y, len(row), width))
+    if rows[0].strip('%') or rows[-1].strip('%'): raise Exception('The top and bottom rows must be walls')
+    for y, row in enumerate(rows):
+        if row[0] != '%' or row[-1] != '%': raise Exception('Row %d is not closed by walls' % y)
+    count = sum([row.count('P') for row in rows])
+    if count != 1: raise Exception('A layout needs exactly one Pacman, not %d' % count)
+
+def generateLayout(kind, width, height, seed=None, **options):
+    "Returns a new layout.Layout; see generateLayoutText for the options"
+    import layout
+    return layout.Layout(generateLayoutText(kind, width, height, seed, **options))
+
+def writeLayout(rows, fileName):
+    f = open(fileName, 'w')
+    try: f.write('\n'.join(rows) + '\n')
+    finally: f.close()
+
+def readCommand(argv):
+    from optparse import OptionParser
+    usageStr = """
+    USAGE:      python layoutGenerator.py <options>
+    EXAMPLES:   python layoutGenerator.py -k maze -W 201 -H 201 --seed 3 -o layouts/hugeMaze.lay
+                python layoutGenerator.py -k wumpus -W 12 -H 8 --poison 0.15
+    """
+    parser = OptionParser(usageStr)
+    parser.add_option('-k', '--kind', dest='kind', type='choice', choices=KINDS, default='maze',
+                      help='Kind of layout: %s [Default: %%default]' % ', '.join(KINDS))
+    parser.add_option('-W', '--width', dest='width', type='int', default=41,
+                      help='Width of the layout [Default: %default]')
+    parser.add_option('-H', '--height', dest='height', type='int', default=21,
+                      help='Height of the layout [Default: %default]')
+    parser.add_option('-s', '--seed', dest='seed', type='int', default=None,
+                      help='Seed of the random layout')
+    parser.add_option('-f', '--food', dest='foodDensity', type='float', default=0.5,
+                      help='Chance that an empty cell holds food [Default: %default]')
+    parser.add_option('-g', '--ghosts', dest='numGhosts', type='int', default=2,
+                      help='Number of ghosts [Default: %default]')
+    parser.add_option('-c', '--capsules', dest='numCapsules', type='int', default=0,
+                      help='Number of capsules [Default: %default]')
+    parser.add_option('--loops', dest='loops', type='float', default=0.1,
+                      help='Share of the inner walls of a maze knocked out [Default: %default]')
+    parser.add_option('--roomSize', dest='roomSize', type='int', default=8,
+                      help='Inner size of a room [Default: %default]')
+    parser.add_option('--walls', dest='wallDensity', type='float', default=0.1,
+                      help='Share of the cells of a food field that are walls [Default: %default]')
+    parser.add_option('--poison', dest='poisonDensity', type='float', default=0.1,
+                      help='Share of the cells of a Wumpus world with poison [Default: %default]')
+    parser.add_option('-o', '--output', dest='output', default=None,
+                      help='Write the layout to this file instead of printing it')
+    options, args = parser.parse_args(argv)
+    if args: parser.error('Unrecognized arguments: ' + ' '.join(args))
+    return options
+
+if __name__ == '__main__':
+    options = readCommand(sys.argv[1:])
+    rows = generateLayoutText(options.kind, options.width, options.height, options.seed,
+                              foodDensity=options.foodDensity, numGhosts=options.numGhosts,
+                              numCapsules=options.numCapsules, loops=options.loops,
+                              roomSize=options.roomSize, wallDensity=options.wallDensity,
+                              poisonDensity=options.poisonDensity)
+    if options.output is None:
+        print '\n'.join(rows)
+    else:
+        writeLayout(rows, options.output)
@@ -0,0 +1,288 @@
+# mctsAgents.py
+# -------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+A Monte Carlo tree search Pacman agent.
+
+The tree holds Pacman's moves only.  Walking down the tree, every Pacman move
+is followed by one move of every ghost, drawn from a ghost agent of
+ghostAgents.py (the rollout policy), so one tree node stands for all the
+states reached by the same sequence of Pacman moves.  Nodes are chosen with
+UCT, and a new leaf is valued with the evaluation function of multiAgents.py,
+optionally after playing a few random rounds (a rollout) from it.  Each pass
+down the tree counts as one rollout.  Random Pacman moves are a poor guess of
+how the agent plays, so by default the evaluation is taken at the leaf.
+
+With workers=N, N processes of a pool that lives as long as the agent each
+grow their own tree from the current state for the time of the move, and the
+visit counts of the moves at the root are added up (root parallelization).
+For example:
+
+> python pacman.py -p MCTSAgent -l mediumClassic -a workers=4,time=0.5
+> python pacman.py -p MCTSAgent -g DirectionalGhost -a ghost=DirectionalGhost
+"""
+
+from array import array
+from game import Agent, Directions
+import multiAgents
+import ghostAgents
+import random
+import math
+import time
+import util
+
+ACTIONS = [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST, Directions.STOP]
+NO_NODE = -1
+
+class SearchTree:
+    """
+    The statistics of a search tree, kept in flat arrays indexed by node
+    number; node 0 is the root.  The children of a node are linked through
+    firstChild and nextSibling.
+    """
+    def __init__(self):
+        self.visits = array('i', [0])
+        self.values = array('d', [0.0])
+        self.actions = array('b', [-1])
+        self.firstChild = array('i', [NO_NODE])
+        self.nextSibling = array('i', [NO_NODE])
+        self.expanded = array('b', [0])
+
+    def addChild(self, parent, actionIndex):
+        node = len(self.visits)
+        self.visits.append(0)
+        self.values.append(0.0)
+        self.actions.append(actionIndex)
+        self.firstChild.append(NO_NODE)
+        self.nextSibling.append(self.firstChild[parent])
+        self.expanded.append(0)
+        self.firstChild[parent] = node
+        return node
+
+    def expand(self, node, legal):
+        for action in reversed(legal):
+            self.addChild(node, ACTIONS.index(action))
+        self.expanded[node] = 1
+
+    def children(self, node):
+        child = self.firstChild[node]
+        while child != NO_NODE:
+            yield child
+            child = self.nextSibling[child]
+
+    def __len__(self):
+        return len(self.visits)
+
+class TreeSearch:
+    """
+    Grows one search tree from rootState until the deadline and returns the
+    visit count and total reward of every move at the root.
+    """
+    def __init__(self, rootState, ghostPolicies, evaluationFunction,
+                 exploration=0.1, rolloutDepth=0):
+        self.rootState = rootState
+        self.ghostPolicies = ghostPolicies
+        self.evaluationFunction = evaluationFunction
+        self.exploration = exploration
+        self.rolloutDepth = rolloutDepth
+        self.rootValue = evaluationFunction(rootState)
+        self.tree = SearchTree()
+        # Rewards are scaled to [0,1] with the smallest and largest reward seen
+        self.lowest = self.highest = 0.0
+        self.rollouts = 0
+
+    def run(self, deadline):
+        while True:
+            self.iterate()
+            if time.time() > deadline: break
+        tree = self.tree
+        return [(ACTIONS[tree.actions[child]], tree.visits[child], tree.values[child])
+                for child in tree.children(0)], self.rollouts
+
+    def iterate(self):
+        tree = self.tree
+        state, node, path = self.rootState, 0, [0]
+        while tree.expanded[node] and not self.isTerminal(state):
+            node = self.select(node)
+            state = self.advance(state, ACTIONS[tree.actions[node]])
+            path.append(node)
+        if not self.isTerminal(state):
+            tree.expand(node, state.getLegalPacmanActions())
+            node = tree.firstChild[node]
+            state = self.advance(state, ACTIONS[tree.actions[node]])
+            path.append(node)
+
+        reward = self.rollout(state) - self.rootValue
+        if reward < self.lowest: self.lowest = reward
+        if reward > self.highest: self.highest = reward
+        for node in path:
+            tree.visits[node] += 1
+            tree.values[node] += reward
+        self.rollouts += 1
+
+    def select(self, node):
+        "Returns the child of node with the highest UCT value"
+        tree = self.tree
+        logVisits = math.log(tree.visits[node] + 1)
+        spread = max(self.highest - self.lowest, 1e-9)
+        best, bestValue = NO_NODE, None
+        for child in tree.children(node):
+            visits = tree.visits[child]
+            if visits == 0: return child
+            mean = (tree.values[child] / visits - self.lowest) / spread
+            value = mean + self.exploration * math.sqrt(logVisits / visits)
+            if bestValue is None or value > bestValue:
+                best, bestValue = child, value
+        return best
+
+    def isTerminal(self, state):
+        return state.isWin() or state.isLose()
+
+    def advance(self, state, action):
+        "Plays Pacman's action and then one move of every ghost"
+        state = state.generateSuccessor(0, action)
+        for ghost in self.ghostPolicies:
+            if self.isTerminal(state): break
+            state = state.generateSuccessor(ghost.index, ghost.getAction(state))
+        return state
+
+    def rollout(self, state):
+        """
+        Plays up to rolloutDepth rounds in which Pacman moves at random,
+        without stopping or turning back unless he has to, and returns the
+        evaluation of the final state.
+        """
+        for step in range(self.rolloutDepth):
+            if self.isTerminal(state): break
+            legal = state.getLegalPacmanActions()
+            reverse = Directions.REVERSE[state.getPacmanState().configuration.direction]
+            moves = [action for action in legal if action != Directions.STOP and action != reverse]
+            if not moves: moves = [action for action in legal if action != Directions.STOP] or legal
+            state = self.advance(state, random.choice(moves))
+        return self.evaluationFunction(state)
+
+GHOST_POLICY_CACHE = {}
+
+def getGhostPolicies(ghostName, numAgents):
+    "Returns the rollout ghost agents for a game with numAgents agents"
+    key = (ghostName, numAgents)
+    if key not in GHOST_POLICY_CACHE:
+        ghostType = getattr(ghostAgents, ghostName)
+        GHOST_POLICY_CACHE[key] = [ghostType(index) for index in range(1, numAgents)]
+    return GHOST_POLICY_CACHE[key]
+
+def searchRoot(task):
+    """
+    Grows one tree for a move; runs in the worker processes of the pool (and
+    in the agent's own process when there are no workers).
+    """
+    state, ghostName, evalFn, exploration, rolloutDepth, deadline, seed = task
+    if seed is not None: random.seed(seed)
+    policies = getGhostPolicies(ghostName, state.getNumAgents())
+    evaluationFunction = util.lookup(evalFn, multiAgents.__dict__)
+    search = TreeSearch(state, policies, evaluationFunction, exploration, rolloutDepth)
+    return search.run(deadline)
+
+def _ignoreInterrupts():
+    # Ctrl-C is handled by the parent process, which terminates the pool
+    import signal
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+WORKER_POOLS = {}
+
+def getWorkerPool(workers):
+    """
+    Returns a pool of the given number of worker processes, started the first
+    time it is needed and shared by all agents until the program exits.
+    """
+    if workers not in WORKER_POOLS:
+        import multiprocessing, atexit
+        pool = multiprocessing.Pool(workers, _ignoreInterrupts)
+        atexit.register(pool.terminate)
+        WORKER_POOLS[workers] = pool
+    return WORKER_POOLS[workers]
+
+class MCTSAgent(Agent):
+    """
+    Monte Carlo tree search with UCT.  Agent arguments:
+
+      time:        seconds per move (also limited by the game's timeouts)
+      workers:     number of worker processes, 0 to search in this process
+      ghost:       ghost agent used to move the ghosts in the tree and rollouts
+      exploration: the UCT exploration constant
+      depth:       number of rounds played in a rollout
+      evalFn:      evaluation function (of multiAgents.py) for rollout ends
+    """
+    def __init__(self, time='0.5', workers='0', ghost='RandomGhost', exploration='0.1',
+                 depth='0', evalFn='betterEvaluationFunction'):
+        self.index = 0
+        self.maxMoveTime = float(time)
+        self.workers = int(workers)
+        self.ghostName = ghost
+        self.exploration = float(exploration)
+        self.rolloutDepth = int(depth)
+        self.evalFn = evalFn
+        self.moveTimeout = None
+        self.gameTimeLeft = None
+        self.totalRollouts = 0
+        self.totalTime = 0.0
+        self.seeds = random.Random(random.random())
+        # Start the workers now, before the game display is opened
+        if self.workers > 0: getWorkerPool(self.workers)
+
+    def setTimeLimits(self, moveTimeout, totalTime):
+        "Called by the game rules with the time allowed for a move and a game"
+        self.moveTimeout = moveTimeout
+        self.gameTimeLeft = (1 - multiAgents.GAME_TIME_RESERVE) * totalTime
+
+    def getTimeBudget(self):
+        budget = self.maxMoveTime
+        if self.moveTimeout is not None:
+            budget = min(budget, multiAgents.TIMEOUT_SAFETY * self.moveTimeout)
+        if self.gameTimeLeft is not None:
+            budget = min(budget, multiAgents.GAME_TIME_SHARE * max(self.gameTimeLeft, 0))
+        return budget
+
+    def getAction(self, state):
+        legal = state.getLegalPacmanActions()
+        if len(legal) == 1: return legal[0]
+
+        start = time.time()
+        deadline = start + self.getTimeBudget()
+        task = (state, self.ghostName, self.evalFn, self.exploration, self.rolloutDepth, deadline)
+        if self.workers > 0:
+            tasks = [task + (self.seeds.getrandbits(32),) for i in range(self.workers)]
+            results = getWorkerPool(self.workers).map(searchRoot, tasks)
+        else:
+            # The search draws from the game's own random numbers
+            results = [searchRoot(task + (None,))]
+
+        visits, values = util.Counter(), util.Counter()
+        for children, rollouts in results:
+            self.totalRollouts += rollouts
+            for action, count, value in children:
+                visits[action] += count
+                values[action] += value
+        # The most visited move is the most robust choice
+        best = max(legal, key=lambda action: (visits[action], values[action]))
+
+        elapsed = time.time() - start
+        if self.gameTimeLeft is not None: self.gameTimeLeft -= elapsed
+        self.totalTime += elapsed
+        return best
+
+    def final(self, state):
+        if self.totalTime > 0:
+            print '[MCTSAgent] %d rollouts (%.0f rollouts/s)' % \
+                (self.totalRollouts, self.totalRollouts / self.totalTime)
@@ -0,0 +1,280 @@
+# multiAgents.py
+# --------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Adversarial search agents that look ahead over GameState.generateSuccessor
+while the game is being played, instead of planning a path at startup.
+
+Both agents search with iterative deepening, so they always have the move of
+the deepest completed search ready when their time runs out.  The time for a
+move is the smaller of the time agent argument and a fraction of the move
+timeout of the game rules (ClassicGameRules.getMoveTimeout); a small share of
+the time left in the game (ClassicGameRules.getMaxTotalTime) also bounds it,
+so long games do not run out of time.  With the verbose agent argument, the
+number of nodes searched is printed at the end of every game.  For example:
+
+> python pacman.py -p AlphaBetaAgent -l mediumClassic -a time=0.5,verbose
+> python pacman.py -p ExpectimaxAgent -l trappedClassic -g DirectionalGhost
+
+A depth of one means that Pacman and every ghost move once.
+"""
+
+from game import Agent
+from util import nearestPoint
+import distanceFields
+import util
+import time
+
+# Fraction of the rules' move timeout an agent allows itself
+TIMEOUT_SAFETY = 0.8
+# Fraction of the time left in the game an agent may spend on one move, after
+# setting aside GAME_TIME_RESERVE of the game's time for the work the game does
+# between moves and for moves made once the share has become tiny
+GAME_TIME_SHARE = 0.02
+GAME_TIME_RESERVE = 0.3
+# How many nodes are searched between two looks at the clock
+CLOCK_INTERVAL = 16
+# The transposition table is emptied once it holds this many entries
+MAX_TRANSPOSITIONS = 200000
+
+EXACT, LOWER_BOUND, UPPER_BOUND = 0, 1, 2
+
+class SearchTimeout(Exception):
+    "Raised inside a search when the time for the current move is used up"
+    pass
+
+class MultiAgentSearchAgent(Agent):
+    """
+    Common parts of the adversarial search agents: the time budget, iterative
+    deepening, the transposition table and move ordering.
+
+    Move ordering tries, in this order, the best move stored in the
+    transposition table, the killer moves of the current ply (moves that
+    recently caused a cutoff at the same ply) and then the remaining moves by
+    their history score.
+    """
+
+    def __init__(self, evalFn='betterEvaluationFunction', depth='20', time='1.0', verbose='False'):
+        self.index = 0 # Pacman is always agent index 0
+        self.evaluationFunction = util.lookup(evalFn, globals())
+        self.maxDepth = int(depth)
+        self.maxMoveTime = float(time)
+        self.moveTimeout = None
+        self.gameTimeLeft = None
+        self.transpositions = {}
+        self.killers = {}
+        self.history = util.Counter()
+        self.nodes = 0
+        self.totalNodes = 0
+        self.totalTime = 0.0
+        self.verbose = str(verbose).lower() in ('1', 'true')
+
+    def setTimeLimits(self, moveTimeout, totalTime):
+        "Called by the game rules with the time allowed for a move and a game"
+        self.moveTimeout = moveTimeout
+        self.gameTimeLeft = (1 - GAME_TIME_RESERVE) * totalTime
+
+    def getTimeBudget(self):
+        budget = self.maxMoveTime
+        if self.moveTimeout is not None:
+            budget = min(budget, TIMEOUT_SAFETY * self.moveTimeout)
+        if self.gameTimeLeft is not None:
+            budget = min(budget, GAME_TIME_SHARE * max(self.gameTimeLeft, 0))
+        return budget
+
+    def getAction(self, gameState):
+        """
+        Searches one round deeper at a time until the time budget is used up
+        and returns the best move of the deepest completed search.
+        """
+        start = time.time()
+        deadline = start + self.getTimeBudget()
+        self.nodes = 0
+        self.killers = {}
+        if len(self.transpositions) > MAX_TRANSPOSITIONS: self.transpositions = {}
+
+        legal = gameState.getLegalActions(self.index)
+        bestAction = legal[0]
+        for depth in range(1, self.maxDepth + 1):
+            try:
+                value, action = self.search(gameState, self.index, depth, -float('inf'), float('inf'), deadline, 0)
+            except SearchTimeout:
+                break
+            if action is not None: bestAction = action
+            if time.time() > deadline: break
+
+        elapsed = time.time() - start
+        if self.gameTimeLeft is not None: self.gameTimeLeft -= elapsed
+        self.totalNodes += self.nodes
+        self.totalTime += elapsed
+        return bestAction
+
+    def search(self, state, agentIndex, depth, alpha, beta, deadline, ply):
+        "Returns (value, best action) of state with agentIndex to move"
+        util.raiseNotDefined()
+
+    def tick(self, deadline):
+        self.nodes += 1
+        if self.nodes % CLOCK_INTERVAL == 0 and time.time() > deadline:
+            raise SearchTimeout()
+
+    def orderActions(self, state, agentIndex, ply, tableAction):
+        actions = state.getLegalActions(agentIndex)
+        history = self.history
+        actions.sort(key=lambda action: -history[(agentIndex, action)])
+        first = [tableAction] + self.killers.get(ply, [])
+        for action in reversed(first):
+            if action in actions:
+                actions.remove(action)
+                actions.insert(0, action)
+        return actions
+
+    def recordCutoff(self, agentIndex, action, depth, ply):
+        killers = self.killers.setdefault(ply, [])
+        if action not in killers:
+            killers.insert(0, action)
+            del killers[2:]
+        self.history[(agentIndex, action)] += depth * depth
+
+    def nextAgent(self, state, agentIndex, depth):
+        "Returns the next agent to move and the depth left when it does"
+        agentIndex += 1
+        if agentIndex == state.getNumAgents():
+            return 0, depth - 1
+        return agentIndex, depth
+
+    def final(self, state):
+        if self.verbose and self.totalTime > 0:
+            print '[%s] searched %d nodes (%.0f nodes/s)' % \
+                (self.__class__.__name__, self.totalNodes, self.totalNodes / self.totalTime)
+
+class AlphaBetaAgent(MultiAgentSearchAgent):
+    """
+    Minimax search with alpha-beta pruning: Pacman maximizes the evaluation
+    and every ghost minimizes it.
+    """
+
+    def search(self, state, agentIndex, depth, alpha, beta, deadline, ply):
+        self.tick(deadline)
+        if depth == 0 or state.isWin() or state.isLose():
+            return self.evaluationFunction(state), None
+
+        key = (state.getHashKey(), agentIndex)
+        entry = self.transpositions.get(key)
+        tableAction = None
+        if entry is not None:
+            entryDepth, value, bound, tableAction = entry
+            if entryDepth >= depth:
+                if bound == EXACT: return value, tableAction
+                if bound == LOWER_BOUND: alpha = max(alpha, value)
+                elif bound == UPPER_BOUND: beta = min(beta, value)
+                if alpha >= beta: return value, tableAction
+
+        originalAlpha, originalBeta = alpha, beta
+        nextIndex, nextDepth = self.nextAgent(state, agentIndex, depth)
+        maximizing = agentIndex == 0
+        bestValue, bestAction = None, None
+
+        for action in self.orderActions(state, agentIndex, ply, tableAction):
+            successor = state.generateSuccessor(agentIndex, action)
+            value = self.search(successor, nextIndex, nextDepth, alpha, beta, deadline, ply + 1)[0]
+            if maximizing:
+                if bestValue is None or value > bestValue: bestValue, bestAction = value, action
+                alpha = max(alpha, value)
+            else:
+                if bestValue is None or value < bestValue: bestValue, bestAction = value, action
+                beta = min(beta, value)
+            if alpha >= beta:
+                self.recordCutoff(agentIndex, action, depth, ply)
+                break
+
+        if bestValue <= originalAlpha: bound = UPPER_BOUND
+        elif bestValue >= originalBeta: bound = LOWER_BOUND
+        else: bound = EXACT
+        self.transpositions[key] = (depth, bestValue, bound, bestAction)
+        return bestValue, bestAction
+
+class ExpectimaxAgent(MultiAgentSearchAgent):
+    """
+    Expectimax search: Pacman maximizes the evaluation, and every ghost is
+    assumed to choose uniformly at random among its legal moves.  Chance nodes
+    cannot be pruned, so only Pacman's moves are ordered.
+    """
+
+    def search(self, state, agentIndex, depth, alpha, beta, deadline, ply):
+        self.tick(deadline)
+        if depth == 0 or state.isWin() or state.isLose():
+            return self.evaluationFunction(state), None
+
+        key = (state.getHashKey(), agentIndex)
+        entry = self.transpositions.get(key)
+        tableAction = None
+        if entry is not None:
+            entryDepth, value, bound, tableAction = entry
+            if entryDepth >= depth: return value, tableAction
+
+        nextIndex, nextDepth = self.nextAgent(state, agentIndex, depth)
+        if agentIndex == 0:
+            bestValue, bestAction = None, None
+            for action in self.orderActions(state, agentIndex, ply, tableAction):
+                successor = state.generateSuccessor(agentIndex, action)
+                value = self.search(successor, nextIndex, nextDepth, alpha, beta, deadline, ply + 1)[0]
+                if bestValue is None or value > bestValue: bestValue, bestAction = value, action
+            self.history[(agentIndex, bestAction)] += depth * depth
+        else:
+            actions = state.getLegalActions(agentIndex)
+            total = 0.0
+            for action in actions:
+                successor = state.generateSuccessor(agentIndex, action)
+                total += self.search(successor, nextIndex, nextDepth, alpha, beta, deadline, ply + 1)[0]
+            bestValue, bestAction = total / len(actions), None
+
+        self.transpositions[key] = (depth, bestValue, EXACT, bestAction)
+        return bestValue, bestAction
+
+def scoreEvaluationFunction(state):
+    "The score of the state, as shown in the Pacman GUI"
+    return state.getScore()
+
+def betterEvaluationFunction(state):
+    """
+    The score, adjusted by how close Pacman is to the nearest food and capsule
+    and to the ghosts: Pacman is drawn to scared ghosts it can still reach
+    and kept away from the others.  Distances are maze distances.
+    """
+    score = state.getScore()
+    if state.isWin() or state.isLose(): return score
+
+    walls = state.getWalls()
+    position = state.getPacmanPosition()
+    distances = distanceFields.getMazeDistances(walls)
+
+    foodDistances = [distances.getDistance(position, food) for food in state.getFood().asList()]
+    foodDistances = [d for d in foodDistances if d is not None]
+    if foodDistances: score -= 1.5 * min(foodDistances)
+
+    capsules = state.getCapsules()
+    score -= 20 * len(capsules)
+
+    for ghostState in state.getGhostStates():
+        ghost = nearestPoint(ghostState.getPosition())
+        distance = distances.getDistance(position, ghost)
+        if distance is None: continue
+        if ghostState.scaredTimer > distance:
+            score += 200.0 / (distance + 1)
+        elif distance <= 1:
+            score -= 500
+        elif distance <= 3:
+            score -= 20.0 / distance
+    return score
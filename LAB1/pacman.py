@@ -71,11 +71,17 @@ class GameState:
     # Accessor methods: use these to access state data #
     ####################################################
 
-    # static variable keeps track of which states have had getLegalActions called
-    explored = set()
+    # static variable that, when set to an ExploredTracker (see --explored),
+    # records the states created by generateSuccessor; None turns tracking off
+    explored = None
     def getAndResetExplored():
-        tmp = GameState.explored.copy()
-        GameState.explored = set()
+        """
+        Returns the set of hashes of the states explored since the last call,
+        which is empty when tracking is off.
+        """
+        if GameState.explored is None: return set()
+        tmp = GameState.explored.hashes
+        GameState.explored.reset()
         return tmp
     getAndResetExplored = staticmethod(getAndResetExplored)
 
@@ -120,8 +126,9 @@ class GameState:
         # Book keeping
         state.data._agentMoved = agentIndex
         state.data.score += state.data.scoreChange
-        GameState.explored.add(self)
-        GameState.explored.add(state)
+        if GameState.explored is not None:
+            GameState.explored.add(self)
+            GameState.explored.add(state)
         return state
 
     def getLegalPacmanActions( self ):
@@ -243,6 +250,15 @@ class GameState:
         """
         return hash( self.data )
 
+    def getHashKey( self ):
+        """
+        Returns a 64-bit key of the state, kept up to date as the state is
+        generated.  Equal states have equal keys, and different states share
+        one only with a vanishing probability, so search agents can store the
+        key instead of the state.
+        """
+        return self.data.getKey()
+
     def __str__( self ):
 
         return str(self.data)
@@ -253,6 +269,33 @@ class GameState:
         """
         self.data.initialize(layout, numGhostAgents)
 
+class ExploredTracker:
+    """
+    Counts the distinct states generated during a game.  Only the hashes of the
+    states are kept, and at most maxSize of them: once the set is full, new
+    hashes are only counted, so the count may then include repeats.
+    """
+    def __init__( self, maxSize=100000 ):
+        self.maxSize = maxSize
+        self.reset()
+
+    def reset( self ):
+        self.hashes = set()
+        self.overflow = 0
+
+    def add( self, state ):
+        key = hash( state )
+        if key in self.hashes: return
+        if len( self.hashes ) < self.maxSize: self.hashes.add( key )
+        else: self.overflow += 1
+
+    def count( self ):
+        return len( self.hashes ) + self.overflow
+
+    def __str__( self ):
+        if self.overflow == 0: return '%d states explored' % self.count()
+        return 'about %d states explored (more than the %d hashes kept)' % (self.count(), self.maxSize)
+
 ############################################################################
 #                     THE HIDDEN SECRETS OF PACMAN                         #
 #                                                                          #
@@ -271,12 +314,16 @@ class ClassicGameRules:
     def __init__(self, timeout=30):
         self.timeout = timeout
 
-    def newGame( self, layout, pacmanAgent, ghostAgents, display, quiet = False, catchExceptions=False):
+    def newGame( self, layout, pacmanAgent, ghostAgents, display, quiet = False, catchExceptions=False, fast=False):
         agents = [pacmanAgent] + ghostAgents[:layout.getNumGhosts()]
         initState = GameState()
         initState.initialize( layout, len(ghostAgents) )
-        game = Game(agents, display, self, catchExceptions=catchExceptions)
+        game = Game(agents, display, self, catchExceptions=catchExceptions, fast=fast)
         game.state = initState
+        # Agents that search while playing need to know how long they may take
+        for index, agent in enumerate(agents):
+            if 'setTimeLimits' in dir(agent):
+                agent.setTimeLimits(self.getMoveTimeout(index), self.getMaxTotalTime(index))
         self.initialState = initState.deepCopy()
         self.quiet = quiet
         return game
@@ -331,7 +378,11 @@ class PacmanRules:
         """
         Returns a list of possible actions.
         """
-        return Actions.getPossibleActions( state.getPacmanState().configuration, state.data.layout.walls )
+        conf = state.data.agentStates[0].configuration
+        legal = state.data.layout.getLegalActions( conf )
+        if legal is None:
+            legal = Actions.getPossibleActions( conf, state.data.layout.walls )
+        return legal
     getLegalActions = staticmethod( getLegalActions )
 
     def applyAction( state, action ):
@@ -361,8 +412,8 @@ class PacmanRules:
         # Eat food
         if state.data.food[x][y]:
             state.data.scoreChange += 10
-            state.data.food = state.data.food.copy()
-            state.data.food[x][y] = False
+            state.data.food = state.data.food.withCell( x, y, False )
+            state.data.foodChanged( position )
             state.data._foodEaten = position
             # TODO: cache numFood?
             numFood = state.getNumFood()
@@ -371,7 +422,8 @@ class PacmanRules:
                 state.data._win = True
         # Eat capsule
         if( position in state.getCapsules() ):
-            state.data.capsules.remove( position )
+            state.data.capsules = [capsule for capsule in state.data.capsules if capsule != position]
+            state.data.capsuleChanged( position )
             state.data._capsuleEaten = position
             # Reset all ghosts' scared timers
             for index in range( 1, len( state.data.agentStates ) ):
@@ -389,6 +441,9 @@ class GhostRules:
         reach a dead end, but can turn 90 degrees at intersections.
         """
         conf = state.getGhostState( ghostIndex ).configuration
+        legal = state.data.layout.getGhostLegalActions( conf )
+        if legal is not None: return legal
+        # Between cells, as scared ghosts are after a half step
         possibleActions = Actions.getPossibleActions( conf, state.data.layout.walls )
         reverse = Actions.reverseDirection( conf.direction )
         if Directions.STOP in possibleActions:
@@ -498,6 +553,10 @@ def readCommand( argv ):
                       metavar='TYPE', default='KeyboardAgent')
     parser.add_option('-t', '--textGraphics', action='store_true', dest='textGraphics',
                       help='Display output as text only', default=False)
+    parser.add_option('--ansi', action='store_true', dest='ansi',
+                      help='Display output as text redrawn in place with ANSI escape codes (implies -t)', default=False)
+    parser.add_option('--maxFps', dest='maxFps', type='float',
+                      help=default('Most frames a second drawn with --ansi (0 means no limit)'), default=30)
     parser.add_option('-q', '--quietTextGraphics', action='store_true', dest='quietGraphics',
                       help='Generate minimal output and no graphics', default=False)
     parser.add_option('-g', '--ghosts', dest='ghost',
@@ -510,9 +569,11 @@ def readCommand( argv ):
     parser.add_option('-f', '--fixRandomSeed', action='store_true', dest='fixRandomSeed',
                       help='Fixes the random seed to always play the same game', default=False)
     parser.add_option('-r', '--recordActions', action='store_true', dest='record',
-                      help='Writes game histories to a file (named by the time they were played)', default=False)
+                      help='Writes game logs to files (named by the time they were played)', default=False)
     parser.add_option('--replay', dest='gameToReplay',
-                      help='A recorded game file (pickle) to replay', default=None)
+                      help='A recorded game file (game log or pickle) to replay', default=None)
+    parser.add_option('--seek', dest='seek', type='int',
+                      help=default('The move at which to start a replay'), default=0)
     parser.add_option('-a','--agentArgs',dest='agentArgs',
                       help='Comma separated values sent to agent. e.g. "opt1=val1,opt2,opt3=val3"')
     parser.add_option('-x', '--numTraining', dest='numTraining', type='int',
@@ -523,26 +584,46 @@ def readCommand( argv ):
                       help='Turns on exception handling and timeouts during games', default=False)
     parser.add_option('--timeout', dest='timeout', type='int',
                       help=default('Maximum length of time an agent can spend computing in a single game'), default=30)
+    parser.add_option('--fast', action='store_true', dest='fast',
+                      help='Plays with a faster game loop that trusts agents not to change the state they are given', default=False)
+    parser.add_option('--explored', dest='explored', type='int',
+                      help=default('Counts the states explored in each game, keeping at most this many hashes (0 turns counting off)'), default=0)
+    parser.add_option('--trace', dest='traceFile',
+                      help='Records the nodes expanded by search agents into this file (replay it with searchTrace.py)', default=None)
+    parser.add_option('--asyncGraphics', action='store_true', dest='asyncGraphics',
+                      help='Draws the graphics in a thread of their own, skipping frames the display cannot keep up with', default=False)
+    parser.add_option('--parallel', dest='parallel', type='int',
+                      help=default('Plays the games without graphics in this many worker processes'), default=0)
 
     options, otherjunk = parser.parse_args(argv)
     if len(otherjunk) != 0:
         raise Exception('Command line input not understood: ' + str(otherjunk))
     args = dict()
 
+    # Games played in worker processes cannot be shown
+    if options.parallel > 0:
+        if options.gameToReplay != None or options.traceFile != None:
+            raise Exception('--parallel cannot be combined with --replay or --trace')
+        options.quietGraphics = True
+
+    if options.ansi: options.textGraphics = True
+
     # Fix the random seed
     if options.fixRandomSeed: random.seed('cs188')
 
+    if options.explored > 0: GameState.explored = ExploredTracker(options.explored)
+
     # Choose a layout
     args['layout'] = layout.getLayout( options.layout )
     if args['layout'] == None: raise Exception("The layout " + options.layout + " cannot be found")
 
     # Choose a Pacman agent
     noKeyboard = options.gameToReplay == None and (options.textGraphics or options.quietGraphics)
-    pacmanType = loadAgent(options.pacman, noKeyboard)
     agentOpts = parseAgentArgs(options.agentArgs)
     if options.numTraining > 0:
         args['numTraining'] = options.numTraining
         if 'numTraining' not in agentOpts: agentOpts['numTraining'] = options.numTraining
+    pacmanType = loadAgent(options.pacman, noKeyboard)
     pacman = pacmanType(**agentOpts) # Instantiate Pacman with agentArgs
     args['pacman'] = pacman
 
@@ -562,60 +643,105 @@ def readCommand( argv ):
     elif options.textGraphics:
         import textDisplay
         textDisplay.SLEEP_TIME = options.frameTime
-        args['display'] = textDisplay.PacmanGraphics()
+        if options.ansi: args['display'] = textDisplay.AnsiGraphics(maxFps=options.maxFps)
+        else: args['display'] = textDisplay.PacmanGraphics()
     else:
         import graphicsDisplay
         args['display'] = graphicsDisplay.PacmanGraphics(options.zoom, frameTime = options.frameTime)
+        if options.asyncGraphics:
+            # Keys are read by the game thread, but only the drawing thread may touch the window
+            if options.frameTime < 0 or 'keyboardAgents' in (pacmanType.__module__, ghostType.__module__):
+                raise Exception('--asyncGraphics cannot be used with keyboard agents or a negative frameTime')
+            args['display'] = graphicsDisplay.ThreadedDisplay(args['display'])
+
+    if options.traceFile != None:
+        import searchTrace
+        searchTrace.startRecording(searchTrace.TraceRecorder(open(options.traceFile, 'wb'), options.layout,
+                                                             args['layout'].width, args['layout'].height))
     args['numGames'] = options.numGames
     args['record'] = options.record
     args['catchExceptions'] = options.catchExceptions
     args['timeout'] = options.timeout
+    args['fast'] = options.fast
+    if options.parallel > 0:
+        # The workers build their own agents from these
+        args['parallel'] = options.parallel
+        args['agentSpec'] = (options.pacman, agentOpts, options.ghost, options.numGhosts)
 
     # Special case: recorded games don't use the runGames method or args structure
     if options.gameToReplay != None:
         print 'Replaying recorded game %s.' % options.gameToReplay
+        import gameLog
+        if gameLog.isGameLog(options.gameToReplay):
+            replayGameLog(options.gameToReplay, args['display'], options.seek)
+            sys.exit(0)
         import cPickle
         f = open(options.gameToReplay)
         try: recorded = cPickle.load(f)
         finally: f.close()
         recorded['display'] = args['display']
+        recorded['seek'] = options.seek
         replayGame(**recorded)
         sys.exit(0)
 
     return args
 
-def loadAgent(pacman, nographics):
-    # Looks through all pythonPath Directories for the right module,
+def getAgentDirs():
+    "The directories searched for *Agents.py modules: those on PYTHONPATH and ."
     pythonPathStr = os.path.expandvars("$PYTHONPATH")
     if pythonPathStr.find(';') == -1:
         pythonPathDirs = pythonPathStr.split(':')
     else:
         pythonPathDirs = pythonPathStr.split(';')
     pythonPathDirs.append('.')
+    return [moduleDir for moduleDir in pythonPathDirs if os.path.isdir(moduleDir)]
 
-    for moduleDir in pythonPathDirs:
-        if not os.path.isdir(moduleDir): continue
+def loadAgent(pacman, nographics):
+    """
+    Returns the agent class named pacman.  Only the module that defines it is
+    imported, found through the index of agentRegistry; a name the index does
+    not know is looked for by importing every *Agents.py module.
+    """
+    import agentRegistry
+    for moduleDir in getAgentDirs():
+        for modulename in agentRegistry.findAgentModules(pacman, moduleDir):
+            agent = importAgent(pacman, modulename, nographics)
+            if agent is not None: return agent
+    return scanForAgent(pacman, nographics)
+
+def scanForAgent(pacman, nographics):
+    # Looks through all pythonPath Directories for the right module,
+    for moduleDir in getAgentDirs():
         moduleNames = [f for f in os.listdir(moduleDir) if f.endswith('gents.py')]
         for modulename in moduleNames:
-            try:
-                module = __import__(modulename[:-3])
-            except ImportError:
-                continue
-            if pacman in dir(module):
-                if nographics and modulename == 'keyboardAgents.py':
-                    raise Exception('Using the keyboard requires graphics (not text display)')
-                return getattr(module, pacman)
+            agent = importAgent(pacman, modulename, nographics)
+            if agent is not None: return agent
     raise Exception('The agent ' + pacman + ' is not specified in any *Agents.py.')
 
-def replayGame( layout, actions, display ):
+def importAgent(pacman, modulename, nographics):
+    "Returns the attribute pacman of module modulename, or None"
+    try:
+        module = __import__(modulename[:-3])
+    except ImportError:
+        return None
+    if pacman in dir(module):
+        if nographics and modulename == 'keyboardAgents.py':
+            raise Exception('Using the keyboard requires graphics (not text display)')
+        return getattr(module, pacman)
+    return None
+
+def replayGame( layout, actions, display, seek=0 ):
     import pacmanAgents, ghostAgents
     rules = ClassicGameRules()
     agents = [pacmanAgents.GreedyAgent()] + [ghostAgents.RandomGhost(i+1) for i in range(layout.getNumGhosts())]
     game = rules.newGame( layout, agents[0], agents[1:], display )
     state = game.state
+    # Pickled games hold only the actions, so the moves before seek are replayed unseen
+    for action in actions[:seek]:
+        state = state.generateSuccessor( *action )
     display.initialize(state.data)
 
-    for action in actions:
+    for action in actions[seek:]:
             # Execute the action
         state = state.generateSuccessor( *action )
         # Change the display
@@ -625,7 +751,32 @@ def replayGame( layout, actions, display ):
 
     display.finish()
 
-def runGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0, catchExceptions=False, timeout=30 ):
+def replayGameLog( fileName, display, seek=0 ):
+    """
+    Replays a game log (see gameLog.py) from move seek, which is reached by
+    loading the keyframe before it rather than replaying the whole game.
+    """
+    import gameLog
+    reader = gameLog.GameLogReader(fileName)
+    rules = ClassicGameRules()
+    rules.quiet = False
+    game = Game([], display, rules)
+    state = reader.stateAt(seek)
+    display.initialize(state.data)
+
+    for action in reader.moves(seek):
+        if state.isWin() or state.isLose(): break
+        state = state.generateSuccessor( *action )
+        display.update( state.data )
+        rules.process(state, game)
+
+    reader.close()
+    display.finish()
+
+def runGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0, catchExceptions=False, timeout=30, parallel=0, agentSpec=None, fast=False ):
+    if parallel > 0:
+        return runParallelGames(layout, agentSpec, numGames, record, numTraining, catchExceptions, timeout, parallel, fast)
+
     import __main__
     __main__.__dict__['_display'] = display
 
@@ -642,29 +793,118 @@ def runGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0
         else:
             gameDisplay = display
             rules.quiet = False
-        game = rules.newGame( layout, pacman, ghosts, gameDisplay, beQuiet, catchExceptions)
+        game = rules.newGame( layout, pacman, ghosts, gameDisplay, beQuiet, catchExceptions, fast)
+        if GameState.explored is not None: GameState.explored.reset()
+        if record: startRecording(game, i)
         game.run()
+        if record: game.recorder.close()
         if not beQuiet: games.append(game)
-
-        if record:
-            import time, cPickle
-            fname = ('recorded-game-%d' % (i + 1)) +  '-'.join([str(t) for t in time.localtime()[1:6]])
-            f = file(fname, 'w')
-            components = {'layout': layout, 'actions': game.moveHistory}
-            cPickle.dump(components, f)
-            f.close()
+        if GameState.explored is not None and not beQuiet: print 'Game %d: %s' % (i + 1, GameState.explored)
 
     if (numGames-numTraining) > 0:
         scores = [game.state.getScore() for game in games]
         wins = [game.state.isWin() for game in games]
-        winRate = wins.count(True)/ float(len(wins))
-        print 'Average Score:', sum(scores) / float(len(scores))
-        print 'Scores:       ', ', '.join([str(score) for score in scores])
-        print 'Win Rate:      %d/%d (%.2f)' % (wins.count(True), len(wins), winRate)
-        print 'Record:       ', ', '.join([ ['Loss', 'Win'][int(w)] for w in wins])
+        printSummary(scores, wins)
 
     return games
 
+def startRecording(game, i):
+    "Makes the game write its moves into a game log as they are made"
+    import time, gameLog
+    fname = ('recorded-game-%d' % (i + 1)) +  '-'.join([str(t) for t in time.localtime()[1:6]])
+    game.recorder = gameLog.GameRecorder(file(fname, 'wb'), game.state)
+
+def printSummary(scores, wins):
+    winRate = wins.count(True)/ float(len(wins))
+    print 'Average Score:', sum(scores) / float(len(scores))
+    print 'Scores:       ', ', '.join([str(score) for score in scores])
+    print 'Win Rate:      %d/%d (%.2f)' % (wins.count(True), len(wins), winRate)
+    print 'Record:       ', ', '.join([ ['Loss', 'Win'][int(w)] for w in wins])
+
+class GameResult:
+    "The outcome of a game played in a worker process, sent back to runParallelGames"
+    def __init__(self, index, game):
+        self.index = index
+        self.score = game.state.getScore()
+        self.win = game.state.isWin()
+        self.moves = len(game.moveHistory)
+        self.agentTimes = game.totalAgentTimes
+        self.crashed = game.agentCrashed
+        self.explored = None
+        if GameState.explored is not None: self.explored = str(GameState.explored)
+
+    def __str__(self):
+        times = ', '.join(['%.2fs' % t for t in self.agentTimes])
+        outcome = ['Loss', 'Win'][int(self.win)]
+        if self.crashed: outcome = 'Crash'
+        line = 'Game %d: %s, score %d in %d moves (agent times %s)' % \
+            (self.index + 1, outcome, self.score, self.moves, times)
+        if self.explored is not None: line += ', ' + self.explored
+        return line
+
+_GAME_WORKER = None
+
+def _startGameWorker(layout, agentSpec, record, catchExceptions, timeout, fast):
+    "Runs once in every worker process of runParallelGames"
+    global _GAME_WORKER
+    import signal
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    pacmanName, agentOpts, ghostName, numGhosts = agentSpec
+    pacmanType, ghostType = loadAgent(pacmanName, True), loadAgent(ghostName, True)
+    _GAME_WORKER = (layout, pacmanType, agentOpts, ghostType, numGhosts, record, catchExceptions, timeout, fast)
+
+def _playGame(task):
+    """
+    Plays one game in a worker process.  The agents are built anew for every
+    game, after seeding, so a game's outcome depends only on its seed and not
+    on which worker plays it or what it played before.
+    """
+    index, seed = task
+    layout, pacmanType, agentOpts, ghostType, numGhosts, record, catchExceptions, timeout, fast = _GAME_WORKER
+    random.seed(seed)
+    import textDisplay
+    pacman = pacmanType(**agentOpts)
+    ghosts = [ghostType(i+1) for i in range(numGhosts)]
+    rules = ClassicGameRules(timeout)
+    game = rules.newGame(layout, pacman, ghosts, textDisplay.NullGraphics(), True, catchExceptions, fast)
+    if GameState.explored is not None: GameState.explored.reset()
+    if record: startRecording(game, index)
+    game.run()
+    if record: game.recorder.close()
+    return GameResult(index, game)
+
+def runParallelGames(layout, agentSpec, numGames, record, numTraining, catchExceptions, timeout, workers, fast=False):
+    """
+    Plays numGames games in a pool of worker processes and prints the result
+    of every game as it finishes, then the usual summary in game order.  Game
+    i is played with the random seed baseSeed + i, where baseSeed is drawn from
+    the random module (fixed with -f), so runs can be repeated exactly.
+
+    Every game gets fresh agents, so nothing learned in one game carries over
+    to the next and training games are not supported.
+    """
+    if numTraining > 0:
+        raise Exception('Training games cannot be played in parallel')
+    import multiprocessing
+    baseSeed = random.getrandbits(32)
+    tasks = [(i, baseSeed + i) for i in range(numGames)]
+    pool = multiprocessing.Pool(workers, _startGameWorker, (layout, agentSpec, record, catchExceptions, timeout, fast))
+    results = []
+    try:
+        chunkSize = max(1, numGames / (workers * 32))
+        for result in pool.imap_unordered(_playGame, tasks, chunkSize):
+            print result
+            results.append(result)
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+    results.sort(key=lambda result: result.index)
+    if results:
+        printSummary([result.score for result in results], [result.win for result in results])
+    return results
+
 if __name__ == '__main__':
     """
     The main function called when pacman.py is run
@@ -678,6 +918,8 @@ if __name__ == '__main__':
     """
     args = readCommand( sys.argv[1:] ) # Get game components based on input
     runGames( **args )
+    import searchTrace
+    searchTrace.stopRecording()
 
     # import cProfile
     # cProfile.run("runGames( **args )")
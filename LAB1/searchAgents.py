@@ -40,7 +40,8 @@ from game import Actions
 import util
 import time
 import search
-import numpy as np
+import searchTrace
+import distanceFields
 
 
 class GoWestAgent(Agent):
@@ -72,11 +73,15 @@ class SearchAgent(Agent):
       depthFirstSearch or dfs
       breadthFirstSearch or bfs
 
+    Passing cache=N (e.g. -a fn=astar,heuristic=manhattanHeuristic,cache=5000)
+    memoizes the heuristic in an LRU cache holding the values of the N most
+    recently evaluated states (see util.memoizeHeuristic).
+
 
     Note: You should NOT change any code in SearchAgent
     """
 
-    def __init__(self, fn='depthFirstSearch', prob='PositionSearchProblem', heuristic='nullHeuristic'):
+    def __init__(self, fn='depthFirstSearch', prob='PositionSearchProblem', heuristic='nullHeuristic', cache=0):
         # Warning: some advanced Python magic is employed below to find the right functions and problems
 
         # Get the search function from the name and heuristic
@@ -95,7 +100,7 @@ class SearchAgent(Agent):
                 raise AttributeError, heuristic + ' is not a function in searchAgents.py or search.py.'
             print('[SearchAgent] using function %s and heuristic %s' % (fn, heuristic))
             # Note: this bit of Python trickery combines the search algorithm and the heuristic
-            self.searchFunction = lambda x: func(x, heuristic=heur)
+            self.searchFunction = self.withHeuristic(func, heur, int(cache))
 
         # Get the search problem type from the name
         if prob not in globals().keys() or not prob.endswith('Problem'):
@@ -115,10 +120,30 @@ class SearchAgent(Agent):
         if self.searchFunction == None: raise Exception, "No search function provided for SearchAgent"
         starttime = time.time()
         problem = self.searchType(state) # Makes a new search problem
+        searchTrace.recordSearch()
         self.actions  = self.searchFunction(problem) # Find a path
         totalCost = problem.getCostOfActions(self.actions)
         print('Path found with total cost of %d in %.1f seconds' % (totalCost, time.time() - starttime))
         if '_expanded' in dir(problem): print('Search nodes expanded: %d' % problem._expanded)
+        if 'heuristicCache' in dir(self) and self.heuristicCache is not None:
+            print('Heuristic cache: %s' % self.heuristicCache)
+
+    def withHeuristic(self, searchFunction, heuristic, cacheSize=0):
+        """
+        Combines a search function with a heuristic.  If cacheSize is positive,
+        the heuristic is memoized for every problem it is used on, and the cache
+        of the latest search is kept in self.heuristicCache for reporting.
+        """
+        self.heuristicCache = None
+        if cacheSize <= 0:
+            return lambda problem: searchFunction(problem, heuristic=heuristic)
+        print('[SearchAgent] caching heuristic values of up to %d states' % cacheSize)
+
+        def cachedSearch(problem):
+            memoized = util.memoizeHeuristic(heuristic, cacheSize)
+            self.heuristicCache = memoized.cache
+            return searchFunction(problem, heuristic=memoized)
+        return cachedSearch
 
     def getAction(self, state):
         """
@@ -137,6 +162,14 @@ class SearchAgent(Agent):
             return Directions.STOP
 
 
+def expansionDisplay():
+    "Returns the display of the running game if it can draw expanded cells, or None"
+    import __main__
+    if '_display' in dir(__main__):
+        if 'drawExpandedCells' in dir(__main__._display): #@UndefinedVariable
+            return __main__._display #@UndefinedVariable
+    return None
+
 class PositionSearchProblem(search.SearchProblem):
     """
     A search problem defines the state space, start state, goal test, successor
@@ -165,8 +198,10 @@ class PositionSearchProblem(search.SearchProblem):
         if warn and (gameState.getNumFood() != 1 or not gameState.hasFood(*goal)):
             print 'Warning: this does not look like a regular search maze'
 
-        # For display purposes
+        # For display purposes; expanded cells are only kept when they can be drawn
         self._visited, self._visitedlist, self._expanded = {}, [], 0 # DO NOT CHANGE
+        self._expansionDisplay = None
+        if visualize: self._expansionDisplay = expansionDisplay()
 
     def getStartState(self):
         return self.startState
@@ -175,12 +210,9 @@ class PositionSearchProblem(search.SearchProblem):
         isGoal = state == self.goal
 
         # For display purposes only
-        if isGoal and self.visualize:
+        if isGoal and self._expansionDisplay is not None:
             self._visitedlist.append(state)
-            import __main__
-            if '_display' in dir(__main__):
-                if 'drawExpandedCells' in dir(__main__._display): #@UndefinedVariable
-                    __main__._display.drawExpandedCells(self._visitedlist) #@UndefinedVariable
+            self._expansionDisplay.drawExpandedCells(self._visitedlist)
 
         return isGoal
 
@@ -208,9 +240,10 @@ class PositionSearchProblem(search.SearchProblem):
 
         # Bookkeeping for display purposes
         self._expanded += 1 # DO NOT CHANGE
-        if state not in self._visited:
+        if self._expansionDisplay is not None and state not in self._visited:
             self._visited[state] = True
             self._visitedlist.append(state)
+        searchTrace.recordExpansion(state)
 
         return successors
 
@@ -343,6 +376,7 @@ class CornersProblem(search.SearchProblem):
                 successors.append((((next_x, next_y), corners), action, 1))
 
         self._expanded += 1  # DO NOT CHANGE
+        searchTrace.recordExpansion(state)
         return successors
 
     def getCostOfActions(self, actions):
@@ -393,8 +427,8 @@ def cornersHeuristic(state, problem):
 
 class AStarCornersAgent(SearchAgent):
     "A SearchAgent for FoodSearchProblem using A* and your foodHeuristic"
-    def __init__(self):
-        self.searchFunction = lambda prob: search.aStarSearch(prob, cornersHeuristic)
+    def __init__(self, cache=0):
+        self.searchFunction = self.withHeuristic(search.aStarSearch, cornersHeuristic, int(cache))
         self.searchType = CornersProblem
 
 
@@ -419,6 +453,10 @@ class FoodSearchProblem:
     def getStartState(self):
         return self.start
 
+    def getCacheKey(self, state):
+        "Hashable key for memoizing heuristics: the position and packed food Grid"
+        return state[0], state[1].packBits()
+
     def isGoalState(self, state):
         return state[1].count() == 0
 
@@ -426,13 +464,14 @@ class FoodSearchProblem:
         "Returns successor states, the actions they require, and a cost of 1."
         successors = []
         self._expanded += 1 # DO NOT CHANGE
+        searchTrace.recordExpansion(state)
         for direction in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
             x,y = state[0]
             dx, dy = Actions.directionToVector(direction)
             nextx, nexty = int(x + dx), int(y + dy)
             if not self.walls[nextx][nexty]:
-                nextFood = state[1].copy()
-                nextFood[nextx][nexty] = False
+                nextFood = state[1]
+                if nextFood[nextx][nexty]: nextFood = nextFood.withCell(nextx, nexty, False)
                 successors.append( ( ((nextx, nexty), nextFood), direction, 1) )
         return successors
 
@@ -453,8 +492,8 @@ class FoodSearchProblem:
 
 class AStarFoodSearchAgent(SearchAgent):
     "A SearchAgent for FoodSearchProblem using A* and your foodHeuristic"
-    def __init__(self):
-        self.searchFunction = lambda prob: search.aStarSearch(prob, foodHeuristic)
+    def __init__(self, cache=0):
+        self.searchFunction = self.withHeuristic(search.aStarSearch, foodHeuristic, int(cache))
         self.searchType = FoodSearchProblem
 
 
@@ -509,6 +548,7 @@ class ClosestDotSearchAgent(SearchAgent):
         self.actions = []
         currentState = state
         while(currentState.getFood().count() > 0):
+            searchTrace.recordSearch()
             nextPathSegment = self.findPathToClosestDot(currentState) # The missing piece
             self.actions += nextPathSegment
             for action in nextPathSegment:
@@ -554,6 +594,7 @@ class AnyFoodSearchProblem(PositionSearchProblem):
         self.startState = gameState.getPacmanPosition()
         self.costFn = lambda x: 1
         self._visited, self._visitedlist, self._expanded = {}, [], 0 # DO NOT CHANGE
+        self._expansionDisplay = None
 
     def isGoalState(self, state):
         """
@@ -564,8 +605,10 @@ class AnyFoodSearchProblem(PositionSearchProblem):
 
 
 def maze_distance(point1, point2, game_state):
-    return len(search.ucs(PositionSearchProblem(gameState=game_state,
-                                                start=point1,
-                                                goal=point2,
-                                                warn=False,
-                                                visualize=False)))
+    """
+    Returns the maze distance between two points (0 if there is no path).  The
+    distance maps of the layout are computed once and shared by all calls.
+    """
+    distance = distanceFields.mazeDistance(game_state.getWalls(), point1, point2)
+    if distance is None: return 0
+    return distance
@@ -0,0 +1,275 @@
+# searchTrace.py
+# --------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Recording of search expansions, and offline replay of the recordings.
+
+The search problems in searchAgents.py report every state they expand (in
+getSuccessors, like their other bookkeeping) to the active TraceRecorder, if
+there is one.  The search agents mark the start of every search they run.
+When no recorder is active nothing is stored.
+
+A trace file starts with a small header
+
+  'PTRC', version (uint16), layout name length (uint16), layout name,
+  layout width (uint16), layout height (uint16)
+
+followed by fixed size little endian records, one per expanded node:
+
+  state id (uint32), x (int16), y (int16)
+
+State ids are numbered in the order in which states are first expanded; x and
+y are the board cell of the state (-1 if the state has none).  A record with
+state id NEW_SEARCH marks the start of a new search.  The cost, heuristic
+value and frontier of a node are only known to the search functions, which
+students write themselves, so they are not recorded.
+
+To replay a trace into the graphics (or, with -t, the text) display, run
+
+> python searchTrace.py trace.bin --speed 200
+"""
+
+import struct
+import sys
+import time
+
+MAGIC = 'PTRC'
+VERSION = 2
+HEADER = struct.Struct('<4sHH')
+DIMENSIONS = struct.Struct('<HH')
+RECORD = struct.Struct('<Ihh')
+NEW_SEARCH = 0xFFFFFFFF
+
+class TraceRecorder:
+    """
+    Receives the expansions of all searches while it is active (see
+    startRecording).  Expansions are counted and streamed into stream, if one
+    is given.
+    """
+    def __init__(self, stream=None, layoutName='', width=0, height=0):
+        self.stream = stream
+        self.stateIds = {}
+        self.expanded = 0
+        if stream is not None:
+            name = layoutName.encode('utf-8')
+            stream.write(HEADER.pack(MAGIC, VERSION, len(name)))
+            stream.write(name)
+            stream.write(DIMENSIONS.pack(width, height))
+
+    def startSearch(self):
+        "Marks the start of a new search"
+        self.stateIds = {}
+        if self.stream is not None:
+            self.stream.write(RECORD.pack(NEW_SEARCH, -1, -1))
+
+    def expand(self, state):
+        "Records the expansion of state"
+        self.expanded += 1
+        if self.stream is None: return
+        stateId = self.stateIds.setdefault(state, len(self.stateIds))
+        cell = cellOf(state)
+        if cell is None: cell = (-1, -1)
+        self.stream.write(RECORD.pack(stateId, cell[0], cell[1]))
+
+    def close(self):
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
+
+def cellOf(state):
+    """
+    Returns the board cell of a search state: either the state itself, for
+    position states, or its first component, for states such as
+    (position, food) or (position, corners).  Returns None otherwise.
+    """
+    if type(state) is not tuple or len(state) == 0: return None
+    if len(state) == 2 and type(state[0]) is int and type(state[1]) is int:
+        return state
+    first = state[0]
+    if type(first) is tuple and len(first) == 2 and type(first[0]) is int:
+        return first
+    return None
+
+_recorder = None
+
+def startRecording(recorder):
+    "Makes recorder receive the expansions of all following searches"
+    global _recorder
+    stopRecording()
+    _recorder = recorder
+
+def stopRecording():
+    global _recorder
+    if _recorder is not None: _recorder.close()
+    _recorder = None
+
+def getRecorder():
+    "Returns the active TraceRecorder, or None when searches are not traced"
+    return _recorder
+
+def recordSearch():
+    "Marks the start of a new search, if searches are traced"
+    if _recorder is not None: _recorder.startSearch()
+
+def recordExpansion(state):
+    "Records the expansion of state, if searches are traced"
+    if _recorder is not None: _recorder.expand(state)
+
+#####################
+# Reading a trace   #
+#####################
+
+class TraceReader:
+    """
+    Reads a trace file written by a TraceRecorder.  Iterating over the reader
+    yields (stateId, x, y) tuples, including the
+    NEW_SEARCH markers.
+    """
+    def __init__(self, fileName):
+        self.file = open(fileName, 'rb')
+        magic, version, nameLength = HEADER.unpack(self.file.read(HEADER.size))
+        if magic != MAGIC: raise Exception('%s is not a search trace' % fileName)
+        if version != VERSION: raise Exception('Unsupported search trace version %d' % version)
+        self.layoutName = self.file.read(nameLength).decode('utf-8')
+        self.width, self.height = DIMENSIONS.unpack(self.file.read(DIMENSIONS.size))
+
+    def __iter__(self):
+        chunkSize = RECORD.size * 4096
+        while True:
+            chunk = self.file.read(chunkSize)
+            if not chunk: break
+            for offset in range(0, len(chunk) - RECORD.size + 1, RECORD.size):
+                yield RECORD.unpack_from(chunk, offset)
+
+    def close(self):
+        self.file.close()
+
+def countExpansions(fileName):
+    "Returns the number of expansions of every search in the trace, in order"
+    reader = TraceReader(fileName)
+    counts = []
+    for record in reader:
+        if record[0] == NEW_SEARCH: counts.append(0)
+        elif counts: counts[-1] += 1
+        else: counts.append(1)
+    reader.close()
+    return counts
+
+class TextTraceDisplay:
+    "Prints the layout with the expanded cells marked"
+    def __init__(self, layout):
+        self.layout = layout
+        self.reset()
+
+    def reset(self):
+        self.rows = [list(line) for line in self.layout.layoutText]
+
+    def addExpandedCells(self, cells, first, total):
+        for x, y in cells:
+            self.rows[self.layout.height - 1 - y][x] = '*'
+
+    def show(self, record, expanded):
+        print '\n'.join([''.join(row) for row in self.rows])
+        print 'Expanded: %d\n' % expanded
+
+class GraphicsTraceDisplay:
+    "Draws the expanded cells on top of the layout in the graphics display"
+    def __init__(self, layout, zoom):
+        import graphicsDisplay, pacman
+        self.display = graphicsDisplay.PacmanGraphics(zoom, frameTime=0)
+        state = pacman.GameState()
+        state.initialize(layout, 0)
+        self.display.initialize(state.data)
+
+    def reset(self):
+        self.display.clearExpandedCells()
+        self.display.expandedCells = []
+
+    def addExpandedCells(self, cells, first, total):
+        self.display.addExpandedCells(cells, first, total)
+
+    def show(self, record, expanded):
+        import graphicsUtils
+        graphicsUtils.refresh()
+
+def replayTrace(fileName, display, speed=100, framesPerSecond=25):
+    """
+    Replays a trace at speed expansions per second (as fast as possible if
+    speed is not positive), showing at most framesPerSecond frames a second.
+    """
+    counts = countExpansions(fileName)
+    perFrame = 0
+    if speed > 0: perFrame = max(1, int(speed / float(framesPerSecond)))
+
+    searchIndex, expanded, pending, last = -1, 0, [], None
+    frameStart = time.time()
+    reader = TraceReader(fileName)
+    for record in reader:
+        if record[0] == NEW_SEARCH or searchIndex < 0:
+            if last is not None:
+                display.addExpandedCells(pending, expanded - len(pending), counts[searchIndex])
+                display.show(last, expanded)
+            searchIndex, expanded, pending, last = searchIndex + 1, 0, [], None
+            display.reset()
+            if record[0] == NEW_SEARCH: continue
+        expanded, last = expanded + 1, record
+        if record[1] >= 0: pending.append((record[1], record[2]))
+        if perFrame and expanded % perFrame == 0:
+            display.addExpandedCells(pending, expanded - len(pending), counts[searchIndex])
+            display.show(record, expanded)
+            pending = []
+            delay = 1.0 / framesPerSecond - (time.time() - frameStart)
+            if delay > 0: time.sleep(delay)
+            frameStart = time.time()
+    reader.close()
+    if last is not None:
+        display.addExpandedCells(pending, expanded - len(pending), counts[searchIndex])
+        display.show(last, expanded)
+
+def readCommand(argv):
+    from optparse import OptionParser
+    usageStr = """
+    USAGE:      python searchTrace.py <options> TRACE_FILE
+    EXAMPLES:   python pacman.py -l bigMaze -p SearchAgent -a fn=bfs -q --trace bfs.trace
+                python searchTrace.py bfs.trace --speed 500
+    """
+    parser = OptionParser(usageStr)
+    parser.add_option('-s', '--speed', type='float', dest='speed', default=100,
+                      help='Expansions shown per second, 0 for as fast as possible [Default: %default]')
+    parser.add_option('-t', '--textGraphics', action='store_true', dest='textGraphics', default=False,
+                      help='Display output as text only')
+    parser.add_option('-z', '--zoom', type='float', dest='zoom', default=1.0,
+                      help='Zoom the size of the graphics window [Default: %default]')
+    parser.add_option('-l', '--layout', dest='layout', default=None,
+                      help='Layout to draw on, if not the one named in the trace')
+    options, args = parser.parse_args(argv)
+    if len(args) != 1: parser.error('Exactly one trace file is needed')
+    return options, args[0]
+
+if __name__ == '__main__':
+    import layout
+    options, fileName = readCommand(sys.argv[1:])
+    reader = TraceReader(fileName)
+    layoutName = options.layout or reader.layoutName
+    reader.close()
+    traceLayout = layout.getLayout(layoutName)
+    if traceLayout == None: raise Exception("The layout " + layoutName + " cannot be found")
+    if options.textGraphics:
+        display = TextTraceDisplay(traceLayout)
+    else:
+        display = GraphicsTraceDisplay(traceLayout, options.zoom)
+    replayTrace(fileName, display, options.speed)
+    if not options.textGraphics:
+        import graphicsUtils
+        graphicsUtils.wait_for_keys()
@@ -0,0 +1,72 @@
+# startupBenchmark.py
+# -------------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Measures how long short pacman.py runs take from start to exit, and how much
+of it finding the agent classes costs with the agent index (loadAgent) and
+by importing every agent module (scanForAgent).  Every case runs in a fresh
+Python process, repeats times; the fastest and the median run are shown.
+
+> python startupBenchmark.py
+> python startupBenchmark.py -r 20 -p ExpectimaxAgent
+"""
+
+import subprocess
+import sys
+import time
+
+def timeRun(command, repeats):
+    "The sorted wall-clock times of running command repeats times"
+    times = []
+    for i in range(repeats):
+        start = time.time()
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        output = process.communicate()[0]
+        times.append(time.time() - start)
+        if process.returncode != 0:
+            raise Exception('%s failed:\n%s' % (' '.join(command), output))
+    return sorted(times)
+
+def lookupCommand(function, agents):
+    code = 'import pacman\nfor name in %r: pacman.%s(name, True)' % (agents, function)
+    return [sys.executable, '-c', code]
+
+def readCommand(argv):
+    from optparse import OptionParser
+    parser = OptionParser('python startupBenchmark.py <options>')
+    parser.add_option('-r', '--repeats', dest='repeats', type='int', default=10,
+                      help='Number of runs of every case [Default: %default]')
+    parser.add_option('-p', '--pacman', dest='pacman', default='GreedyAgent',
+                      help='The Pacman agent of the runs [Default: %default]')
+    parser.add_option('-l', '--layout', dest='layout', default='testClassic',
+                      help='The layout of the runs [Default: %default]')
+    options, args = parser.parse_args(argv)
+    if args: parser.error('Unrecognized arguments: ' + ' '.join(args))
+    return options
+
+if __name__ == '__main__':
+    options = readCommand(sys.argv[1:])
+    agents = [options.pacman, 'RandomGhost']
+    cases = [
+        ('python only', [sys.executable, '-c', 'pass']),
+        ('find agents with the index', lookupCommand('loadAgent', agents)),
+        ('find agents by importing all', lookupCommand('scanForAgent', agents)),
+        ('pacman.py -q -n 1', [sys.executable, 'pacman.py', '-p', options.pacman, '-l', options.layout, '-q', '-n', '1']),
+    ]
+    # The first run writes the agent index if it is missing or out of date
+    timeRun(cases[1][1], 1)
+    print '%-30s %10s %10s' % ('case', 'fastest', 'median')
+    for name, command in cases:
+        times = timeRun(command, options.repeats)
+        print '%-30s %8.1fms %8.1fms' % (name, times[0] * 1000, times[len(times) / 2] * 1000)
@@ -13,6 +13,7 @@
 
 
 import time
+import sys
 try: 
     import pacman
 except:
@@ -22,6 +23,12 @@ DRAW_EVERY = 1
 SLEEP_TIME = 0 # This can be overwritten by __init__
 DISPLAY_MOVES = False
 QUIET = False # Supresses output
+MAX_FPS = 30 # Most frames AnsiGraphics draws in a second
+
+CLEAR_SCREEN = '\033[2J\033[H'
+HIDE_CURSOR = '\033[?25l'
+SHOW_CURSOR = '\033[?25h'
+CLEAR_LINE = '\033[K'
 
 class NullGraphics:
     def initialize(self, state, isBlue = False):
@@ -79,3 +86,116 @@ class PacmanGraphics:
 
     def finish(self):
         pass
+
+class AnsiGraphics(PacmanGraphics):
+    """
+    Draws the board in place in an ANSI terminal (pacman.py --ansi): the
+    first frame is printed whole, and every later frame only moves the cursor
+    to the cells that changed since the frame before and rewrites them.  A
+    frame is drawn at most maxFps times a second (turns in between are
+    skipped) and is sent with a single write, so large layouts can be watched
+    over a slow connection.
+
+    The cells are the characters of GameStateData.__str__.  The walls and
+    food are kept between frames and only the food columns that are not
+    shared with the last drawn food grid (see Grid.withCell) are compared.
+    """
+    def __init__(self, speed=None, maxFps=MAX_FPS, stream=None):
+        PacmanGraphics.__init__(self, speed)
+        self.minFrameTime = 0
+        if maxFps > 0: self.minFrameTime = 1.0 / maxFps
+        self.stream = stream
+        if stream is None: self.stream = sys.stdout
+
+    def initialize(self, state, isBlue = False):
+        walls = state.layout.walls
+        self.width, self.height = walls.width, walls.height
+        # The walls and food, by x then y, and what the terminal shows
+        self.base = [[state._foodWallStr(False, walls[x][y]) for y in range(self.height)]
+                     for x in range(self.width)]
+        self.food = None
+        self.screen = None
+        self.overlay = {}
+        self.score = None
+        self.pending = None
+        self.lastFrame = 0
+        PacmanGraphics.initialize(self, state, isBlue)
+
+    def update(self, state):
+        numAgents = len(state.agentStates)
+        self.agentCounter = (self.agentCounter + 1) % numAgents
+        if state._win or state._lose:
+            self.draw(state)
+        elif self.agentCounter == 0:
+            self.turn += 1
+            if time.time() - self.lastFrame >= self.minFrameTime: self.draw(state)
+            else: self.pending = state
+            self.pause()
+
+    def draw(self, state):
+        self.lastFrame = time.time()
+        self.pending = None
+        changed = self.updateFood(state.food)
+        overlay = {}
+        for agentState in state.agentStates:
+            if agentState.configuration == None: continue
+            x, y = [int(i) for i in pacman.nearestPoint(agentState.configuration.pos)]
+            if agentState.isPacman: overlay[(x, y)] = state._pacStr(agentState.configuration.direction)
+            else: overlay[(x, y)] = state._ghostStr(agentState.configuration.direction)
+        for x, y in state.capsules:
+            overlay[(x, y)] = 'o'
+        changed.update(self.overlay)
+        changed.update(overlay)
+        self.overlay = overlay
+
+        if self.screen is None:
+            self.screen = [row[:] for row in self.base]
+            for (x, y), char in overlay.items(): self.screen[x][y] = char
+            rows = [''.join([self.screen[x][y] for x in range(self.width)])
+                    for y in range(self.height - 1, -1, -1)]
+            output = [CLEAR_SCREEN, HIDE_CURSOR, '\n'.join(rows)]
+        else:
+            output = self.diff(changed)
+        if state.score != self.score:
+            self.score = state.score
+            output.append('\033[%d;1HScore: %d%s' % (self.height + 1, state.score, CLEAR_LINE))
+        if output:
+            self.stream.write(''.join(output))
+            self.stream.flush()
+
+    def updateFood(self, food):
+        "Brings the food in self.base up to food and returns the cells that changed"
+        changed = {}
+        if food is self.food: return changed
+        for x in range(self.width):
+            column = food.data[x]
+            if self.food is not None and column is self.food.data[x]: continue
+            base = self.base[x]
+            for y in range(self.height):
+                if column[y] and base[y] != '.':
+                    base[y] = '.'
+                    changed[(x, y)] = True
+                elif not column[y] and base[y] == '.':
+                    base[y] = ' '
+                    changed[(x, y)] = True
+        self.food = food
+        return changed
+
+    def diff(self, cells):
+        "The escape codes and characters that redraw the cells that changed"
+        output = []
+        overlay, screen = self.overlay, self.screen
+        last = None
+        for x, y in sorted(cells, key=lambda cell: (-cell[1], cell[0])):
+            char = overlay.get((x, y), self.base[x][y])
+            if screen[x][y] == char: continue
+            screen[x][y] = char
+            if last != (x - 1, y): output.append('\033[%d;%dH' % (self.height - y, x + 1))
+            output.append(char)
+            last = (x, y)
+        return output
+
+    def finish(self):
+        if self.pending is not None: self.draw(self.pending)
+        self.stream.write('\033[%d;1H%s' % (self.height + 2, SHOW_CURSOR))
+        self.stream.flush()
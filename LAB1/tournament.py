@@ -0,0 +1,281 @@
+# tournament.py
+# -------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Plays every combination of Pacman agents, agent arguments, ghost types,
+layouts and random seeds in a pool of worker processes and stores the
+outcome of every game in an SQLite database:
+
+  pacman, agentArgs, ghost, layout, seed      the game, unique in the table
+  score, win, moves                           how it went
+  pacmanTime, ghostTime                       seconds the agents took
+  timeWarnings, timedOut, crashed             how the agents misbehaved
+
+A game is played with random.seed(seed) before its agents are built, like a
+game of pacman.py --parallel, so it can be repeated exactly.  Results are
+written in batches of one transaction each, and games already in the
+database are not played again, so a tournament that was stopped is finished
+by running the same command once more.  Games are played with exceptions
+and timeouts caught (pacman.py -c), so a crashing agent loses its game
+instead of stopping the tournament.
+
+-a may be given more than once, for one set of agent arguments each.  Every
+Pacman agent is played with every set, so each agent of -p must take all the
+arguments of every -a; this is checked before any game is played.  For
+example:
+
+> python tournament.py -p AlphaBetaAgent,ExpectimaxAgent -a depth=1 -a depth=2 -l smallClassic,mediumClassic -n 100
+> python tournament.py --report --by pacman,agentArgs,layout
+"""
+
+import random
+import time
+import sys
+
+DATABASE = 'tournament.db'
+COLUMNS = ['pacman', 'agentArgs', 'ghost', 'layout', 'seed',
+           'score', 'win', 'moves', 'pacmanTime', 'ghostTime',
+           'timeWarnings', 'timedOut', 'crashed', 'finished']
+KEY_COLUMNS = COLUMNS[:5]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    pacman TEXT NOT NULL,
+    agentArgs TEXT NOT NULL,
+    ghost TEXT NOT NULL,
+    layout TEXT NOT NULL,
+    seed INTEGER NOT NULL,
+    score REAL,
+    win INTEGER,
+    moves INTEGER,
+    pacmanTime REAL,
+    ghostTime REAL,
+    timeWarnings INTEGER,
+    timedOut INTEGER,
+    crashed INTEGER,
+    finished REAL,
+    PRIMARY KEY (pacman, agentArgs, ghost, layout, seed)
+)
+"""
+
+def openDatabase(fileName=DATABASE):
+    import sqlite3
+    connection = sqlite3.connect(fileName)
+    connection.execute(SCHEMA)
+    # Every batch is committed as a whole; losing the last batch to a power cut is fine
+    connection.execute('PRAGMA synchronous = NORMAL')
+    connection.commit()
+    return connection
+
+def canonicalArgs(agentArgs):
+    "agentArgs with its options sorted, so equal arguments are stored the same way"
+    import pacman
+    opts = pacman.parseAgentArgs(agentArgs or None)
+    return ','.join(['%s=%s' % (key, opts[key]) for key in sorted(opts)])
+
+def takesArgs(agentType, opts):
+    "Whether the constructor of agentType accepts the keyword arguments opts"
+    import inspect
+    init = getattr(agentType, '__init__', None)
+    if not inspect.ismethod(init): return not opts
+    argNames, varArgs, keywords, defaults = inspect.getargspec(init)
+    if keywords is not None: return True
+    return len([name for name in opts if name not in argNames[1:]]) == 0
+
+def buildMatrix(pacmen, agentArgs, ghosts, layouts, seeds):
+    "The keys of every game of the tournament, in the order they are played"
+    agentArgs = [canonicalArgs(args) for args in agentArgs or ['']]
+    return [(p, a, g, l, s) for l in layouts for p in pacmen for a in agentArgs
+            for g in ghosts for s in seeds]
+
+def storedKeys(connection):
+    return set(connection.execute('SELECT %s FROM games' % ', '.join(KEY_COLUMNS)))
+
+def storeResults(connection, rows):
+    "Writes rows, tuples in the order of COLUMNS, in one transaction"
+    statement = 'INSERT OR REPLACE INTO games (%s) VALUES (%s)' % (', '.join(COLUMNS), ', '.join(['?'] * len(COLUMNS)))
+    connection.executemany(statement, rows)
+    connection.commit()
+
+# name -> agent class or layout, in every worker process
+_AGENT_TYPES = {}
+_LAYOUTS = {}
+_TIMEOUT = 30
+
+def _startWorker(timeout):
+    "Runs once in every worker process of runTournament"
+    global _TIMEOUT
+    import signal
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _TIMEOUT = timeout
+
+def _playTournamentGame(key):
+    "Plays the game of key in a worker process and returns its row"
+    import pacman, layout, textDisplay
+    pacmanName, agentArgs, ghostName, layoutName, seed = key
+    for name in (pacmanName, ghostName):
+        if name not in _AGENT_TYPES: _AGENT_TYPES[name] = pacman.loadAgent(name, True)
+    if layoutName not in _LAYOUTS:
+        _LAYOUTS[layoutName] = layout.getLayout(layoutName)
+        if _LAYOUTS[layoutName] == None: raise Exception("The layout " + layoutName + " cannot be found")
+    gameLayout = _LAYOUTS[layoutName]
+    random.seed(seed)
+    agent = _AGENT_TYPES[pacmanName](**pacman.parseAgentArgs(agentArgs or None))
+    ghosts = [_AGENT_TYPES[ghostName](i + 1) for i in range(gameLayout.getNumGhosts())]
+    rules = pacman.ClassicGameRules(_TIMEOUT)
+    game = rules.newGame(gameLayout, agent, ghosts, textDisplay.NullGraphics(), True, True)
+    game.run()
+    times, warnings = game.totalAgentTimes, game.totalAgentTimeWarnings
+    return key + (game.state.getScore(), int(game.state.isWin()), len(game.moveHistory),
+                  times[0], sum(times[1:]), sum(warnings), int(game.agentTimeout),
+                  int(game.agentCrashed), time.time())
+
+def runTournament(connection, keys, workers=4, batchSize=100, timeout=30, quiet=False):
+    """
+    Plays the games of keys that are not in the database yet and stores
+    them batchSize at a time.  Returns the number of games played.  If the
+    tournament is interrupted, the games that finished are stored first.
+    """
+    import multiprocessing
+    done = storedKeys(connection)
+    keys = [key for key in keys if key not in done]
+    if not quiet: print '%d games stored, %d to play' % (len(done), len(keys))
+    if not keys: return 0
+    # A misspelled agent or layout fails here rather than in every worker
+    import pacman, layout
+    for name in set([key[0] for key in keys] + [key[2] for key in keys]):
+        pacman.loadAgent(name, True)
+    for name, agentArgs in set([key[:2] for key in keys]):
+        if not takesArgs(pacman.loadAgent(name, True), pacman.parseAgentArgs(agentArgs or None)):
+            raise Exception('%s does not take the agent arguments "%s"' % (name, agentArgs))
+    for name in set([key[3] for key in keys]):
+        if layout.getLayout(name) == None: raise Exception("The layout " + name + " cannot be found")
+    pool = multiprocessing.Pool(workers, _startWorker, (timeout,))
+    batch, played, start = [], 0, time.time()
+    try:
+        chunkSize = max(1, min(16, len(keys) / (workers * 32)))
+        for row in pool.imap_unordered(_playTournamentGame, keys, chunkSize):
+            batch.append(row)
+            if len(batch) >= batchSize:
+                storeResults(connection, batch)
+                played += len(batch)
+                batch = []
+                if not quiet: print '%d/%d games played in %.1fs' % (played, len(keys), time.time() - start)
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+        if batch:
+            storeResults(connection, batch)
+            played += len(batch)
+    if not quiet: print '%d games played in %.1fs' % (played, time.time() - start)
+    return played
+
+def summarize(connection, groupBy=('pacman', 'agentArgs', 'ghost', 'layout'), where=None, parameters=()):
+    """
+    One row for every group of stored games: the values of the groupBy
+    columns, then the number of games, mean score, score standard deviation,
+    win rate, mean moves, mean Pacman time, and the numbers of games lost to
+    timeouts and crashes.  where is an optional SQL condition on the games.
+    """
+    for column in groupBy:
+        if column not in KEY_COLUMNS: raise Exception('Cannot group games by ' + column)
+    columns = ', '.join(groupBy)
+    query = ('SELECT %s%sCOUNT(*), AVG(score), AVG(score * score), AVG(win), AVG(moves), '
+             'AVG(pacmanTime), SUM(timedOut), SUM(crashed) FROM games' % (columns, groupBy and ', ' or ''))
+    if where: query += ' WHERE ' + where
+    if groupBy: query += ' GROUP BY %s ORDER BY %s' % (columns, columns)
+    rows = []
+    for row in connection.execute(query, parameters):
+        group, (games, mean, meanSquare, wins, moves, pacmanTime, timedOut, crashed) = row[:len(groupBy)], row[len(groupBy):]
+        deviation = max(0.0, meanSquare - mean * mean) ** 0.5
+        rows.append(tuple(group) + (games, mean, deviation, wins, moves, pacmanTime, timedOut, crashed))
+    return rows
+
+def printSummary(rows, groupBy):
+    headers = list(groupBy) + ['games', 'score', 'stdev', 'win rate', 'moves', 'time', 'timeouts', 'crashes']
+    lines = [headers]
+    for row in rows:
+        group, (games, mean, deviation, wins, moves, pacmanTime, timedOut, crashed) = row[:len(groupBy)], row[len(groupBy):]
+        lines.append([str(value) for value in group] +
+                     ['%d' % games, '%.1f' % mean, '%.1f' % deviation, '%.3f' % wins, '%.1f' % moves,
+                      '%.3fs' % pacmanTime, '%d' % timedOut, '%d' % crashed])
+    widths = [max([len(line[i]) for line in lines]) for i in range(len(headers))]
+    for line in lines:
+        print '  '.join([value.ljust(width) for value, width in zip(line, widths)])
+
+def parseSeeds(seeds):
+    "Seeds given as a comma separated list of numbers and ranges, e.g. 0-99,500"
+    result = []
+    for part in seeds.split(','):
+        if '-' in part.strip('-'):
+            first, last = part.split('-', 1)
+            result.extend(range(int(first), int(last) + 1))
+        elif part:
+            result.append(int(part))
+    return result
+
+def readCommand(argv):
+    from optparse import OptionParser
+    usageStr = """
+    USAGE:      python tournament.py <options>
+    EXAMPLES:   (1) python tournament.py -p AlphaBetaAgent,ExpectimaxAgent -a depth=2 -l smallClassic -n 100
+                    - plays 100 seeds of each agent and stores them in tournament.db
+                (2) python tournament.py --report --by pacman,layout
+                    - prints the stored results grouped by agent and layout
+    """
+    parser = OptionParser(usageStr)
+    parser.add_option('-d', '--database', dest='database', default=DATABASE,
+                      help='The SQLite file of the results [Default: %default]')
+    parser.add_option('-p', '--pacman', dest='pacman', default='GreedyAgent',
+                      help='Comma separated Pacman agents [Default: %default]')
+    parser.add_option('-a', '--agentArgs', dest='agentArgs', action='append', default=None,
+                      help='Arguments of the Pacman agents, e.g. "opt1=val1,opt2"; give -a again for another set')
+    parser.add_option('-g', '--ghosts', dest='ghosts', default='RandomGhost',
+                      help='Comma separated ghost agents [Default: %default]')
+    parser.add_option('-l', '--layout', dest='layout', default='mediumClassic',
+                      help='Comma separated layouts [Default: %default]')
+    parser.add_option('-n', '--numGames', dest='numGames', type='int', default=10,
+                      help='Play seeds 0 to numGames - 1 [Default: %default]')
+    parser.add_option('--seeds', dest='seeds', default=None,
+                      help='The seeds to play instead of -n, e.g. "0-99,500"')
+    parser.add_option('-w', '--workers', dest='workers', type='int', default=4,
+                      help='Number of worker processes [Default: %default]')
+    parser.add_option('--batchSize', dest='batchSize', type='int', default=100,
+                      help='Number of results written in one transaction [Default: %default]')
+    parser.add_option('--timeout', dest='timeout', type='int', default=30,
+                      help='Maximum length of time an agent can spend computing in a single game [Default: %default]')
+    parser.add_option('--report', action='store_true', dest='report', default=False,
+                      help='Only print the summary of the stored results')
+    parser.add_option('--by', dest='groupBy', default='pacman,agentArgs,ghost,layout',
+                      help='Comma separated columns to group the summary by [Default: %default]')
+    parser.add_option('-q', '--quiet', action='store_true', dest='quiet', default=False,
+                      help='Do not print progress')
+    options, args = parser.parse_args(argv)
+    if args: parser.error('Unrecognized arguments: ' + ' '.join(args))
+    if options.workers < 1: parser.error('At least one worker is needed')
+    return options
+
+if __name__ == '__main__':
+    options = readCommand(sys.argv[1:])
+    connection = openDatabase(options.database)
+    if not options.report:
+        if options.seeds: seeds = parseSeeds(options.seeds)
+        else: seeds = range(options.numGames)
+        keys = buildMatrix(options.pacman.split(','), options.agentArgs, options.ghosts.split(','),
+                           options.layout.split(','), seeds)
+        runTournament(connection, keys, options.workers, options.batchSize, options.timeout, options.quiet)
+    groupBy = [column for column in options.groupBy.split(',') if column]
+    printSummary(summarize(connection, groupBy), groupBy)
+    connection.close()
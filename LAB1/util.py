@@ -13,9 +13,9 @@
 
 
 import sys
-import inspect
 import heapq, random
 import cStringIO
+import collections
 
 
 class FixedRandom:
@@ -201,6 +201,94 @@ class PriorityQueueWithFunction(PriorityQueue):
         "Adds an item to the queue with priority from the priority function"
         PriorityQueue.push(self, item, self.priorityFunction(item))
 
+class LRUCache:
+    """
+    A mapping with a bounded number of entries.  Once more than maxSize keys
+    are stored, the least recently used one is evicted.  Every lookup is
+    counted as either a hit or a miss so that the usefulness of the cache can
+    be reported afterwards.
+    """
+    def __init__(self, maxSize):
+        if maxSize < 1: raise ValueError, "LRUCache needs room for at least one entry"
+        self.maxSize = maxSize
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        "Returns the value stored for key (marking it as recently used) or default"
+        try:
+            value = self.entries.pop(key)
+        except KeyError:
+            self.misses += 1
+            return default
+        self.entries[key] = value
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        "Stores value under key, evicting the least recently used entry if full"
+        if key in self.entries:
+            del self.entries[key]
+        elif len(self.entries) >= self.maxSize:
+            self.entries.popitem(last=False)
+        self.entries[key] = value
+
+    def clear(self):
+        self.entries.clear()
+        self.hits, self.misses = 0, 0
+
+    def hitRate(self):
+        "Returns the fraction of lookups that were answered from the cache"
+        lookups = self.hits + self.misses
+        if lookups == 0: return 0.0
+        return self.hits / float(lookups)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __str__(self):
+        return '%d hits, %d misses (%.1f%% hit rate), %d/%d entries' % \
+            (self.hits, self.misses, 100 * self.hitRate(), len(self.entries), self.maxSize)
+
+_NOT_CACHED = object()
+
+def memoizeHeuristic(heuristic, maxSize=10000):
+    """
+    Wraps a heuristic so that it is evaluated only once for every search state
+    it is asked about, as long as the state stays among the maxSize most
+    recently used ones.
+
+    The cache key is the state itself, unless the problem defines a
+    getCacheKey(state) method, which is used for states that are expensive to
+    hash or compare (e.g. the food Grid of a FoodSearchProblem).  The wrapper
+    keeps the (state, problem) signature of the heuristic and exposes the
+    underlying LRUCache as its 'cache' attribute.
+
+    Use a fresh wrapper for every problem, the cached values are only valid
+    for the problem they were computed for.
+    """
+    cache = LRUCache(maxSize)
+
+    def memoizedHeuristic(state, problem=None):
+        getCacheKey = getattr(problem, 'getCacheKey', None)
+        if getCacheKey is not None:
+            key = getCacheKey(state)
+        else:
+            key = state
+        value = cache.get(key, _NOT_CACHED)
+        if value is _NOT_CACHED:
+            value = heuristic(state, problem)
+            cache.put(key, value)
+        return value
+
+    memoizedHeuristic.cache = cache
+    memoizedHeuristic.__name__ = heuristic.__name__
+    return memoizedHeuristic
+
 
 def manhattanDistance(xy1, xy2):
     """Returns the Manhattan distance between points xy1 and xy2"""
@@ -426,6 +514,7 @@ class Counter(dict):
         return addend
 
 def raiseNotDefined():
+    import inspect
     fileName = inspect.stack()[1][1]
     line = inspect.stack()[1][2]
     method = inspect.stack()[1][3]
@@ -580,20 +669,188 @@ def pause():
 
 # code to handle timeouts
 #
-# FIXME
-# NOTE: TimeoutFuncton is NOT reentrant.  Later timeouts will silently
-# disable earlier timeouts.  Could be solved by maintaining a global list
-# of active time outs.  Currently, questions which have test cases calling
-# this have all student code so wrapped.
+# Timeouts are enforced by a single supervisor thread (see Watchdog) that
+# keeps the deadlines of all running TimeoutFunctions, from every thread, in a
+# heap and raises TimeoutFunctionException in a thread whose deadline passes.
+# Timeouts can be fractions of a second and can be nested.
 #
-import signal
 import time
+import threading, thread
+import itertools
+import os
+
+def _monotonicClock():
+    """
+    Returns a function giving the seconds of a monotonic clock, which does not
+    jump when the system time is set.  Falls back to time.time where the
+    clock cannot be reached.
+    """
+    if not sys.platform.startswith('linux'): return time.time
+    try:
+        import ctypes, ctypes.util
+        class Timespec(ctypes.Structure):
+            _fields_ = [('seconds', ctypes.c_long), ('nanoseconds', ctypes.c_long)]
+        library = ctypes.CDLL(ctypes.util.find_library('rt') or ctypes.util.find_library('c'))
+        clockGetTime = library.clock_gettime
+        clockGetTime.argtypes = [ctypes.c_int, ctypes.POINTER(Timespec)]
+        CLOCK_MONOTONIC = 1
+        def monotonic():
+            now = Timespec()
+            if clockGetTime(CLOCK_MONOTONIC, ctypes.byref(now)) != 0: return time.time()
+            return now.seconds + now.nanoseconds * 1e-9
+        monotonic()
+        return monotonic
+    except (ImportError, OSError, AttributeError, TypeError):
+        return time.time
+
+# Finding the library of the clock runs ldconfig, so it waits for the first call
+_MONOTONIC_CLOCK = []
+
+def monotonicTime():
+    if not _MONOTONIC_CLOCK: _MONOTONIC_CLOCK.append(_monotonicClock())
+    return _MONOTONIC_CLOCK[0]()
+
+try:
+    import ctypes
+    _setAsyncExc = ctypes.pythonapi.PyThreadState_SetAsyncExc
+    _ASYNC_ENABLED = True
+except (ImportError, AttributeError):
+    _ASYNC_ENABLED = False
+
 class TimeoutFunctionException(Exception):
     """Exception to raise on a timeout"""
     pass
 
+class Watchdog:
+    """
+    Raises TimeoutFunctionException in threads that run past a deadline.
+
+    arm(seconds) sets a deadline for the calling thread and returns a token to
+    pass to disarm.  A daemon supervisor thread sleeps until the earliest
+    deadline (woken through a pipe when an earlier one is armed) and raises
+    the exception asynchronously in the thread of every deadline that passes.
+    The thread sees the exception at its next Python instruction; code stuck
+    in a C call only sees it when the call returns.
+
+    The exception can arrive anywhere, so arm and disarm take no lock: they
+    only make single dict, set and deque calls, which the interpreter lock
+    keeps atomic, and only the supervisor touches the heap of deadlines.
+    """
+    def __init__(self):
+        self.pid = None
+
+    def _start(self):
+        # Called in a new process or after a fork
+        self.pid = os.getpid()
+        self.armed = {}      # token -> (deadline, thread id)
+        self.stacks = {}     # thread id -> its armed tokens, innermost last
+        self.arriving = collections.deque() # (deadline, token) not in the heap yet
+        self.disarming = set() # tokens the supervisor must not raise any more
+        self.fired = set()
+        self.firing = None   # the token the supervisor is raising
+        self.tokens = itertools.count()
+        self.nextWake = 0    # deadlines before this wake the supervisor
+        self.pipe = None
+        if os.name == 'posix':
+            import fcntl
+            self.pipe = os.pipe()
+            fcntl.fcntl(self.pipe[1], fcntl.F_SETFL, fcntl.fcntl(self.pipe[1], fcntl.F_GETFL) | os.O_NONBLOCK)
+        supervisor = threading.Thread(target=self._supervise, args=(self.pipe,))
+        supervisor.daemon = True
+        supervisor.start()
+
+    def arm(self, seconds):
+        if self.pid != os.getpid(): self._start()
+        deadline = monotonicTime() + seconds
+        threadId = thread.get_ident()
+        token = next(self.tokens)
+        self.stacks.setdefault(threadId, []).append(token)
+        self.armed[token] = (deadline, threadId)
+        self.arriving.append((deadline, token))
+        if deadline < self.nextWake and self.pipe is not None:
+            try:
+                os.write(self.pipe[1], 'x')
+            except OSError:
+                pass # the pipe is full, so the supervisor wakes anyway
+        return token
+
+    def disarm(self, token):
+        "Returns True if the deadline of the token had already passed"
+        try:
+            return self._disarm(token)
+        except TimeoutFunctionException:
+            # Raised for a deadline that passed just before the call; it is
+            # reported as the timeout of this token
+            self._disarm(token)
+            return True
+
+    def _disarm(self, token):
+        threadId = thread.get_ident()
+        stack = self.stacks[threadId]
+        # Tokens armed after this one were left by an exception before their
+        # own disarm, so they go too
+        while stack and stack[-1] > token: self._forget(stack.pop(), threadId)
+        if stack and stack[-1] == token: stack.pop()
+        return self._forget(token, threadId)
+
+    def _forget(self, token, threadId):
+        "Drops the deadline of token and returns True if it was raised"
+        # set.add is atomic: from here on the supervisor does not start
+        # raising the token, and it is waited for if it already had
+        self.disarming.add(token)
+        while self.firing == token: time.sleep(0)
+        self.armed.pop(token, None)
+        fired = token in self.fired
+        if fired:
+            self.fired.discard(token)
+            # The exception may still be pending if the thread has not run since
+            _setAsyncExc(ctypes.c_long(threadId), None)
+        self.disarming.discard(token)
+        return fired
+
+    def _supervise(self, pipe):
+        deadlines = []
+        while True:
+            self.nextWake = 0
+            while self.arriving: heapq.heappush(deadlines, self.arriving.popleft())
+            now = monotonicTime()
+            while deadlines:
+                deadline, token = deadlines[0]
+                if deadline > now: break
+                heapq.heappop(deadlines)
+                entry = self.armed.get(token)
+                if entry is None: continue
+                self.firing = token
+                if token not in self.disarming:
+                    self.armed.pop(token, None)
+                    _setAsyncExc(ctypes.c_long(entry[1]), ctypes.py_object(TimeoutFunctionException))
+                    self.fired.add(token)
+                self.firing = None
+            # Disarmed deadlines stay in the heap until they come up; do not
+            # let them pile up when many short calls share a long limit
+            if len(deadlines) > 2 * len(self.armed) + 64:
+                deadlines = [(deadline, token) for token, (deadline, threadId) in self.armed.items()]
+                heapq.heapify(deadlines)
+            wait = None
+            if deadlines:
+                wait = max(0, deadlines[0][0] - now)
+                self.nextWake = deadlines[0][0]
+            else:
+                self.nextWake = float('inf')
+            if self.arriving: continue
+            if pipe is not None:
+                import select
+                if select.select([pipe[0]], [], [], wait)[0]: os.read(pipe[0], 4096)
+            else:
+                time.sleep(min(wait or 0.05, 0.001))
+
+WATCHDOG = Watchdog()
 
 class TimeoutFunction:
+    """
+    Calls function, raising TimeoutFunctionException if it runs for more than
+    timeout seconds.  Works from any thread, through WATCHDOG.
+    """
     def __init__(self, function, timeout):
         self.timeout = timeout
         self.function = function
@@ -602,23 +859,22 @@ class TimeoutFunction:
         raise TimeoutFunctionException()
 
     def __call__(self, *args, **keyArgs):
-        # If we have SIGALRM signal, use it to cause an exception if and
-        # when this function runs too long.  Otherwise check the time taken
-        # after the method has returned, and throw an exception then.
-        if hasattr(signal, 'SIGALRM'):
-            old = signal.signal(signal.SIGALRM, self.handle_timeout)
-            signal.alarm(self.timeout)
-            try:
-                result = self.function(*args, **keyArgs)
-            finally:
-                signal.signal(signal.SIGALRM, old)
-            signal.alarm(0)
-        else:
-            startTime = time.time()
+        # Without asynchronous exceptions, check the time taken after the
+        # method has returned, and throw an exception then.
+        if not _ASYNC_ENABLED:
+            startTime = monotonicTime()
             result = self.function(*args, **keyArgs)
-            timeElapsed = time.time() - startTime
+            timeElapsed = monotonicTime() - startTime
             if timeElapsed >= self.timeout:
                 self.handle_timeout(None, None)
+            return result
+
+        token = WATCHDOG.arm(self.timeout)
+        try:
+            result = self.function(*args, **keyArgs)
+        finally:
+            expired = WATCHDOG.disarm(token)
+        if expired: raise TimeoutFunctionException()
         return result
 
 
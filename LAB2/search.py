@@ -1,5 +1,6 @@
 import util
 import copy
+import distanceFields
 
 from util import Queue
 from game import Directions
@@ -197,5 +198,12 @@ def pathBetween(point1, point2, legalStates, gameState):
     walls = gameState.getWalls()
     assert not walls[x1][y1], 'point1 is a wall: ' + str(point1)
     assert not walls[x2][y2], 'point2 is a wall: ' + str(point2)
-    prob = PositionSearchProblem(gameState, start=point1, goal=point2, warn=False, visualize=False)
-    return constrainedBreadthFirstSearch(prob, legalStates)
+
+    # Distances to point2 through the legal states, followed back from point1
+    allowed = set(legalStates)
+    allowed.add(tuple(point1))
+    distances = distanceFields.distanceMap(walls, [tuple(point2)], allowed=allowed)
+    path = distanceFields.pathFromDistanceMap(distances, point1)
+    if path is None:
+        print "Search finished, final state not found!"
+    return path
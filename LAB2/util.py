@@ -16,6 +16,7 @@ import sys
 import inspect
 import heapq, random
 import cStringIO
+import collections
 
 class FixedRandom:
     def __init__(self):
@@ -200,6 +201,59 @@ class PriorityQueueWithFunction(PriorityQueue):
         "Adds an item to the queue with priority from the priority function"
         PriorityQueue.push(self, item, self.priorityFunction(item))
 
+class LRUCache:
+    """
+    A mapping with a bounded number of entries.  Once more than maxSize keys
+    are stored, the least recently used one is evicted.  Every lookup is
+    counted as either a hit or a miss so that the usefulness of the cache can
+    be reported afterwards.
+    """
+    def __init__(self, maxSize):
+        if maxSize < 1: raise ValueError, "LRUCache needs room for at least one entry"
+        self.maxSize = maxSize
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        "Returns the value stored for key (marking it as recently used) or default"
+        try:
+            value = self.entries.pop(key)
+        except KeyError:
+            self.misses += 1
+            return default
+        self.entries[key] = value
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        "Stores value under key, evicting the least recently used entry if full"
+        if key in self.entries:
+            del self.entries[key]
+        elif len(self.entries) >= self.maxSize:
+            self.entries.popitem(last=False)
+        self.entries[key] = value
+
+    def clear(self):
+        self.entries.clear()
+        self.hits, self.misses = 0, 0
+
+    def hitRate(self):
+        "Returns the fraction of lookups that were answered from the cache"
+        lookups = self.hits + self.misses
+        if lookups == 0: return 0.0
+        return self.hits / float(lookups)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __str__(self):
+        return '%d hits, %d misses (%.1f%% hit rate), %d/%d entries' % \
+            (self.hits, self.misses, 100 * self.hitRate(), len(self.entries), self.maxSize)
+
 
 def manhattanDistance( xy1, xy2 ):
     "Returns the Manhattan distance between points xy1 and xy2"
@@ -15,6 +15,9 @@ class NaiveBayesClassifier(object):
         self.k = int(smoothing) # this is the smoothing parameter, ** use it in your train method **
         self.logTransform = logTransform
         self.featureValues = featureValues # empty if there is no smoothing
+        # The labels in the order a Counter filled with them would list them,
+        # so that argMax breaks ties as it does on a Counter
+        self.labelIndex = util.KeyIndex(dict.fromkeys(legalLabels).keys())
 
     def fit(self, trainingData, trainingLabels):
         """
@@ -29,8 +32,8 @@ class NaiveBayesClassifier(object):
 
         self.features = trainingData[0].keys() # the names of the features in the dataset
 
-        self.prior = util.Counter() # probability over labels
-        self.conditionalProb = util.Counter() # Conditional probability of feature feat for a given class having value v
+        self.prior = util.DenseCounter(self.labelIndex) # probability over labels
+        self.conditionalProb = util.SparseCounter() # Conditional probability of feature feat for a given class having value v
                                       # HINT: could be indexed by (feat, label, value)
 
         values = set()
@@ -91,7 +94,7 @@ class NaiveBayesClassifier(object):
         To get the list of all possible features or labels, use self.features and
         self.legalLabels.
         """
-        joint = util.Counter()
+        joint = util.DenseCounter(self.labelIndex)
 
         for legal_label in self.legalLabels:
             posterior_probability = 1.0
@@ -109,7 +112,7 @@ class NaiveBayesClassifier(object):
         Each log-probability should be stored in the log-joint counter, e.g.
         logJoint[3] = <Estimate of log( P(Label = 3, instance) )>
         """
-        log_joint = util.Counter()
+        log_joint = util.DenseCounter(self.labelIndex)
 
         for label in self.legalLabels:
             posterior_probability = 0  # log(p_1) = log(1) = 0
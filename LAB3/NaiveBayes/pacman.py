@@ -71,11 +71,17 @@ class GameState:
     # Accessor methods: use these to access state data #
     ####################################################
 
-    # static variable keeps track of which states have had getLegalActions called
-    explored = set()
+    # static variable that, when set to an ExploredTracker (see --explored),
+    # records the states created by generateSuccessor; None turns tracking off
+    explored = None
     def getAndResetExplored():
-        tmp = GameState.explored.copy()
-        GameState.explored = set()
+        """
+        Returns the set of hashes of the states explored since the last call,
+        which is empty when tracking is off.
+        """
+        if GameState.explored is None: return set()
+        tmp = GameState.explored.hashes
+        GameState.explored.reset()
         return tmp
     getAndResetExplored = staticmethod(getAndResetExplored)
 
@@ -120,8 +126,9 @@ class GameState:
         # Book keeping
         state.data._agentMoved = agentIndex
         state.data.score += state.data.scoreChange
-        GameState.explored.add(self)
-        GameState.explored.add(state)
+        if GameState.explored is not None:
+            GameState.explored.add(self)
+            GameState.explored.add(state)
         return state
 
     def getLegalPacmanActions( self ):
@@ -253,6 +260,33 @@ class GameState:
         """
         self.data.initialize(layout, numGhostAgents)
 
+class ExploredTracker:
+    """
+    Counts the distinct states generated during a game.  Only the hashes of the
+    states are kept, and at most maxSize of them: once the set is full, new
+    hashes are only counted, so the count may then include repeats.
+    """
+    def __init__( self, maxSize=100000 ):
+        self.maxSize = maxSize
+        self.reset()
+
+    def reset( self ):
+        self.hashes = set()
+        self.overflow = 0
+
+    def add( self, state ):
+        key = hash( state )
+        if key in self.hashes: return
+        if len( self.hashes ) < self.maxSize: self.hashes.add( key )
+        else: self.overflow += 1
+
+    def count( self ):
+        return len( self.hashes ) + self.overflow
+
+    def __str__( self ):
+        if self.overflow == 0: return '%d states explored' % self.count()
+        return 'about %d states explored (more than the %d hashes kept)' % (self.count(), self.maxSize)
+
 ############################################################################
 #                     THE HIDDEN SECRETS OF PACMAN                         #
 #                                                                          #
@@ -523,6 +557,8 @@ def readCommand( argv ):
                       help='Turns on exception handling and timeouts during games', default=False)
     parser.add_option('--timeout', dest='timeout', type='int',
                       help=default('Maximum length of time an agent can spend computing in a single game'), default=30)
+    parser.add_option('--explored', dest='explored', type='int',
+                      help=default('Counts the states explored in each game, keeping at most this many hashes (0 turns counting off)'), default=0)
 
     options, otherjunk = parser.parse_args(argv)
     if len(otherjunk) != 0:
@@ -532,6 +568,8 @@ def readCommand( argv ):
     # Fix the random seed
     if options.fixRandomSeed: random.seed('cs188')
 
+    if options.explored > 0: GameState.explored = ExploredTracker(options.explored)
+
     # Choose a layout
     args['layout'] = layout.getLayout( options.layout )
     if args['layout'] == None: raise Exception("The layout " + options.layout + " cannot be found")
@@ -643,8 +681,10 @@ def runGames( layout, pacman, ghosts, display, numGames, record, numTraining = 0
             gameDisplay = display
             rules.quiet = False
         game = rules.newGame( layout, pacman, ghosts, gameDisplay, beQuiet, catchExceptions)
+        if GameState.explored is not None: GameState.explored.reset()
         game.run()
         if not beQuiet: games.append(game)
+        if GameState.explored is not None and not beQuiet: print 'Game %d: %s' % (i + 1, GameState.explored)
 
         if record:
             import time, cPickle
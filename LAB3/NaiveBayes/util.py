@@ -16,6 +16,13 @@ import sys
 import inspect
 import heapq, random
 import cStringIO
+from array import array
+
+try:
+    import numpy
+    _NUMPY_ENABLED = True
+except ImportError:
+    _NUMPY_ENABLED = False
 
 
 class FixedRandom:
@@ -330,7 +337,7 @@ class Counter(dict):
         """
         Returns a copy of the counter
         """
-        return Counter(dict.copy(self))
+        return self.__class__(dict.copy(self))
 
     def __mul__(self, y ):
         """
@@ -390,7 +397,7 @@ class Counter(dict):
         >>> (a + b)['first']
         1
         """
-        addend = Counter()
+        addend = self.__class__()
         for key in self:
             if key in y:
                 addend[key] = self[key] + y[key]
@@ -416,7 +423,7 @@ class Counter(dict):
         >>> (a - b)['first']
         -5
         """
-        addend = Counter()
+        addend = self.__class__()
         for key in self:
             if key in y:
                 addend[key] = self[key] - y[key]
@@ -428,6 +435,183 @@ class Counter(dict):
             addend[key] = -1 * y[key]
         return addend
 
+class SparseCounter(Counter):
+    """
+    A Counter that does not store the keys that are only read: reading a
+    missing key returns 0 and leaves the counter as it was, so tables such as
+    Q-values only hold the entries that were written.
+
+    >>> a = SparseCounter()
+    >>> a['test']
+    0
+    >>> len(a)
+    0
+    >>> a['test'] += 2
+    >>> a['test']
+    2
+    """
+    __getitem__ = dict.__getitem__
+
+    def __missing__(self, key):
+        return 0
+
+class KeyIndex:
+    """
+    A fixed list of keys and the position of every key in it, shared by the
+    DenseCounters over the same keys.
+    """
+    def __init__(self, keys):
+        self.keys = list(keys)
+        self.positions = dict([(key, i) for i, key in enumerate(self.keys)])
+        if len(self.positions) != len(self.keys): raise Exception('The keys of an index must be distinct')
+
+    def __len__(self):
+        return len(self.keys)
+
+class DenseCounter:
+    """
+    A counter over a fixed set of keys, with the counts kept in one array (a
+    NumPy array if NumPy is available, an array('d') otherwise) in the order
+    of a KeyIndex.  Every key of the index is in the counter, with a count of
+    0 until it is set; reading any other key also returns 0, but setting it
+    raises a KeyError.  Counts are floats.
+
+    totalCount, normalize, argMax, the dot product (*) and addition with a
+    DenseCounter over the same index work on the whole array at once; the
+    operators otherwise behave as those of Counter.
+
+    >>> a = DenseCounter(['first', 'second', 'third'])
+    >>> a['second'] = 4
+    >>> a['first'] -= 2
+    >>> a.argMax()
+    'second'
+    >>> a * a
+    20.0
+    """
+    def __init__(self, keys, counts=None):
+        if not isinstance(keys, KeyIndex): keys = KeyIndex(keys)
+        self.index = keys
+        if counts is None: counts = [0.0] * len(keys)
+        if _NUMPY_ENABLED: self.counts = numpy.array(counts, dtype=float)
+        else: self.counts = array('d', counts)
+
+    def __getitem__(self, key):
+        position = self.index.positions.get(key)
+        if position is None: return 0
+        if _NUMPY_ENABLED: return self.counts.item(position)
+        return self.counts[position]
+
+    def __setitem__(self, key, value):
+        position = self.index.positions.get(key)
+        if position is None: raise KeyError('%s is not a key of this DenseCounter' % str(key))
+        self.counts[position] = value
+
+    def get(self, key):
+        return self[key]
+
+    def __contains__(self, key):
+        return key in self.index.positions
+
+    def __iter__(self):
+        return iter(self.index.keys)
+
+    def __len__(self):
+        return len(self.index.keys)
+
+    def keys(self):
+        return list(self.index.keys)
+
+    def values(self):
+        if _NUMPY_ENABLED: return self.counts.tolist()
+        return list(self.counts)
+
+    def items(self):
+        return zip(self.index.keys, self.values())
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+    def incrementAll(self, keys, count):
+        for key in keys:
+            self[key] += count
+
+    def argMax(self):
+        "Returns the key with the highest count (the first one if they tie)"
+        if len(self) == 0: return None
+        if _NUMPY_ENABLED: return self.index.keys[int(self.counts.argmax())]
+        counts = self.counts
+        return self.index.keys[counts.index(max(counts))]
+
+    def sortedKeys(self):
+        "Returns the keys sorted by their counts, the highest first"
+        order = sorted(range(len(self)), key=lambda i: -self.counts[i])
+        return [self.index.keys[i] for i in order]
+
+    def totalCount(self):
+        if _NUMPY_ENABLED: return float(self.counts.sum())
+        return sum(self.counts)
+
+    def normalize(self):
+        total = float(self.totalCount())
+        if total == 0: return
+        self.divideAll(total)
+
+    def divideAll(self, divisor):
+        divisor = float(divisor)
+        if _NUMPY_ENABLED:
+            self.counts /= divisor
+        else:
+            for i in range(len(self.counts)): self.counts[i] /= divisor
+
+    def copy(self):
+        return DenseCounter(self.index, self.counts)
+
+    def sameIndex(self, y):
+        return isinstance(y, DenseCounter) and y.index is self.index
+
+    def __mul__(self, y):
+        "The dot product of the counts of the keys both counters have"
+        if self.sameIndex(y):
+            if _NUMPY_ENABLED: return float(numpy.dot(self.counts, y.counts))
+            return sum([a * b for a, b in zip(self.counts, y.counts)])
+        sum_ = 0
+        for key in self:
+            if key in y: sum_ += self[key] * y[key]
+        return sum_
+
+    def __radd__(self, y):
+        "Increments the counts by those of y, as Counter.__radd__ does"
+        if self.sameIndex(y):
+            self.add(y.counts)
+            return
+        for key, value in y.items():
+            self[key] += value
+
+    def add(self, counts, scale=1.0):
+        "Adds scale times the counts of an array in the order of the index"
+        if _NUMPY_ENABLED:
+            self.counts += scale * numpy.asarray(counts, dtype=float)
+        else:
+            for i, count in enumerate(counts): self.counts[i] += scale * count
+
+    def __add__(self, y):
+        """
+        Adding two counters gives a counter with the union of all keys: a
+        DenseCounter if both are over the same index, a Counter otherwise.
+        """
+        if self.sameIndex(y):
+            result = self.copy()
+            result.add(y.counts)
+            return result
+        return Counter(dict(self.items())) + y
+
+    def __sub__(self, y):
+        if self.sameIndex(y):
+            result = self.copy()
+            result.add(y.counts, -1.0)
+            return result
+        return Counter(dict(self.items())) - y
+
 def raiseNotDefined():
     fileName = inspect.stack()[1][1]
     line = inspect.stack()[1][2]
@@ -440,9 +624,13 @@ def normalize(vectorOrCounter):
     """
     normalize a vector or counter by dividing each value by the sum of all values
     """
-    normalizedCounter = Counter()
-    if type(vectorOrCounter) == type(normalizedCounter):
+    if isinstance(vectorOrCounter, DenseCounter):
+        counter = vectorOrCounter.copy()
+        counter.normalize()
+        return counter
+    if isinstance(vectorOrCounter, Counter):
         counter = vectorOrCounter
+        normalizedCounter = counter.__class__()
         total = float(counter.totalCount())
         if total == 0: return counter
         for key in counter.keys():
@@ -455,10 +643,11 @@ def normalize(vectorOrCounter):
         if s == 0: return vector
         return [el / s for el in vector]
 
-def nSample(distribution, values, n):
+def nSample(distribution, values, n, rng=None):
+    if rng is None: rng = random
     if sum(distribution) != 1:
         distribution = normalize(distribution)
-    rand = [random.random() for i in range(n)]
+    rand = [rng.random() for i in range(n)]
     rand.sort()
     samples = []
     samplePos, distPos, cdf = 0,0, distribution[0]
@@ -471,14 +660,15 @@ def nSample(distribution, values, n):
             cdf += distribution[distPos]
     return samples
 
-def sample(distribution, values = None):
-    if type(distribution) == Counter:
+def sample(distribution, values = None, rng = None):
+    if isinstance(distribution, Counter) or isinstance(distribution, DenseCounter):
         items = sorted(distribution.items())
         distribution = [i[1] for i in items]
         values = [i[0] for i in items]
     if sum(distribution) != 1:
         distribution = normalize(distribution)
-    choice = random.random()
+    if rng is None: rng = random
+    choice = rng.random()
     i, total= 0, distribution[0]
     while choice > total:
         i += 1
@@ -489,6 +679,93 @@ def sampleFromCounter(ctr):
     items = sorted(ctr.items())
     return sample([v for k,v in items], [k for k,v in items])
 
+class AliasSampler:
+    """
+    Draws from a fixed discrete distribution in constant time with Walker's
+    alias method (in Vose's form).  The distribution is either a Counter (or
+    DenseCounter), whose keys are drawn in sorted order as in sample, or a
+    list of weights with the values they stand for; weights need not sum to 1.
+
+    Every draw uses one random number of rng, the random module when no rng
+    is given, so a sampler can be given a stream of its own.  The draws differ
+    from those of sample for the same random numbers.
+
+    >>> sampler = AliasSampler([0.5, 0.25, 0.25], ['a', 'b', 'c'])
+    >>> rng = random.Random(0)
+    >>> sorted(set(sampler.nSample(100, rng)))
+    ['a', 'b', 'c']
+    """
+    def __init__(self, distribution, values=None):
+        if isinstance(distribution, Counter) or isinstance(distribution, DenseCounter):
+            items = sorted(distribution.items())
+            distribution = [i[1] for i in items]
+            values = [i[0] for i in items]
+        n = len(distribution)
+        total = float(sum(distribution))
+        if n == 0 or total <= 0: raise Exception('Cannot sample from an empty distribution')
+        self.values = list(values)
+        self.n = n
+
+        scaled = [p * n / total for p in distribution]
+        self.prob = [1.0] * n
+        self.alias = range(n)
+        small = [i for i in range(n) if scaled[i] < 1.0]
+        large = [i for i in range(n) if scaled[i] >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.prob[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] = scaled[more] + scaled[less] - 1.0
+            if scaled[more] < 1.0: small.append(more)
+            else: large.append(more)
+        # What is left has a weight of 1 up to rounding
+
+        if _NUMPY_ENABLED:
+            self.probArray = numpy.array(self.prob)
+            self.aliasArray = numpy.array(self.alias)
+
+    def sampleIndex(self, rng=None):
+        if rng is None: rng = random
+        u = rng.random() * self.n
+        i = int(u)
+        if i == self.n: i -= 1
+        if u - i < self.prob[i]: return i
+        return self.alias[i]
+
+    def sample(self, rng=None):
+        "Returns one value drawn from the distribution"
+        return self.values[self.sampleIndex(rng)]
+
+    def nSample(self, n, rng=None):
+        """
+        Returns a list of n values drawn from the distribution.  rng may also
+        be a NumPy RandomState, which draws all the random numbers at once.
+        """
+        if rng is None: rng = random
+        if not _NUMPY_ENABLED:
+            return [self.sample(rng) for i in range(n)]
+        if 'random_sample' in dir(rng): u = rng.random_sample(n) * self.n
+        else: u = numpy.array([rng.random() for i in range(n)]) * self.n
+        columns = numpy.minimum(u.astype(int), self.n - 1)
+        indices = numpy.where(u - columns < self.probArray[columns], columns, self.aliasArray[columns])
+        values = self.values
+        return [values[i] for i in indices]
+
+ALIAS_CACHE = {}
+MAX_ALIAS_CACHE = 10000
+
+def getAliasSampler(distribution):
+    """
+    Returns an AliasSampler for a Counter, reusing the sampler built for an
+    earlier Counter with the same items.
+    """
+    key = tuple(sorted(distribution.items()))
+    sampler = ALIAS_CACHE.get(key)
+    if sampler is None:
+        if len(ALIAS_CACHE) >= MAX_ALIAS_CACHE: ALIAS_CACHE.clear()
+        sampler = ALIAS_CACHE[key] = AliasSampler(distribution)
+    return sampler
+
 def getProbability(value, distribution, values):
     """
       Gives the probability of a value under a discrete distribution
@@ -500,15 +777,17 @@ def getProbability(value, distribution, values):
             total += prob
     return total
 
-def flipCoin( p ):
-    r = random.random()
+def flipCoin( p, rng = None ):
+    if rng is None: rng = random
+    r = rng.random()
     return r < p
 
-def chooseFromDistribution( distribution ):
+def chooseFromDistribution( distribution, rng = None ):
     "Takes either a counter or a list of (prob, key) pairs and samples"
-    if type(distribution) == dict or type(distribution) == Counter:
-        return sample(distribution)
-    r = random.random()
+    if isinstance(distribution, dict) or isinstance(distribution, DenseCounter):
+        return sample(distribution, rng = rng)
+    if rng is None: rng = random
+    r = rng.random()
     base = 0.0
     for prob, element in distribution:
         base += prob
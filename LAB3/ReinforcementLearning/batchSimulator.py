@@ -0,0 +1,463 @@
+# batchSimulator.py
+# -----------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Many games of Pacman on one layout, played in lockstep with NumPy arrays.
+
+A BatchSimulator holds numGames games as arrays (positions, directions, food
+bitplanes, capsules, scared timers, scores) and plays one round of every game
+at a time: Pacman makes the move he is given, and then every ghost moves, in
+the same order and by the same rules as PacmanRules and GhostRules in
+pacman.py.  A game that ends stops in the middle of the round, as it does in
+Game.run, and its arrays are left as they are.
+
+Ghost positions are kept doubled, so that the half steps of scared ghosts
+stay integers.  Actions are indices into ACTIONS.
+
+Every game draws its random numbers from its own random.Random, seeded with
+its seed, exactly as the engine draws them from the random module: one number
+per ghost move, and one per Pacman move made with randomPacmanActions, which
+plays like random.choice(state.getLegalPacmanActions()).  The ghost policies
+mimic the distributions of RandomGhost and DirectionalGhost and the sampling
+of util.sample to the last bit, so a batch game and a game of the engine
+played after random.seed(seed) end with the same score on the same move.
+To play games both ways and compare them:
+
+> python batchSimulator.py -l smallClassic -n 200 -g DirectionalGhost --check
+"""
+
+from game import Directions, Actions
+import pacman
+import random
+import numpy
+import util
+import time
+
+ACTIONS = [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST, Directions.STOP]
+STOP = ACTIONS.index(Directions.STOP)
+VECTORS = numpy.array([Actions.directionToVector(action, 1) for action in ACTIONS], dtype=int)
+REVERSE = numpy.array([ACTIONS.index(Actions.reverseDirection(action)) for action in ACTIONS])
+# The order in which Actions.getPossibleActions lists the moves
+POSSIBLE_ORDER = [ACTIONS.index(direction) for direction, vector in Actions._directionsAsList]
+
+def possibleMoves(walls):
+    """
+    Returns a width x height x 5 boolean array telling which ACTIONS lead out
+    of every cell into a cell that is not a wall (STOP always does).
+    """
+    width, height = walls.shape
+    padded = numpy.ones((width + 2, height + 2), dtype=bool)
+    padded[1:-1, 1:-1] = walls
+    moves = numpy.empty((width, height, len(ACTIONS)), dtype=bool)
+    for index, (dx, dy) in enumerate(VECTORS):
+        moves[:, :, index] = ~padded[1 + dx:width + 1 + dx, 1 + dy:height + 1 + dy]
+    return moves
+
+def sampleThresholds(dist):
+    """
+    Returns the values of a Counter in the order util.sample draws them, and
+    the running totals it compares its random number with.
+    """
+    items = sorted(dist.items())
+    distribution = [item[1] for item in items]
+    if sum(distribution) != 1:
+        distribution = util.normalize(distribution)
+    totals, total = [], 0
+    for i, probability in enumerate(distribution):
+        if i == 0: total = probability
+        else: total += probability
+        totals.append(total)
+    return [item[0] for item in items], totals
+
+class SamplingTable:
+    """
+    The outcome of util.sample for every distribution a ghost policy can
+    produce, indexed by a code of the situation (see the ghost policies).
+    Row code holds the running totals of the distribution, padded with
+    infinity, and the ACTIONS in the order they are drawn.
+    """
+    def __init__(self, size):
+        self.totals = numpy.empty((size, 4))
+        self.totals.fill(numpy.inf)
+        self.actions = numpy.zeros((size, 4), dtype=int)
+        self.counts = numpy.ones(size, dtype=int)
+
+    def set(self, code, dist):
+        values, totals = sampleThresholds(dist)
+        self.totals[code, :len(totals)] = totals
+        self.actions[code, :len(values)] = [ACTIONS.index(value) for value in values]
+        self.counts[code] = len(values)
+
+    def sample(self, codes, uniforms):
+        "Returns the action util.sample draws with every random number"
+        drawn = (uniforms[:, None] > self.totals[codes]).sum(1)
+        drawn = numpy.minimum(drawn, self.counts[codes] - 1)
+        return self.actions[codes, drawn]
+
+def legalList(mask):
+    "The directions of a 4 bit mask of legal moves, in the engine's order"
+    return [ACTIONS[index] for index in POSSIBLE_ORDER if index != STOP and mask & (1 << index)]
+
+class BatchRandomGhost:
+    "RandomGhost for a batch of games"
+    def __init__(self):
+        self.table = SamplingTable(16)
+        for mask in range(1, 16):
+            dist = util.Counter()
+            for a in legalList(mask): dist[a] = 1.0
+            dist.normalize()
+            self.table.set(mask, dist)
+
+    def getActions(self, sim, games, ghost, legal, uniforms):
+        codes = (legal * (1 << numpy.arange(4))).sum(1)
+        return self.table.sample(codes, uniforms)
+
+class BatchDirectionalGhost:
+    """
+    DirectionalGhost for a batch of games.  The distribution depends only on
+    the legal moves, the best of them and whether the ghost is scared, so the
+    code of a situation is legal | best << 4 | scared << 8.
+    """
+    def __init__(self, prob_attack=0.8, prob_scaredFlee=0.8):
+        self.table = SamplingTable(512)
+        for scared in (0, 1):
+            bestProb = [prob_attack, prob_scaredFlee][scared]
+            for mask in range(1, 16):
+                legalActions = legalList(mask)
+                for best in range(1, 16):
+                    if best & ~mask: continue
+                    bestActions = legalList(best)
+                    # As in DirectionalGhost.getDistribution
+                    dist = util.Counter()
+                    for a in bestActions: dist[a] = bestProb / len(bestActions)
+                    for a in legalActions: dist[a] += ( 1-bestProb ) / len(legalActions)
+                    dist.normalize()
+                    self.table.set(mask | best << 4 | scared << 8, dist)
+
+    def getActions(self, sim, games, ghost, legal, uniforms):
+        scared = sim.scaredTimers[games, ghost] > 0
+        step = numpy.where(scared, 1, 2)
+        positions = sim.ghostPositions[games, ghost]
+        target = 2 * sim.pacmanPositions[games]
+        moved = positions[:, None, :] + VECTORS[None, :4, :] * step[:, None, None]
+        distances = numpy.abs(moved - target[:, None, :]).sum(2).astype(float)
+        distances = numpy.where(legal, distances, numpy.where(scared, -numpy.inf, numpy.inf)[:, None])
+        bestScore = numpy.where(scared, distances.max(1), distances.min(1))
+        best = legal & (distances == bestScore[:, None])
+        bits = 1 << numpy.arange(4)
+        codes = (legal * bits).sum(1) | (best * bits).sum(1) << 4 | scared.astype(int) << 8
+        return self.table.sample(codes, uniforms)
+
+GHOST_POLICIES = {'RandomGhost': BatchRandomGhost, 'DirectionalGhost': BatchDirectionalGhost}
+
+class BatchSimulator:
+    """
+    numGames games on layout with numGhosts ghosts (all those of the layout
+    by default) that move with the named ghost policy of GHOST_POLICIES.
+    Game i draws its random numbers from random.Random(seeds[i]).
+    """
+    def __init__(self, layout, numGames, ghost='RandomGhost', numGhosts=None, seeds=None, **ghostArgs):
+        if numGhosts is None: numGhosts = layout.getNumGhosts()
+        if seeds is None: seeds = range(numGames)
+        if len(seeds) != numGames: raise Exception('%d seeds given for %d games' % (len(seeds), numGames))
+        self.layout = layout
+        self.numGames = numGames
+        self.policy = GHOST_POLICIES[ghost](**ghostArgs)
+        self.randoms = [random.Random(seed) for seed in seeds]
+
+        self.walls = numpy.array(layout.walls.data, dtype=bool)
+        self.moves = possibleMoves(self.walls)
+        self.capsuleCells = list(layout.capsules)
+        self.capsuleIndex = -numpy.ones(self.walls.shape, dtype=int)
+        for index, (x, y) in enumerate(self.capsuleCells):
+            self.capsuleIndex[x, y] = index
+
+        # The start of every game is the initial state of the engine
+        self.initialState = pacman.GameState()
+        self.initialState.initialize(layout, numGhosts)
+        self.numGhosts = self.initialState.getNumAgents() - 1
+        agents = self.initialState.data.agentStates
+        self.pacmanStart = numpy.array(agents[0].start.getPosition(), dtype=int)
+        self.ghostStarts = numpy.array([agent.start.getPosition() for agent in agents[1:]], dtype=int).reshape(-1, 2) * 2
+        self.reset()
+
+    def reset(self, games=None):
+        "Puts the given games (all games by default) back at the start"
+        if games is None:
+            n, G = self.numGames, self.numGhosts
+            self.pacmanPositions = numpy.empty((n, 2), dtype=int)
+            self.pacmanDirections = numpy.empty(n, dtype=int)
+            self.ghostPositions = numpy.empty((n, G, 2), dtype=int)
+            self.ghostDirections = numpy.empty((n, G), dtype=int)
+            self.scaredTimers = numpy.empty((n, G), dtype=int)
+            self.food = numpy.empty((n,) + self.walls.shape, dtype=bool)
+            self.numFood = numpy.empty(n, dtype=int)
+            self.capsules = numpy.empty((n, len(self.capsuleCells)), dtype=bool)
+            self.scores = numpy.empty(n, dtype=int)
+            self.wins = numpy.empty(n, dtype=bool)
+            self.losses = numpy.empty(n, dtype=bool)
+            self.numMoves = numpy.empty(n, dtype=int)
+            games = slice(None)
+        self.pacmanPositions[games] = self.pacmanStart
+        self.pacmanDirections[games] = STOP
+        self.ghostPositions[games] = self.ghostStarts
+        self.ghostDirections[games] = STOP
+        self.scaredTimers[games] = 0
+        self.food[games] = numpy.array(self.layout.food.data, dtype=bool)
+        self.numFood[games] = self.layout.food.count()
+        self.capsules[games] = True
+        self.scores[games] = 0
+        self.wins[games] = False
+        self.losses[games] = False
+        self.numMoves[games] = 0
+
+    def isOver(self):
+        return self.wins | self.losses
+
+    def uniforms(self, games):
+        "One random number of the stream of every game in games"
+        randoms = self.randoms
+        return numpy.fromiter((randoms[i].random() for i in games), float, len(games))
+
+    def getLegalPacmanActions(self):
+        "Returns a numGames x 5 boolean array of Pacman's legal ACTIONS"
+        x, y = self.pacmanPositions.T
+        return self.moves[x, y]
+
+    def randomPacmanActions(self):
+        """
+        Returns a random legal action for every game that is not over, drawn
+        as random.choice(state.getLegalPacmanActions()) draws it, and STOP for
+        the other games.
+        """
+        actions = numpy.zeros(self.numGames, dtype=int) + STOP
+        games = numpy.flatnonzero(~self.isOver())
+        if len(games) == 0: return actions
+        legal = self.getLegalPacmanActions()[games][:, POSSIBLE_ORDER]
+        choice = (self.uniforms(games) * legal.sum(1)).astype(int)
+        position = numpy.argmax(legal.cumsum(1) > choice[:, None], axis=1)
+        actions[games] = numpy.array(POSSIBLE_ORDER)[position]
+        return actions
+
+    def step(self, actions):
+        """
+        Plays one round of every game that is not over: Pacman makes his move
+        of actions and then every ghost moves.  Returns the change of score of
+        every game.
+        """
+        before = self.scores.copy()
+        games = numpy.flatnonzero(~self.isOver())
+        actions = numpy.asarray(actions)[games]
+        games = self.movePacman(games, actions)
+        for ghost in range(self.numGhosts):
+            if len(games) == 0: break
+            games = self.moveGhost(games, ghost)
+        return self.scores - before
+
+    def movePacman(self, games, actions):
+        "Moves Pacman in games and returns the games that are not over"
+        x, y = self.pacmanPositions[games].T
+        if not self.moves[x, y, actions].all():
+            bad = numpy.flatnonzero(~self.moves[x, y, actions])[0]
+            raise Exception("Illegal action " + str(ACTIONS[actions[bad]]))
+        x = x + VECTORS[actions, 0]
+        y = y + VECTORS[actions, 1]
+        self.pacmanPositions[games, 0] = x
+        self.pacmanPositions[games, 1] = y
+        moving = actions != STOP
+        self.pacmanDirections[games[moving]] = actions[moving]
+        self.numMoves[games] += 1
+
+        # PacmanRules.consume
+        change = numpy.zeros(len(games), dtype=int)
+        eaten = self.food[games, x, y]
+        change += 10 * eaten
+        self.food[games[eaten], x[eaten], y[eaten]] = False
+        self.numFood[games] -= eaten
+        win = eaten & (self.numFood[games] == 0)
+        change += 500 * win
+        capsule = self.capsuleIndex[x, y]
+        ate = capsule >= 0
+        ate[ate] = self.capsules[games[ate], capsule[ate]]
+        self.capsules[games[ate], capsule[ate]] = False
+        self.scaredTimers[games[ate]] = pacman.SCARED_TIME
+        change -= pacman.TIME_PENALTY
+
+        # GhostRules.checkDeath: every ghost Pacman ran into
+        lose = numpy.zeros(len(games), dtype=bool)
+        pacmanPositions = 2 * numpy.column_stack((x, y))
+        for ghost in range(self.numGhosts):
+            hit = self.collisions(games, ghost, pacmanPositions)
+            change, lose = self.collide(games, ghost, hit, change, lose, win)
+        self.scores[games] += change
+        self.wins[games] = win
+        self.losses[games] = lose
+        return games[~(win | lose)]
+
+    def moveGhost(self, games, ghost):
+        "Moves a ghost in games and returns the games that are not over"
+        positions = self.ghostPositions[games, ghost]
+        directions = self.ghostDirections[games, ghost]
+
+        # GhostRules.getLegalActions: between cells a ghost keeps going
+        onGrid = (positions % 2 == 0).all(1)
+        legal = numpy.zeros((len(games), 4), dtype=bool)
+        cells = positions[onGrid] // 2
+        legal[onGrid] = self.moves[cells[:, 0], cells[:, 1], :4]
+        offGrid = numpy.flatnonzero(~onGrid)
+        legal[offGrid, directions[offGrid]] = True
+        reverse = REVERSE[directions]
+        canReverse = (reverse != STOP) & onGrid & (legal.sum(1) > 1)
+        canReverse[canReverse] = legal[numpy.flatnonzero(canReverse), reverse[canReverse]]
+        legal[numpy.flatnonzero(canReverse), reverse[canReverse]] = False
+
+        actions = self.policy.getActions(self, games, ghost, legal, self.uniforms(games))
+
+        # GhostRules.applyAction and decrementTimer
+        timers = self.scaredTimers[games, ghost]
+        step = numpy.where(timers > 0, 1, 2)
+        positions = positions + VECTORS[actions] * step[:, None]
+        ending = timers == 1
+        positions[ending] = (positions[ending] + 1) // 2 * 2
+        self.ghostPositions[games, ghost] = positions
+        self.ghostDirections[games, ghost] = actions
+        self.scaredTimers[games, ghost] = numpy.maximum(0, timers - 1)
+
+        hit = self.collisions(games, ghost, 2 * self.pacmanPositions[games])
+        change = numpy.zeros(len(games), dtype=int)
+        lose = numpy.zeros(len(games), dtype=bool)
+        change, lose = self.collide(games, ghost, hit, change, lose, numpy.zeros(len(games), dtype=bool))
+        self.scores[games] += change
+        self.losses[games] = lose
+        return games[~lose]
+
+    def collisions(self, games, ghost, pacmanPositions):
+        "GhostRules.canKill, with both positions doubled"
+        distance = numpy.abs(self.ghostPositions[games, ghost] - pacmanPositions).sum(1)
+        return distance <= 2 * pacman.COLLISION_TOLERANCE
+
+    def collide(self, games, ghost, hit, change, lose, win):
+        "GhostRules.collide for the games where the ghost hit Pacman"
+        scared = hit & (self.scaredTimers[games, ghost] > 0)
+        change = change + 200 * scared
+        eatenGames = games[scared]
+        self.ghostPositions[eatenGames, ghost] = self.ghostStarts[ghost]
+        self.ghostDirections[eatenGames, ghost] = STOP
+        self.scaredTimers[eatenGames, ghost] = 0
+        kills = hit & ~scared & ~win
+        change = change - 500 * kills
+        return change, lose | kills
+
+    def getState(self, game):
+        "Returns the state of a game as a GameState of the engine"
+        from game import Configuration
+        state = self.initialState.deepCopy()
+        data = state.data
+        data.layout = self.layout
+        x, y = self.pacmanPositions[game]
+        pacmanState = data.agentStates[0]
+        pacmanState.configuration = Configuration((int(x), int(y)), ACTIONS[self.pacmanDirections[game]])
+        for ghost in range(self.numGhosts):
+            ghostState = data.agentStates[ghost + 1]
+            x, y = self.ghostPositions[game, ghost]
+            ghostState.configuration = Configuration((x / 2.0, y / 2.0), ACTIONS[self.ghostDirections[game, ghost]])
+            ghostState.scaredTimer = int(self.scaredTimers[game, ghost])
+        data.food.data = self.food[game].tolist()
+        data.capsules = [cell for cell, left in zip(self.capsuleCells, self.capsules[game]) if left]
+        data.score = int(self.scores[game])
+        data._win = bool(self.wins[game])
+        data._lose = bool(self.losses[game])
+        return state
+
+#########################################
+# Comparing with the engine             #
+#########################################
+
+class RandomPacman:
+    "Pacman moving as BatchSimulator.randomPacmanActions does"
+    def getAction(self, state):
+        return random.choice(state.getLegalPacmanActions())
+
+def playEngineGame(layout, ghost, numGhosts, seed, **ghostArgs):
+    """
+    Plays a game of the engine with RandomPacman after random.seed(seed) and
+    returns its score, whether Pacman won and the number of his moves.
+    """
+    import ghostAgents, textDisplay
+    random.seed(seed)
+    ghostType = getattr(ghostAgents, ghost)
+    ghosts = [ghostType(i + 1, **ghostArgs) for i in range(numGhosts)]
+    rules = pacman.ClassicGameRules()
+    game = rules.newGame(layout, RandomPacman(), ghosts, textDisplay.NullGraphics(), quiet=True)
+    game.run()
+    moves = len([agentIndex for agentIndex, action in game.moveHistory if agentIndex == 0])
+    return game.state.data.score, game.state.isWin(), moves
+
+def playBatch(sim):
+    "Plays all games of sim to the end with random Pacman moves"
+    while not sim.isOver().all():
+        sim.step(sim.randomPacmanActions())
+
+def readCommand(argv):
+    from optparse import OptionParser
+    usageStr = """
+    USAGE:      python batchSimulator.py <options>
+    EXAMPLES:   python batchSimulator.py -l mediumClassic -n 1000
+                python batchSimulator.py -l smallClassic -n 100 -g DirectionalGhost --check
+    """
+    parser = OptionParser(usageStr)
+    parser.add_option('-l', '--layout', dest='layout', default='mediumClassic',
+                      help='Layout of the games [Default: %default]')
+    parser.add_option('-n', '--numGames', dest='numGames', type='int', default=100,
+                      help='Number of games played at once [Default: %default]')
+    parser.add_option('-g', '--ghosts', dest='ghost', type='choice', choices=sorted(GHOST_POLICIES),
+                      default='RandomGhost', help='Ghost policy [Default: %default]')
+    parser.add_option('-k', '--numghosts', dest='numGhosts', type='int', default=None,
+                      help='The maximum number of ghosts to use')
+    parser.add_option('-s', '--seed', dest='seed', type='int', default=0,
+                      help='Seed of the first game; game i uses seed + i [Default: %default]')
+    parser.add_option('--check', action='store_true', dest='check', default=False,
+                      help='Also play every game with the engine and compare the outcomes')
+    options, args = parser.parse_args(argv)
+    if args: parser.error('Unrecognized arguments: ' + ' '.join(args))
+    return options
+
+if __name__ == '__main__':
+    import sys, layout
+    options = readCommand(sys.argv[1:])
+    gameLayout = layout.getLayout(options.layout)
+    if gameLayout == None: raise Exception("The layout " + options.layout + " cannot be found")
+    seeds = range(options.seed, options.seed + options.numGames)
+    sim = BatchSimulator(gameLayout, options.numGames, options.ghost, options.numGhosts, seeds)
+
+    start = time.time()
+    playBatch(sim)
+    elapsed = time.time() - start
+    moves = sim.numMoves.sum()
+    print 'Batch:  %d games, %d Pacman moves in %.2fs (%.0f moves/s)' % \
+        (options.numGames, moves, elapsed, moves / max(elapsed, 1e-9))
+    print 'Average Score: %.2f  Win Rate: %d/%d' % (sim.scores.mean(), sim.wins.sum(), options.numGames)
+
+    if options.check:
+        start = time.time()
+        mismatches = 0
+        for i, seed in enumerate(seeds):
+            outcome = playEngineGame(gameLayout, options.ghost, sim.numGhosts, seed)
+            if outcome != (sim.scores[i], sim.wins[i], sim.numMoves[i]):
+                mismatches += 1
+                print 'Game %d (seed %d): engine %s, batch %s' % \
+                    (i, seed, outcome, (sim.scores[i], sim.wins[i], sim.numMoves[i]))
+        elapsed = time.time() - start
+        print 'Engine: %d Pacman moves in %.2fs (%.0f moves/s)' % (moves, elapsed, moves / max(elapsed, 1e-9))
+        print '%d of %d games differ' % (mismatches, options.numGames)
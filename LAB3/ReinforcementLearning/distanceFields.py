@@ -0,0 +1,219 @@
+# distanceFields.py
+# -----------------
+# Licensing Information:  You are free to use or extend these projects for
+# educational purposes provided that (1) you do not distribute or publish
+# solutions, (2) you retain this notice, and (3) you provide clear
+# attribution to UC Berkeley, including a link to http://ai.berkeley.edu.
+#
+# Attribution Information: The Pacman AI projects were developed at UC Berkeley.
+# The core projects and autograders were primarily created by John DeNero
+# (denero@cs.berkeley.edu) and Dan Klein (klein@cs.berkeley.edu).
+# Student side autograding was added by Brad Miller, Nick Hay, and
+# Pieter Abbeel (pabbeel@cs.berkeley.edu).
+
+
+"""
+Breadth-first distance fields over the walls of a Pacman layout.
+
+A distance field (or distance map) holds, for every cell of the board, the
+number of steps Pacman needs to reach it from the closest of a set of source
+cells, or UNREACHABLE (-1) if it cannot be reached.  Maps are indexed like a
+Grid, distances[x][y], and when NumPy is available they are width x height
+integer arrays that can also be indexed with distances[x, y].
+
+With NumPy, the breadth-first wavefront is grown by shifting a boolean
+frontier array in the four directions at once, instead of popping one cell at
+a time.  Without NumPy, a plain queue based breadth-first search is used and
+the maps are lists of lists.
+"""
+
+from collections import deque
+from game import Directions, Actions
+import util
+
+try:
+    import numpy
+    _NUMPY_ENABLED = True
+except ImportError:
+    _NUMPY_ENABLED = False
+
+UNREACHABLE = -1
+
+# Successors are tried in the same order as in the search problems
+_MOVES = [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]
+
+# Only the wall grids used most recently are kept, so that processes playing
+# many generated layouts do not hold on to the tables of every one of them
+OPEN_CELL_CACHE = util.LRUCache(32)
+MAZE_DISTANCE_CACHE = util.LRUCache(32)
+
+def openCells(walls):
+    """
+    Returns the cells that are not walls as a width x height boolean array (a
+    list of lists without NumPy).  The conversion is done once per distinct
+    wall Grid and then cached, also across copies of the same layout.
+    """
+    cells = getattr(walls, '_openCells', None)
+    if cells is not None: return cells
+    key = tuple([tuple(column) for column in walls.data])
+    cells = OPEN_CELL_CACHE.get(key)
+    if cells is None:
+        if _NUMPY_ENABLED:
+            cells = numpy.logical_not(numpy.array(walls.data, dtype=bool))
+        else:
+            cells = [[not wall for wall in column] for column in walls.data]
+        OPEN_CELL_CACHE.put(key, cells)
+    walls._openCells = cells
+    return cells
+
+def distanceMap(walls, sources, allowed=None, targets=None):
+    """
+    Multi-source breadth-first distances from the given (x,y) sources.
+
+      walls:   a Grid of walls (or any list of columns of booleans)
+      sources: positions at distance 0
+      allowed: optional collection of (x,y) positions; when given, the search
+               may only use these cells
+      targets: optional Grid of booleans; the search stops as soon as the
+               wavefront reaches a target cell, so only the cells up to that
+               distance are filled in
+
+    Sources that are walls (or not allowed) are ignored.
+    """
+    cells = openCells(walls)
+    if _NUMPY_ENABLED:
+        return _wavefront(cells, sources, allowed, targets)
+    return _queueSearch(cells, sources, allowed, targets)
+
+def _wavefront(cells, sources, allowed, targets):
+    width, height = cells.shape
+    if allowed is not None:
+        mask = numpy.zeros((width, height), dtype=bool)
+        for x, y in allowed: mask[x, y] = True
+        cells = cells & mask
+    if targets is not None and not isinstance(targets, numpy.ndarray):
+        targets = numpy.array(targets.data, dtype=bool)
+
+    distances = numpy.empty((width, height), dtype=int)
+    distances.fill(UNREACHABLE)
+    frontier = numpy.zeros((width, height), dtype=bool)
+    for x, y in sources:
+        frontier[x, y] = True
+    frontier &= cells
+    visited = frontier.copy()
+    grown = numpy.empty((width, height), dtype=bool)
+
+    step = 0
+    while frontier.any():
+        distances[frontier] = step
+        if targets is not None and (frontier & targets).any(): break
+        grown.fill(False)
+        grown[1:, :] |= frontier[:-1, :]
+        grown[:-1, :] |= frontier[1:, :]
+        grown[:, 1:] |= frontier[:, :-1]
+        grown[:, :-1] |= frontier[:, 1:]
+        grown &= cells
+        grown &= numpy.logical_not(visited)
+        visited |= grown
+        frontier, grown = grown, frontier
+        step += 1
+    return distances
+
+def _queueSearch(cells, sources, allowed, targets):
+    width, height = len(cells), len(cells[0])
+    if allowed is not None: allowed = set(allowed)
+    distances = [[UNREACHABLE] * height for x in range(width)]
+    fringe = deque()
+    for x, y in sources:
+        if allowed is not None and (x, y) not in allowed: continue
+        if cells[x][y] and distances[x][y] == UNREACHABLE:
+            distances[x][y] = 0
+            fringe.append((x, y))
+
+    while fringe:
+        x, y = fringe.popleft()
+        if targets is not None and targets[x][y]: break
+        dist = distances[x][y] + 1
+        for nextx, nexty in ((x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y)):
+            if nextx < 0 or nextx >= width or nexty < 0 or nexty >= height: continue
+            if not cells[nextx][nexty] or distances[nextx][nexty] != UNREACHABLE: continue
+            if allowed is not None and (nextx, nexty) not in allowed: continue
+            distances[nextx][nexty] = dist
+            fringe.append((nextx, nexty))
+    return distances
+
+def closestTargetDistance(walls, start, targets):
+    """
+    Returns the maze distance from start to the closest cell marked True in
+    the targets Grid (e.g. food), or None if no target can be reached.
+    """
+    distances = distanceMap(walls, [start], targets=targets)
+    if _NUMPY_ENABLED:
+        if not isinstance(targets, numpy.ndarray):
+            targets = numpy.array(targets.data, dtype=bool)
+        found = distances[targets & (distances != UNREACHABLE)]
+        if len(found) == 0: return None
+        return int(found.min())
+    best = None
+    for x, column in enumerate(distances):
+        for y, dist in enumerate(column):
+            if dist != UNREACHABLE and targets[x][y] and (best is None or dist < best):
+                best = dist
+    return best
+
+class MazeDistances:
+    """
+    Maze distances between cells of one layout.  A full distance map is
+    computed the first time a cell is used as an endpoint and reused for all
+    later queries involving that cell.
+    """
+    def __init__(self, walls):
+        self.walls = walls
+        self.cells = openCells(walls) # keeps its id, the cache key, from being reused
+        self.maps = {}
+
+    def getDistance(self, point1, point2):
+        "Returns the maze distance between two cells, or None if unreachable"
+        if point2 in self.maps and point1 not in self.maps:
+            point1, point2 = point2, point1
+        if point1 not in self.maps:
+            self.maps[point1] = distanceMap(self.walls, [point1])
+        x, y = point2
+        dist = self.maps[point1][x][y]
+        if dist == UNREACHABLE: return None
+        return int(dist)
+
+def getMazeDistances(walls):
+    "Returns the MazeDistances shared by all copies of the given walls"
+    key = id(openCells(walls))
+    distances = MAZE_DISTANCE_CACHE.get(key)
+    if distances is None:
+        distances = MazeDistances(walls)
+        MAZE_DISTANCE_CACHE.put(key, distances)
+    return distances
+
+def mazeDistance(walls, point1, point2):
+    """
+    Returns the length of the shortest path between two cells, or None if
+    there is none.
+    """
+    return getMazeDistances(walls).getDistance(tuple(point1), tuple(point2))
+
+def pathFromDistanceMap(distances, start):
+    """
+    Follows a distance map downhill from start to one of its sources and
+    returns the actions along the way, or None if start is unreachable.
+    """
+    x, y = start
+    dist = distances[x][y]
+    if dist == UNREACHABLE: return None
+    path = []
+    while dist > 0:
+        for action in _MOVES:
+            dx, dy = Actions.directionToVector(action)
+            nextx, nexty = int(x + dx), int(y + dy)
+            if distances[nextx][nexty] == dist - 1:
+                break
+        path.append(action)
+        x, y, dist = nextx, nexty, dist - 1
+    return path
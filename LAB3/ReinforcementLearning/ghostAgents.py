@@ -19,21 +19,55 @@ import random
 from util import manhattanDistance
 import util
 
+# Alias tables a ghost keeps before it starts over
+MAX_ALIAS_TABLES = 100000
+
 class GhostAgent( Agent ):
-    def __init__( self, index ):
+    """
+    A ghost that draws its moves from getDistribution, with random numbers
+    from rng (the random module by default).
+
+    With alias=True the ghost builds an alias table (util.AliasSampler) the
+    first time it is in a situation (see getSituation) and draws from it
+    whenever it is in that situation again, instead of building and sampling
+    the distribution on every move.  Alias draws differ from util.sample
+    draws, so games are only reproducible with the same setting.
+    """
+    def __init__( self, index, alias=False, rng=None ):
         self.index = index
+        self.rng = rng
+        self.aliasTables = None
+        if alias: self.aliasTables = {}
 
     def getAction( self, state ):
+        if self.aliasTables is not None:
+            situation = self.getSituation(state)
+            sampler = self.aliasTables.get(situation)
+            if sampler is None:
+                dist = self.getDistribution(state)
+                if len(dist) == 0: return Directions.STOP
+                if len(self.aliasTables) >= MAX_ALIAS_TABLES: self.aliasTables = {}
+                sampler = self.aliasTables[situation] = util.AliasSampler(dist)
+            return sampler.sample(self.rng)
         dist = self.getDistribution(state)
         if len(dist) == 0:
             return Directions.STOP
         else:
-            return util.chooseFromDistribution( dist )
+            return util.chooseFromDistribution( dist, self.rng )
 
     def getDistribution(self, state):
         "Returns a Counter encoding a distribution over actions from the provided state."
         util.raiseNotDefined()
 
+    def getSituation(self, state):
+        """
+        Returns a key for everything getDistribution depends on: by default
+        the ghost's position, direction and whether it is scared.
+        """
+        ghostState = state.getGhostState( self.index )
+        configuration = ghostState.configuration
+        return configuration.pos, configuration.direction, ghostState.scaredTimer > 0
+
 class RandomGhost( GhostAgent ):
     "A ghost that chooses a legal action uniformly at random."
     def getDistribution( self, state ):
@@ -44,8 +78,8 @@ class RandomGhost( GhostAgent ):
 
 class DirectionalGhost( GhostAgent ):
     "A ghost that prefers to rush Pacman, or flee when scared."
-    def __init__( self, index, prob_attack=0.8, prob_scaredFlee=0.8 ):
-        self.index = index
+    def __init__( self, index, prob_attack=0.8, prob_scaredFlee=0.8, alias=False, rng=None ):
+        GhostAgent.__init__( self, index, alias, rng )
         self.prob_attack = prob_attack
         self.prob_scaredFlee = prob_scaredFlee
 
@@ -79,3 +113,7 @@ class DirectionalGhost( GhostAgent ):
         for a in legalActions: dist[a] += ( 1-bestProb ) / len(legalActions)
         dist.normalize()
         return dist
+
+    def getSituation( self, state ):
+        "The ghost's situation and where Pacman is"
+        return GhostAgent.getSituation( self, state ), state.getPacmanPosition()
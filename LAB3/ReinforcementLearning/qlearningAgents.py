@@ -42,7 +42,7 @@ class QLearningAgent(ReinforcementAgent):
 
     def __init__(self, **args):
         "You can initialize Q-values here..."
-        self.q_values = util.Counter()
+        self.q_values = util.SparseCounter()
 
         ReinforcementAgent.__init__(self, **args)
 
@@ -191,7 +191,7 @@ class ApproximateQAgent(PacmanQAgent):
     def __init__(self, extractor='IdentityExtractor', **args):
         self.featExtractor = util.lookup(extractor, globals())()
         PacmanQAgent.__init__(self, **args)
-        self.weights = util.Counter()
+        self.weights = util.SparseCounter()
 
     def getWeights(self):
         return self.weights
@@ -43,10 +43,12 @@ class ValueIterationAgent(ValueEstimationAgent):
         self.mdp = mdp
         self.discount = discount
         self.iterations = iterations
-        self.values = util.Counter()
+        # The states never change, so the values are kept in arrays over them
+        self.states = util.KeyIndex(mdp.getStates())
+        self.values = util.DenseCounter(self.states)
 
         for k in range(0, iterations):
-            current_values = util.Counter()
+            current_values = util.DenseCounter(self.states)
 
             for state in mdp.getStates():
                 actions = self.mdp.getPossibleActions(state)